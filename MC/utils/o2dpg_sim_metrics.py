@@ -72,6 +72,12 @@ METRICS = [METRIC_NAME_CPU, METRIC_NAME_USS, METRIC_NAME_PSS, METRIC_NAME_TIME]
 # additional cgroup-based metrics produced when runner uses --systemd-run
 CGROUP_METRICS = [METRIC_NAME_CGROUP_CPU, METRIC_NAME_CGROUP_MEM]
 
+# quantiles json-stat writes per metric (as "p50", "p90", ...); taken over the
+# task instances (one per timeframe), of the value each instance would book:
+# peak pss/uss, mean cpu, lifetime
+DEFAULT_QUANTILES = "50,90,99"
+_QUANTILE_KEY_RE = re.compile(r"^p\d+(\.\d+)?$")
+
 # task names matching this pattern are internal runner markers, not real tasks
 _INTERNAL_NAME_PREFIX = "__"
 
@@ -99,10 +105,30 @@ def get_parent_category(proposed):
   return cat[0]
 
 
-def line_to_dict(l):
+# header of pipeline_metric files written with --metric-format ndjson
+METRIC_NDJSON_FORMAT = "o2dpg-pipeline-metric"
+
+
+def line_to_dict(l, fields=None):
   """
   turn a single line read from a file to JSON and return as dict
+
+  With fields (from the header of an NDJSON pipeline_metric), l is a JSON line
+  of that format: a row array or the meta object.
   """
+  if fields is not None:
+    try:
+      d = json.loads(l)
+    except json.decoder.JSONDecodeError:
+      return None
+    if isinstance(d, list):
+      return dict(zip(fields, d))
+    if isinstance(d, dict) and "meta" in d:
+      meta = dict(d["meta"])
+      meta[METRIC_NAME_TIME] = d.get(METRIC_NAME_TIME)
+      return meta
+    return None
+
   l = l.strip().split()
   # the first column is the date, the second column is the time from the Python logger
   # NOTE replace "," with "." for milliseconds. Seems not to be valid ISO format for Python 3.9, however it is in Python 3.11)
@@ -127,6 +153,30 @@ def line_to_dict(l):
   return None
 
 
+def metric_file_lines_to_dicts(f):
+  """
+  yield the dicts of a pipeline_metric file object, whichever format it was written in
+
+  The logger format (default) has a time stamp and a Python dict repr per line,
+  --metric-format ndjson starts with a header naming the fields of the row arrays.
+  """
+  fields = None
+  for i, l in enumerate(f):
+    if i == 0 and l.startswith("{"):
+      try:
+        header = json.loads(l)
+      except json.decoder.JSONDecodeError:
+        header = {}
+      if header.get("format") == METRIC_NDJSON_FORMAT:
+        fields = header["fields"]
+        continue
+    if not l.strip():
+      continue
+    d = line_to_dict(l, fields)
+    if d:
+      yield d
+
+
 def convert_to_float_if_possible(value):
   """
   take any value and try to convert to float
@@ -310,11 +360,7 @@ class Resources:
     self.name = basename(pipeline_path)
 
     with open(pipeline_path, "r") as f:
-      for l in f:
-        d = line_to_dict(l)
-        if not d:
-          continue
-
+      for d in metric_file_lines_to_dicts(f):
         if "iter" in d:
           # Intercept __cgroup_global__ rows before they reach add_iteration.
           # These carry slice-level CPU (% units) and memory.current (MB).
@@ -789,6 +835,9 @@ def merge_stats(elementary, running):
 
     Each metric stores:
       mean, std, M2, min, max, count
+    and the quantiles json-stat wrote (p50, p90, ...). Quantiles cannot be
+    merged exactly from their values alone; they are combined as a
+    count-weighted mean, which unlike max is not driven by one outlier run.
     """
     if not elementary:
         return running
@@ -819,12 +868,25 @@ def merge_stats(elementary, running):
                     "M2": 0.0,
                     "count": n_new_total
                 }
+                for key, value in vals.items():
+                    if _QUANTILE_KEY_RE.match(key):
+                        running[name][metric][key] = value
                 continue
 
             rmetric = running[name][metric]
             n_old = rmetric.get("count", 0)
             n_new = n_new_total
 
+            # quantiles: count-weighted mean
+            for key, value in vals.items():
+                if not _QUANTILE_KEY_RE.match(key) or value is None:
+                    continue
+                q_old = rmetric.get(key)
+                if q_old is None or n_old <= 0:
+                    rmetric[key] = value
+                else:
+                    rmetric[key] = (q_old * n_old + value * n_new) / (n_old + n_new)
+
             # update min / max
             e_min = vals.get("min")
             e_max = vals.get("max")
@@ -882,6 +944,9 @@ def merge_stats(elementary, running):
                 vals["min"] = r3(vals["min"])
             if "max" in vals:
                 vals["max"] = r3(vals["max"])
+            for key in vals:
+                if _QUANTILE_KEY_RE.match(key):
+                    vals[key] = r3(vals[key])
 
     return running
 
@@ -970,10 +1035,35 @@ def r3(x):
         return None
     return round(xf, 3)
 
-def produce_json_stat(resource_object):
+def parse_quantiles(spec):
+  """
+  "50,90,99" -> [50.0, 90.0, 99.0]
+  """
+  quantiles = []
+  for part in spec.split(","):
+    part = part.strip().lstrip("pP")
+    if not part:
+      continue
+    q = float(part)
+    if not 0 < q <= 100:
+      raise ValueError(f"quantile {q} not in (0, 100]")
+    quantiles.append(q)
+  return quantiles
+
+
+def quantile_key(q):
+  """
+  90 -> "p90", 99.9 -> "p99.9"
+  """
+  return f"p{q:g}"
+
+
+def produce_json_stat(resource_object, quantiles=None):
   print ("<--- Producing resource json from file ", resource_object.pipeline_file)
   dframe = resource_object.df
   meta = resource_object.meta
+  if quantiles is None:
+    quantiles = parse_quantiles(DEFAULT_QUANTILES)
 
   # also write json summary; This is a file that can be used
   # to adjust the resource estimates in o2dpg_workflow_runner.py
@@ -1016,6 +1106,18 @@ def produce_json_stat(resource_object):
   min_lifetime  = lifetime_per_tf.groupby('name')['lifetime'].min()
   std_lifetime  = lifetime_per_tf.groupby('name')['lifetime'].std().fillna(0.0)
 
+  # ----- quantiles over task instances (one per timeframe) -----
+  # what an instance books: its peak memory and its mean cpu
+  per_instance = dframe.groupby(['timeframe', 'name']).agg({'pss': 'max', 'uss': 'max', 'cpu': 'mean'})
+  instance_values = {
+      'pss': per_instance.groupby('name')['pss'],
+      'uss': per_instance.groupby('name')['uss'],
+      'cpu': per_instance.groupby('name')['cpu'],
+      'lifetime': lifetime_per_tf.groupby('name')['lifetime'],
+  }
+  quantile_values = {metric: {quantile_key(q): grouped.quantile(q / 100.) for q in quantiles}
+                     for metric, grouped in instance_values.items()}
+
   resource_json["count"] = 1 # basic sample size
 
   # convert to nested dictionary
@@ -1044,6 +1146,9 @@ def produce_json_stat(resource_object):
             'std' : r3(float(std_lifetime.get(name, 0.0))),
         }
     }
+    for metric, per_key in quantile_values.items():
+      for key, values in per_key.items():
+        entry[metric][key] = r3(float(values.get(name, np.nan)))
     # include cgroup metrics when available
     for cg_col in CGROUP_METRICS:
       min_col = f"{cg_col}_min"
@@ -1160,8 +1265,8 @@ def _collect_log_times(search_path):
   return collected
 
 
-def _stats_dict(values):
-  """Build a min/max/mean/std/count dict from a list of floats.
+def _stats_dict(values, quantiles=None):
+  """Build a min/max/mean/std/count dict (and quantiles) from a list of floats.
 
   std is None when n=1 (sample std is undefined, not zero).
   """
@@ -1170,16 +1275,19 @@ def _stats_dict(values):
     return None
   mean = sum(values) / n
   std = round((sum((x - mean) ** 2 for x in values) / (n - 1)) ** 0.5, 3) if n > 1 else None
-  return {
+  stats = {
     'min':  round(min(values), 3),
     'max':  round(max(values), 3),
     'mean': round(mean, 3),
     'std':  std,
     'M2': 0.0, 'count': n,
   }
+  for q in quantiles or []:
+    stats[quantile_key(q)] = r3(np.percentile(values, q))
+  return stats
 
 
-def incorporate_log_times(json_path, search_path):
+def incorporate_log_times(json_path, search_path, quantiles=None):
   """Update a json-stat file with walltime (and cpu/mem) from *.log_time files.
 
   For tasks already in the stat: overwrite lifetime with log_time walltime
@@ -1204,7 +1312,7 @@ def incorporate_log_times(json_path, search_path):
     cpu_cores  = [m['cpu_cores']  for m in measurements if 'cpu_cores'  in m]
     maxmem_mbs = [m['maxmem_mb']  for m in measurements if 'maxmem_mb'  in m]
 
-    lifetime_entry = _stats_dict(walltimes)
+    lifetime_entry = _stats_dict(walltimes, quantiles)
 
     if base_name in stat:
       # Task is in the stat: replace lifetime with ground-truth log_time values.
@@ -1213,10 +1321,10 @@ def incorporate_log_times(json_path, search_path):
     else:
       # Task is absent (too short for monitor sampling): create a minimal entry.
       entry = {'lifetime': lifetime_entry}
-      cpu_entry = _stats_dict(cpu_cores)
+      cpu_entry = _stats_dict(cpu_cores, quantiles)
       if cpu_entry:
         entry['cpu'] = cpu_entry
-      mem_entry = _stats_dict(maxmem_mbs)
+      mem_entry = _stats_dict(maxmem_mbs, quantiles)
       if mem_entry:
         # maxmem (RSS) is a reasonable PSS proxy for short-lived tasks
         entry['pss'] = mem_entry
@@ -1353,13 +1461,14 @@ def incorporate_amdahl_models(json_path, workflow_path):
   print(f'  Amdahl models built for {n_built}/{len(scalable)} scalable task(s).')
 
 
-def json_stat_impl(pipelines, output, header_data, log_time_path=None, workflow_path=None):
+def json_stat_impl(pipelines, output, header_data, log_time_path=None, workflow_path=None,
+                   quantiles=None):
   resources = extract_resources(pipelines)
-  all_stats = [produce_json_stat(res) for res in resources]
+  all_stats = [produce_json_stat(res, quantiles) for res in resources]
   merge_stats_into(all_stats, output, build_meta_header(header_data))
 
   if log_time_path:
-    incorporate_log_times(output, log_time_path)
+    incorporate_log_times(output, log_time_path, quantiles)
 
   if workflow_path:
     incorporate_amdahl_models(output, workflow_path)
@@ -1369,7 +1478,8 @@ def json_stat(args):
   log_time_path = getattr(args, 'log_time_path', None)
   workflow_path = getattr(args, 'workflow_path', None)
   json_stat_impl(args.pipelines, args.output, args.header_data,
-                 log_time_path=log_time_path, workflow_path=workflow_path)
+                 log_time_path=log_time_path, workflow_path=workflow_path,
+                 quantiles=parse_quantiles(args.quantiles))
 
 def merge_json_stats(args):
   all_stats = []
@@ -1639,6 +1749,10 @@ def main():
                                      "tasks that carry O2DPG_DYNAMIC_NWORKER_OVERWRITE or a "
                                      "'scaling' block, using the original resources.cpu as "
                                      "n_ref combined with learned cpu.mean and lifetime.mean.")
+  json_stat_parser.add_argument("--quantiles", default=DEFAULT_QUANTILES, metavar="Q,Q,...",
+                                help="Quantiles (in percent) to write per metric as pQ, over the task "
+                                     "instances of each name: peak pss/uss, mean cpu, lifetime. Select "
+                                     "one for booking with the runner's --resource-quantile.")
   json_stat_parser.add_argument("--log-time-path", dest="log_time_path", default=None,
                                 metavar="DIR",
                                 help="Directory to search for *.log_time files written by "
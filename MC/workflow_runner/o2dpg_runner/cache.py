@@ -20,6 +20,14 @@ Fingerprint components:
 
 The sidecar is written best-effort after the _done file exists (so
 torn writes don't leave stale fingerprints around).
+
+Whether the markers exist is answered from an in-memory index: the first
+query for a directory lists it with one os.scandir(), and the verdict for
+each task is memoized. Scratch areas on Lustre/EOS make every stat a
+round trip, and the scheduler asks about every candidate on every pass.
+The index only learns about changes made through TaskCache (record,
+invalidation, remove_done, refresh); the executor refreshes a task's
+entry once it has run, which is the only time its markers appear.
 """
 
 from __future__ import annotations
@@ -28,7 +36,7 @@ import hashlib
 import json
 import logging
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 log = logging.getLogger(__name__)
 
@@ -98,22 +106,63 @@ class TaskCache:
         if policy not in ("off", "lenient", "strict"):
             raise ValueError(f"unknown cache policy: {policy}")
         self.policy = policy
+        self._listing: Dict[str, Set[str]] = {}   # dir -> regular file names
+        self._verdict: Dict[str, bool] = {}       # logfile -> is_done()
+
+    # ----- index -----
+    def _files_in(self, path: str) -> Set[str]:
+        d = os.path.dirname(path) or "."
+        names = self._listing.get(d)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(d) as it:
+                    for e in it:
+                        if e.is_file():
+                            names.add(e.name)
+            except OSError:
+                pass  # not created yet: nothing is done in there
+            self._listing[d] = names
+        return names
+
+    def _exists(self, path: str) -> bool:
+        return os.path.basename(path) in self._files_in(path)
+
+    def _note(self, path: str, exists: bool) -> None:
+        names = self._files_in(path)
+        if exists:
+            names.add(os.path.basename(path))
+        else:
+            names.discard(os.path.basename(path))
+
+    def refresh(self, logfile: str) -> None:
+        """Re-read a task's markers from disk, e.g. after it has run."""
+        self._verdict.pop(logfile, None)
+        for p in (done_path(logfile), fingerprint_path(logfile)):
+            self._note(p, os.path.isfile(p))
 
+    # ----- queries -----
     def is_done(self, logfile: str, current_fp: Dict[str, str]) -> bool:
         """Return True iff the task can be skipped.
 
         logfile: path like /cwd/taskname.log  (we append _done / _done.json)
-        current_fp: fingerprint dict from compute_fingerprint(task)
+        current_fp: fingerprint dict from compute_fingerprint(task); a
+                    task's fingerprint must not change while it is cached
         """
-        dp = done_path(logfile)
-        if not (os.path.exists(dp) and os.path.isfile(dp)):
+        verdict = self._verdict.get(logfile)
+        if verdict is None:
+            verdict = self._verdict[logfile] = self._is_done(logfile, current_fp)
+        return verdict
+
+    def _is_done(self, logfile: str, current_fp: Dict[str, str]) -> bool:
+        if not self._exists(done_path(logfile)):
             return False
 
         if self.policy == "off":
             return True
 
         fp_path = fingerprint_path(logfile)
-        if not os.path.exists(fp_path):
+        if not self._exists(fp_path):
             # Old run; nothing to compare against.
             if self.policy == "strict":
                 log.info("%s: strict cache policy but no fingerprint -> invalidating", logfile)
@@ -166,21 +215,31 @@ class TaskCache:
         """
         if self.policy == "off":
             return
-        dp = done_path(logfile)
-        if not os.path.exists(dp):
+        if not self._exists(done_path(logfile)):
             # _done doesn't exist (e.g. skipped in dry-run); nothing to record.
             return
         try:
             with open(fingerprint_path(logfile), "w") as f:
                 json.dump(current_fp, f, indent=2)
+            self._note(fingerprint_path(logfile), True)
         except OSError as e:
             log.warning("Could not write fingerprint for %s: %s", logfile, e)
 
+    def remove_done(self, logfile: str) -> None:
+        """remove_done_flag(), keeping the index in step (--rerun-from)."""
+        remove_done_flag(logfile)
+        self._verdict[logfile] = False
+        self._note(done_path(logfile), False)
+        self._note(fingerprint_path(logfile), False)
+
     def _invalidate(self, logfile: str) -> None:
         for p in (done_path(logfile), fingerprint_path(logfile)):
             try:
-                if os.path.exists(p):
+                if self._exists(p):
                     os.remove(p)
+                    self._note(p, False)
+            except FileNotFoundError:
+                self._note(p, False)
             except OSError as e:
                 log.warning("Could not remove %s: %s", p, e)
 
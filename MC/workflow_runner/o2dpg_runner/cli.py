@@ -10,6 +10,7 @@ from __future__ import annotations
 import argparse
 import logging
 import os
+import re
 import shutil
 import sys
 from typing import Optional, Tuple
@@ -18,8 +19,19 @@ import psutil
 
 from .config import RunnerConfig
 from .filegraph import BACKENDS as FILEGRAPH_BACKENDS, FileGraphManager
-from .workflow import build_workflow, load_json
+from .workflow import (
+    build_workflow, load_json, missing_statistics, parse_resource_quantiles,
+)
 from .executor import WorkflowExecutor
+from .metricsink import FORMATS as METRIC_FORMATS, make_metric_sink
+from .statusserver import check_address as check_status_address
+from .pressure import DEFAULT_THRESHOLDS as PSI_DEFAULT_THRESHOLDS, parse_thresholds
+from .scopelimits import DEFAULT_FACTORS as SCOPE_LIMIT_FACTORS, ScopeLimits
+from .oom import DEFAULT_FACTOR as OOM_DEFAULT_FACTOR, MAX_RESUBMITS as OOM_MAX_RESUBMITS
+from .forecast import DEFAULT_HORIZON as FORECAST_DEFAULT_HORIZON
+from .placement import METHODS as PLACEMENT_METHODS
+from .monitoring import HANG_DEFAULT_SPEC, parse_hang_spec
+from .resourcedb import DEFAULT_KEY_VARS as RESOURCE_DB_KEY_VARS, default_path as resource_db_path
 
 _FORMATTER = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
 _IN_SLICE_ENV = "O2DPG_RUNNER_IN_SLICE"
@@ -36,6 +48,40 @@ def _setup_logger(name: str, logfile: str, level: int = logging.INFO) -> logging
     return logger
 
 
+def _mem_factor(value: str) -> float:
+    try:
+        f = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}") from None
+    if not f > 1:
+        raise argparse.ArgumentTypeError(f"{value}: a factor of 1 or less would rerun the "
+                                         "task at the booking it just failed at")
+    return f
+
+
+def _workers(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an integer: {value!r}") from None
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"{value}: the number of workers cannot be negative")
+    return n
+
+
+def _checked(parse):
+    """argparse ``type=`` running *parse* on a spec, which is kept as given."""
+    def check(value: str) -> str:
+        try:
+            parse(value)
+        except ValueError as e:
+            # the parsers name their flag for callers outside argparse,
+            # which puts it in front of the message already
+            raise argparse.ArgumentTypeError(re.sub(r"^--[\w-]+ ", "", str(e))) from None
+        return value
+    return check
+
+
 def build_parser() -> argparse.ArgumentParser:
     max_system_mem = psutil.virtual_memory().total
     default_mem = 0.9 * max_system_mem / 1024.0 / 1024.0
@@ -57,6 +103,20 @@ def build_parser() -> argparse.ArgumentParser:
 
     # Resources
     p.add_argument("--update-resources", dest="update_resources", default=None)
+    p.add_argument("--resource-quantile", default=None, metavar="DIM=STAT,...",
+                   type=_checked(parse_resource_quantiles),
+                   help="Which learned statistic to book from --update-resources / "
+                        "--resource-db, per dimension mem, cpu, walltime: min, max, mean "
+                        "or a json-stat quantile pQ, e.g. mem=p95,cpu=p75 (default "
+                        "mem=max,cpu=mean,walltime=mean).")
+    p.add_argument("--resource-db", nargs="?", const=resource_db_path(), default=None,
+                   metavar="PATH",
+                   help="Apply the estimates learned by earlier runs from this SQLite file "
+                        "and merge in what this run used (default "
+                        f"{resource_db_path()}).")
+    p.add_argument("--resource-db-key", default=RESOURCE_DB_KEY_VARS, metavar="VAR,...",
+                   help="Environment variables whose values key the --resource-db "
+                        f"entries (default {RESOURCE_DB_KEY_VARS}).")
     p.add_argument("--dynamic-resources", dest="dynamic_resources", action="store_true")
     p.add_argument("--optimistic-resources", dest="optimistic_resources", action="store_true")
     p.add_argument("--n-backfill", dest="n_backfill", type=int, default=1)
@@ -77,6 +137,12 @@ def build_parser() -> argparse.ArgumentParser:
             "Either key may be omitted. Examples: \"ncpus:8/mem:16G\", \"ncpus:4\", \"mem:32G\"."
         ),
     )
+    p.add_argument("--scope-limits", nargs="?", const=SCOPE_LIMIT_FACTORS, default=None,
+                   type=_checked(ScopeLimits),
+                   metavar="CPU,HIGH,MAX",
+                   help="Under --systemd-run, start each task scope with CPUQuota, MemoryHigh "
+                        "and MemoryMax at these multiples of its booked CPU/MEM "
+                        f"(default {SCOPE_LIMIT_FACTORS}; 0 leaves a limit unset).")
 
     # Scheduling (new)
     p.add_argument("--scheduler-policy", default="timeframe",
@@ -90,13 +156,63 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--monitor-interval-mem", type=float, default=1.0)
     p.add_argument("--monitor-backend", default="psutil", choices=["psutil"])
 
+    # Task launch (new)
+    p.add_argument("--launcher", default="popen", choices=["popen", "forkserver"],
+                   help="forkserver: start tasks from a small helper process "
+                        "instead of forking the runner for every launch.")
+    p.add_argument("--light-lane-workers", type=_workers, default=0, metavar="N",
+                   help="Run tasks declared with cpu 0 and mem 0 from a pool of N threads, "
+                        "without resource booking or monitoring (0: off).")
+
+    p.add_argument("--cpu-placement", default="off", choices=PLACEMENT_METHODS,
+                   help="Pin each default-tier task to CPUs of its own, on one NUMA node "
+                        "where possible, via numactl, taskset or the scope's AllowedCPUs "
+                        "(auto: numactl if installed). Backfill tasks stay unpinned.")
+    p.add_argument("--preempt-backfill", action="store_true",
+                   help="Suspend (SIGSTOP) backfill tasks while default-tier tasks "
+                        "need their cores; continue them when the cores are free.")
+    p.add_argument("--psi-admission", nargs="?", const=PSI_DEFAULT_THRESHOLDS, default=None,
+                   type=_checked(parse_thresholds),
+                   metavar="MEM_SOME,MEM_FULL,CPU_SOME",
+                   help="Pause backfill and shrink the memory budget while PSI stall "
+                        f"percentages (avg10) exceed these (default {PSI_DEFAULT_THRESHOLDS}).")
+
     # Cache (new)
     p.add_argument("--cache-policy", default="off",
                    choices=["off", "lenient", "strict"])
 
+    # Crash recovery (new)
+    p.add_argument("--journal", default=None, metavar="PATH",
+                   help="Append task transitions to PATH; a restarted runner "
+                        "given the same PATH resumes from it.")
+
     # Control
     p.add_argument("--stdout-on-failure", action="store_true")
     p.add_argument("--retry-on-failure", type=int, default=0)
+    p.add_argument("--retry-rules", default=None, metavar="FILE",
+                   help="JSON list of logfile signatures deciding whether a failed "
+                        "task is retried, not retried, or retried with more memory.")
+    p.add_argument("--retry-mem-factor", type=_mem_factor, default=1.5,
+                   help="Memory factor for retry-more-mem rules that set none.")
+    p.add_argument("--hang-watchdog", nargs="?", const=HANG_DEFAULT_SPEC, default=None,
+                   type=_checked(parse_hang_spec),
+                   metavar="CPU,WINDOW,FRACTION",
+                   help="Kill tasks whose process tree stays below CPU%% of one core for "
+                        "WINDOW seconds, or FRACTION of their learned walltime if longer "
+                        f"(default {HANG_DEFAULT_SPEC}).")
+    p.add_argument("--hang-action", default="retry", choices=["retry", "fail"],
+                   help="What happens to a task killed by --hang-watchdog: one extra "
+                        "attempt, or failure.")
+    p.add_argument("--mem-forecast", nargs="?", type=float, const=FORECAST_DEFAULT_HORIZON,
+                   default=None, metavar="HORIZON",
+                   help="Admit against the PSS running tasks are projected to reach within "
+                        "HORIZON seconds (trend of their readings, capped at the learned "
+                        f"peak), where above their bookings (default {FORECAST_DEFAULT_HORIZON:g}).")
+    p.add_argument("--oom-resubmit", nargs="?", type=_mem_factor, const=OOM_DEFAULT_FACTOR,
+                   default=None, metavar="FACTOR",
+                   help="Resubmit OOM-killed tasks with their memory booking (and that of "
+                        "their un-started siblings) raised by FACTOR > 1, capped at --mem-limit "
+                        f"(default {OOM_DEFAULT_FACTOR}; at most {OOM_MAX_RESUBMITS} times a task).")
     p.add_argument("--no-rootinit-speedup", action="store_true")
     p.add_argument("--remove-files-early", type=str, default="")
     p.add_argument("--filegraph-backends", type=str,
@@ -115,6 +231,16 @@ def build_parser() -> argparse.ArgumentParser:
     # Logging
     p.add_argument("--action-logfile", default=None)
     p.add_argument("--metric-logfile", default=None)
+    p.add_argument("--metric-format", choices=list(METRIC_FORMATS), default="log",
+                   help="pipeline_metric format: 'log' (logger lines, as before) or "
+                        "'ndjson' (fixed-schema JSON, written by a background thread).")
+    p.add_argument("--trace-file", default=None, metavar="PATH",
+                   help="Write the task lifecycle as Trace Event Format JSON "
+                        "(open in ui.perfetto.dev or chrome://tracing).")
+    p.add_argument("--status-server", type=_checked(check_status_address), default=None,
+                   metavar="ADDR",
+                   help="Serve live status (/metrics: Prometheus, /status: JSON) on "
+                        "PORT (127.0.0.1), HOST:PORT or unix:PATH.")
     p.add_argument("--production-mode", action="store_true")
 
     return p
@@ -136,17 +262,27 @@ def _args_to_config(ns: argparse.Namespace) -> RunnerConfig:
         cpu_limit=ns.cpu_limit,
         n_backfill=ns.n_backfill,
         update_resources=ns.update_resources,
+        resource_quantile=ns.resource_quantile,
+        resource_db=ns.resource_db,
+        resource_db_key=ns.resource_db_key,
         dynamic_resources=ns.dynamic_resources,
         optimistic_resources=ns.optimistic_resources,
         in_systemd_slice=bool(os.environ.get(_IN_SLICE_ENV)),
         systemd_run_spec=ns.systemd_run_spec,
         systemd_slice_name=slice_name,
+        scope_limits=ns.scope_limits,
         scheduler_policy=ns.scheduler_policy,
         drop_should_break=ns.drop_should_break,
         monitor_interval_cpu=ns.monitor_interval_cpu,
         monitor_interval_mem=ns.monitor_interval_mem,
         monitor_backend=ns.monitor_backend,
+        launcher=ns.launcher,
+        light_lane_workers=ns.light_lane_workers,
+        psi_admission=ns.psi_admission,
+        preempt_backfill=ns.preempt_backfill,
+        cpu_placement=ns.cpu_placement,
         cache_policy=ns.cache_policy,
+        journal=ns.journal,
         target_tasks=target_tasks,
         target_labels=list(ns.target_labels),
         keep_going=ns.keep_going,
@@ -156,6 +292,12 @@ def _args_to_config(ns: argparse.Namespace) -> RunnerConfig:
         rerun_from=ns.rerun_from,
         list_tasks=ns.list_tasks,
         retry_on_failure=ns.retry_on_failure,
+        retry_rules=ns.retry_rules,
+        retry_mem_factor=ns.retry_mem_factor,
+        mem_forecast=ns.mem_forecast,
+        oom_resubmit=ns.oom_resubmit,
+        hang_watchdog=ns.hang_watchdog,
+        hang_action=ns.hang_action,
         no_rootinit_speedup=ns.no_rootinit_speedup,
         remove_files_early=ns.remove_files_early,
         filegraph_backends=ns.filegraph_backends,
@@ -163,6 +305,9 @@ def _args_to_config(ns: argparse.Namespace) -> RunnerConfig:
         production_mode=ns.production_mode,
         action_logfile=ns.action_logfile,
         metric_logfile=ns.metric_logfile,
+        metric_format=ns.metric_format,
+        trace_file=ns.trace_file,
+        status_server=ns.status_server,
     )
 
 
@@ -346,8 +491,25 @@ def _maybe_draw_workflow(raw_spec):
     dot.render("workflow.gv")
 
 
+def _check_learned_statistics(parser: argparse.ArgumentParser, ns: argparse.Namespace) -> None:
+    """Refuse a --resource-quantile the --update-resources file never wrote."""
+    if not (ns.update_resources and ns.resource_quantile):
+        return
+    try:
+        resource_dict = load_json(ns.update_resources)
+    except (OSError, ValueError):
+        return  # reported where the file is applied
+    missing = missing_statistics(resource_dict, parse_resource_quantiles(ns.resource_quantile))
+    if missing:
+        parser.error(f"--resource-quantile {ns.resource_quantile}: {ns.update_resources} has "
+                     f"no {', '.join(missing)}; write it with o2dpg_sim_metrics.py json-stat "
+                     "--quantiles")
+
+
 def main(argv=None) -> int:
-    ns = build_parser().parse_args(argv)
+    parser = build_parser()
+    ns = parser.parse_args(argv)
+    _check_learned_statistics(parser, ns)
     _maybe_reexec_in_slice(ns)  # may replace this process; returns only if not re-execing
     cfg = _args_to_config(ns)
 
@@ -355,7 +517,10 @@ def main(argv=None) -> int:
     action_log = cfg.action_logfile or f"pipeline_action_{os.getpid()}.log"
     metric_log = cfg.metric_logfile or f"pipeline_metric_{os.getpid()}.log"
     action_logger = _setup_logger("pipeline_action_logger", action_log, level=logging.DEBUG)
-    metric_logger = _setup_logger("pipeline_metric_logger", metric_log)
+    metric_logger = None
+    if cfg.metric_format == "log":
+        metric_logger = _setup_logger("pipeline_metric_logger", metric_log)
+    metric_sink = make_metric_sink(cfg.metric_format, metric_log, metric_logger)
 
     for flag in ("webhook", "checkpoint_on_failure", "cgroup"):
         if getattr(ns, flag, None):
@@ -395,12 +560,29 @@ def main(argv=None) -> int:
         "scheduler_policy": cfg.scheduler_policy,
         "drop_should_break": cfg.drop_should_break,
         "cache_policy": cfg.cache_policy,
+        "launcher": cfg.launcher,
+        "light_lane_workers": cfg.light_lane_workers,
+        "psi_admission": cfg.psi_admission,
+        "preempt_backfill": cfg.preempt_backfill,
+        "cpu_placement": cfg.cpu_placement,
+        "journal": cfg.journal,
+        "metric_format": cfg.metric_format,
+        "status_server": cfg.status_server,
+        "retry_rules": cfg.retry_rules,
+        "mem_forecast": cfg.mem_forecast,
+        "oom_resubmit": cfg.oom_resubmit,
+        "hang_watchdog": cfg.hang_watchdog,
+        "hang_action": cfg.hang_action,
+        "resource_quantile": cfg.resource_quantile,
+        "resource_db": cfg.resource_db,
+        "resource_db_key": cfg.resource_db_key,
         "systemd_run_spec": cfg.systemd_run_spec,
         "in_systemd_slice": cfg.in_systemd_slice,
+        "scope_limits": cfg.scope_limits,
         "monitor_interval_cpu": cfg.monitor_interval_cpu,
         "filegraph_backends": cfg.filegraph_backends,
     })
-    metric_logger.info(meta)
+    metric_sink.meta(meta)
 
     # visualize if asked (uses raw spec before filtering)
     if cfg.visualize_workflow:
@@ -413,6 +595,7 @@ def main(argv=None) -> int:
             print("Apparently some of the chosen target tasks are not in the workflow")
         else:
             print("Workflow is empty. Nothing to do")
+        metric_sink.close()
         return 0
 
     # Apply global env (as the prototype did at construction time)
@@ -426,9 +609,10 @@ def main(argv=None) -> int:
     rc = 0
     try:
         execer = WorkflowExecutor(cfg, wf, action_logger, metric_logger,
-                                  filegraph=filegraph)
+                                  filegraph=filegraph, metric_sink=metric_sink)
         rc = int(execer.execute())
     finally:
+        metric_sink.close()
         filegraph.stop()
         for backend, path in filegraph.analyse().items():
             print(f"FileIOGraph[{backend}] -> {path}")
@@ -22,6 +22,9 @@ class RunnerConfig:
     cpu_limit: float = 8.0
     n_backfill: int = 1
     update_resources: Optional[str] = None
+    resource_quantile: Optional[str] = None  # "mem=p95,cpu=p75": learned statistic booked
+    resource_db: Optional[str] = None      # SQLite store of learned estimates; see resourcedb.py
+    resource_db_key: str = "ALIEN_JDL_LPMINTERACTIONTYPE,NWORKERS,O2_ROOT"  # env vars keying it
     dynamic_resources: bool = False
     optimistic_resources: bool = False
     in_systemd_slice: bool = False  # True when runner was re-exec'd under systemd-run --scope
@@ -29,16 +32,27 @@ class RunnerConfig:
     # --- new scheduler knobs ---
     scheduler_policy: str = "timeframe"   # timeframe | critical-path | best-fit
     drop_should_break: bool = False        # let timeframe policy scan past non-fitting
+    psi_admission: Optional[str] = None    # "MEM_SOME,MEM_FULL,CPU_SOME" avg10 thresholds; see pressure.py
+    preempt_backfill: bool = False         # SIGSTOP backfill trees to make room for default tasks
+    cpu_placement: str = "off"             # off | auto | numactl | taskset | scope; see placement.py
 
     # --- systemd-run slice ---
     systemd_run_spec: Optional[str] = None    # raw "ncpus:N/mem:M/name:S" spec, kept for metric meta
     systemd_slice_name: Optional[str] = None  # parsed "name:" value; used for child scope names
+    scope_limits: Optional[str] = None        # "CPU,HIGH,MAX" headroom factors; see scopelimits.py
 
     # --- new monitor knobs ---
     monitor_interval_cpu: float = 1.0
     monitor_interval_mem: float = 1.0      # match prototype cadence; raise for cheaper monitor
     monitor_backend: str = "psutil"        # psutil | auto (auto reserved for future cgroup backend)
 
+    # --- task launch ---
+    launcher: str = "popen"                # popen | forkserver
+    light_lane_workers: int = 0            # >0: run cpu=0, mem=0 tasks from a thread pool, unbooked
+
+    # --- crash recovery ---
+    journal: Optional[str] = None          # append-only state journal, replayed on restart
+
     # --- cache policy (v1 _done.json) ---
     cache_policy: str = "off"              # off | lenient | strict
 
@@ -52,6 +66,12 @@ class RunnerConfig:
     rerun_from: Optional[str] = None
     list_tasks: bool = False
     retry_on_failure: int = 0
+    retry_rules: Optional[str] = None      # JSON rules: log signature -> retry / no-retry / more mem
+    retry_mem_factor: float = 1.5          # default factor for retry-more-mem rules
+    mem_forecast: Optional[float] = None   # projection horizon (s) for running tasks' PSS; see forecast.py
+    oom_resubmit: Optional[float] = None   # mem factor for OOM-killed tasks; see oom.py
+    hang_watchdog: Optional[str] = None    # "CPU,WINDOW,FRACTION"; see monitoring.py
+    hang_action: str = "retry"             # retry (once) | fail, for tasks the watchdog kills
     no_rootinit_speedup: bool = False
     remove_files_early: str = ""
     filegraph_backends: str = ""
@@ -61,3 +81,6 @@ class RunnerConfig:
     # --- logging ---
     action_logfile: Optional[str] = None
     metric_logfile: Optional[str] = None
+    metric_format: str = "log"             # "log" (prototype) or "ndjson"; see metricsink.py
+    trace_file: Optional[str] = None       # Trace Event Format JSON (Perfetto / chrome://tracing)
+    status_server: Optional[str] = None    # PORT, HOST:PORT or unix:PATH; see statusserver.py
@@ -19,9 +19,9 @@ import os
 import platform
 import re
 import signal
+import sqlite3
 import subprocess
 import sys
-import threading
 import time
 import traceback
 from dataclasses import dataclass, field
@@ -30,22 +30,49 @@ from typing import Dict, List, Optional, Set, Tuple
 import psutil
 
 from .config import RunnerConfig
-from .workflow import Workflow, update_resource_estimates
-from .graph import descendants, longest_path_length, kahn_topological_order
+from .workflow import (
+    Workflow, apply_resource_estimates, global_task_name, parse_resource_quantiles,
+    update_resource_estimates,
+)
+from .graph import ReadyTracker, descendants, longest_path_length, kahn_topological_order
 from .resources import ResourceManager, ResourceLimitExceeded
-from .monitoring import MonitorThread, PsutilBackend, _read_cgroup_v2_dir
+from .monitoring import (
+    MonitorThread, PsutilBackend, _read_cgroup_v2_dir, hang_window, parse_hang_spec,
+)
+from .reaper import ChildReaper
+from .launcher import LauncherError, PopenLauncher, make_launcher
+from .stderrmux import StderrMultiplexer
+from .lightlane import LightLane
+from .retry import NO_RETRY, RETRY_MORE_MEM, RetryClassifier
+from .tracing import TraceWriter
+from .profiling import PassProfiler
+from .metricsink import CGROUP_GLOBAL, LogMetricSink
+from .statusserver import StatusServer
+from .pressure import PressureController
+from .preempt import BackfillPreemptor, signal_tree
+from .scopelimits import ScopeLimits
+from .oom import MAX_RESUBMITS as OOM_MAX_RESUBMITS, OomDetector
+from .forecast import MemForecaster
+from .placement import CpuPlacer
+from .resourcedb import QUANTILES, ResourceDB, RunStats, feature_key
 from .filegraph import FileGraphManager
 from .scheduler import get_policy
-from .scheduler.base import SchedulerState
+from .scheduler.base import CandidateQueue, SchedulerState
 from .scheduler.timeframe import TimeframeFirstPolicy
-from .cache import TaskCache, compute_fingerprint, remove_done_flag
+from .cache import TaskCache, compute_fingerprint
+from .journal import Journal, JournalState, digest, replay
 from .alienv import get_alienv_software_environment
+from .taskenv import TaskEnvironments
 from .cleanup import EarlyFileRemover, archive_task_logs
 
 log = logging.getLogger(__name__)
 
 _UNIT_NAME_RE = re.compile(r"[^a-zA-Z0-9_\-.]")
 
+# what _speedup_root_init() probes for; journaled so a resume can skip it
+_ROOT_SPEEDUP_VARS = ("ROOT_LDSYSPATH", "CLING_LDSYSPATH",
+                      "ROOT_CPPSYSINCL", "CLING_CPPSYSINCL")
+
 
 def _unit_name(task_name: str, tid: int) -> str:
     """Build a valid systemd unit name for a per-task scope."""
@@ -53,26 +80,6 @@ def _unit_name(task_name: str, tid: int) -> str:
     return f"task-{safe}-{tid}.scope"
 
 
-def _start_stderr_drainer(pipe, logger: logging.Logger, tag: str) -> threading.Thread:
-    """Drain *pipe* line-by-line in a daemon thread, forwarding to *logger*.
-
-    Used to capture systemd-run's own informational messages (e.g. "Running
-    as unit: ...") and route them to the action log instead of the terminal.
-    The thread exits naturally when the pipe reaches EOF (process finished).
-    """
-    def _run() -> None:
-        try:
-            for raw in pipe:
-                line = raw.rstrip() if isinstance(raw, str) else raw.rstrip().decode(errors="replace")
-                if line:
-                    logger.info("[systemd] %s: %s", tag, line)
-        except Exception:
-            pass
-    t = threading.Thread(target=_run, daemon=True, name=f"stderr-{tag}")
-    t.start()
-    return t
-
-
 @dataclass
 class _TaskRuntime:
     """Everything we learn about a task at runtime and need to feed back."""
@@ -90,20 +97,35 @@ class WorkflowExecutor:
         config: RunnerConfig,
         workflow: Workflow,
         action_logger: logging.Logger,
-        metric_logger: logging.Logger,
+        metric_logger: Optional[logging.Logger],
         filegraph=None,
+        metric_sink=None,
     ):
         self.cfg = config
         self.filegraph = filegraph or FileGraphManager([], os.getpid(), action_logger)
         self.wf = workflow
         self.actionlog = action_logger
         self.metriclog = metric_logger
+        # monitor rows; --metric-format ndjson passes its own sink
+        self.metrics = metric_sink if metric_sink is not None else LogMetricSink(metric_logger)
+
+        # --resource-quantile: which learned statistic is booked per dimension
+        self.booked_stats = parse_resource_quantiles(config.resource_quantile)
+
+        # --resource-db: what earlier runs with the same feature key used
+        self.resource_db: Optional[ResourceDB] = None
+        self.resource_db_key = ""
+        self.run_stats = RunStats(QUANTILES + tuple(
+            float(s[1:]) for s in self.booked_stats.values() if s.startswith("p")))
+        if config.resource_db:
+            self._open_resource_db(config.resource_db, config.resource_db_key)
 
         # apply update-resources (before building resource manager)
         if config.update_resources:
             update_resource_estimates(
                 workflow, config.update_resources,
                 logger=action_logger,
+                stats=self.booked_stats,
             )
 
         # resource manager
@@ -128,6 +150,7 @@ class WorkflowExecutor:
                     cpu_relative=rel,
                     mem=float(task["resources"]["mem"]),
                     semaphore_string=task.get("semaphore"),
+                    mem_peak=task["resources"].get("mem_peak"),
                 )
             except ResourceLimitExceeded as e:
                 print(e, file=sys.stderr)
@@ -155,6 +178,10 @@ class WorkflowExecutor:
         # alternative alienv envs
         self.alternative_envs: Dict[int, Dict[str, str]] = {}
         self._init_alternative_envs()
+        # final launch env per task; built once the boot sequence has
+        # finished touching os.environ (see execute())
+        self.task_envs: Optional[TaskEnvironments] = None
+        self._dump_taskenvs = os.environ.get("PIPELINE_RUNNER_DUMP_TASKENVS") is not None
 
         # Compute the global cgroup directory for the aggregate monitor.
         # Cgroup monitoring is only meaningful when the runner was launched
@@ -173,6 +200,15 @@ class WorkflowExecutor:
                 if not os.path.isdir(_global_cgroup):
                     _global_cgroup = _runner_cgroup  # safety fallback
 
+        # where the scheduling loop's own time goes; see profiling.py
+        self.prof = PassProfiler()
+
+        # --hang-watchdog: (cpu %, min window s, walltime fraction)
+        self._hang: Optional[Tuple[float, float, float]] = (
+            parse_hang_spec(config.hang_watchdog) if config.hang_watchdog else None)
+        self._hung: Set[int] = set()           # killed by the watchdog, not yet reaped
+        self._hang_retried: Set[int] = set()
+
         # monitor
         self.monitor = MonitorThread(
             cpu_interval=config.monitor_interval_cpu,
@@ -181,17 +217,109 @@ class WorkflowExecutor:
             monitor_disc=bool(os.getenv("MONITOR_DISC_USAGE")),
             disc_path=os.getcwd(),
             global_cgroup_dir=_global_cgroup,
+            profiler=self.prof,
+            hang_cpu_pct=self._hang[0] if self._hang else None,
         )
 
+        # --psi-admission: fewer admissions while the kernel reports stalls
+        self.pressure: Optional[PressureController] = None
+        if config.psi_admission:
+            pc = PressureController(config.psi_admission, cgroup_dir=_global_cgroup)
+            if pc.available:
+                self.pressure = pc
+                action_logger.info("PSI admission control reading %s", pc.source)
+            else:
+                action_logger.warning("--psi-admission: no pressure information at %s; "
+                                      "admitting by bookings only", pc.source)
+
+        # --preempt-backfill: stop backfill trees to make room for default tasks
+        self.preemptor: Optional[BackfillPreemptor] = None
+        if config.preempt_backfill:
+            self.preemptor = BackfillPreemptor(self.rm, self.policy.sort_key(self.state),
+                                               action_logger)
+
+        # --scope-limits: each task's scope capped at its booking plus headroom
+        self.scope_limits: Optional[ScopeLimits] = None
+        if config.scope_limits:
+            if config.in_systemd_slice and config.systemd_slice_name:
+                self.scope_limits = ScopeLimits(config.scope_limits)
+            else:
+                action_logger.warning("--scope-limits needs --systemd-run; "
+                                      "tasks run without limits")
+
+        # --oom-resubmit: an OOM-killed task comes back with more memory
+        self.oom: Optional[OomDetector] = None
+        if config.oom_resubmit:
+            self.oom = OomDetector(_global_cgroup)
+            if self.oom.available:
+                action_logger.info("OOM kills recognised from %s; resubmitted with mem x%g",
+                                   self.oom.source, config.oom_resubmit)
+            else:
+                action_logger.warning("--oom-resubmit: neither memory.events nor /dev/kmsg "
+                                      "readable; a SIGKILL exit alone is not taken as an OOM kill")
+
+        # --mem-forecast: admit against where running tasks' PSS is heading
+        self.mem_forecaster: Optional[MemForecaster] = None
+        if config.mem_forecast is not None:
+            self.mem_forecaster = MemForecaster(config.mem_forecast)
+
+        # --cpu-placement: default-tier tasks pinned to CPU sets of their own
+        self.placer: Optional[CpuPlacer] = None
+        if config.cpu_placement != "off" and not config.dry_run:
+            self.placer = CpuPlacer.from_system(
+                config.cpu_placement,
+                in_scope=config.in_systemd_slice and bool(config.systemd_slice_name))
+        if self.placer is not None:
+            action_logger.info("CPU placement via %s: %d CPU(s) on %d NUMA node(s)",
+                               self.placer.method, self.placer.n_free(),
+                               len(self.placer.free))
+
         # process tracking
         self.proc_status: Dict[int, str] = {tid: "ToDo" for tid in range(workflow.n_tasks())}
         self.task_runtime: Dict[int, _TaskRuntime] = {}
-        self.process_list: List[Tuple[int, psutil.Popen]] = []
+        self.running: Dict[int, psutil.Popen] = {}
+        # wakes the wait loop as soon as a child exits
+        self.reaper = ChildReaper()
+        self.launcher = make_launcher(config.launcher, self.reaper, action_logger)
+        self._retired_launchers: List = []  # replaced after a launch failure
+        # systemd-run's own messages, from every scoped task, in one thread
+        self.stderr_mux = StderrMultiplexer(action_logger)
+        # tasks declared with cpu 0 and mem 0 bypass booking and monitoring
+        # entirely; one declaring memory keeps its booking on the normal path
+        self.light_lane: Optional[LightLane] = None
+        self.light_tids: Set[int] = set()
+        if config.light_lane_workers > 0 and not config.dry_run:
+            self.light_lane = LightLane(config.light_lane_workers, action_logger)
+            self.reaper.watch(self.light_lane.fileno(), self.light_lane.drain)
+            self.light_tids = {
+                tid for tid, task in enumerate(workflow.stages)
+                if self.rm.resources[tid].cpu_assigned_original == 0
+                and self.rm.resources[tid].mem_assigned_original == 0
+                and not task.get("semaphore")
+            }
+            action_logger.info("%d task(s) go to the light lane (%d workers)",
+                               len(self.light_tids), config.light_lane_workers)
         self.tids_marked_retry: List[int] = []
         self.retry_counter: List[int] = [0] * workflow.n_tasks()
+        self.oom_resubmits: List[int] = [0] * workflow.n_tasks()
         self.task_retries: List[int] = [
             int(t.get("retry_count", 0)) for t in workflow.stages
         ]
+        # --retry-rules: which failures are worth another attempt
+        self.retry_classifier: Optional[RetryClassifier] = None
+        if config.retry_rules:
+            self.retry_classifier = RetryClassifier.from_file(
+                config.retry_rules, mem_factor=config.retry_mem_factor)
+        # --journal; opened (and the previous run replayed) by execute()
+        self.journal = Journal(config.journal)
+        # --trace-file; opened by execute()
+        self.trace = TraceWriter(config.trace_file)
+        # --status-server; serves the last published status (_publish_status)
+        self.status_server = StatusServer(config.status_server, self._status_view)
+        self._status: Optional[Dict] = None
+        self._candidates: Optional[CandidateQueue] = None
+        self._n_done = 0
+        self._n_failed = 0
 
         # early file removal
         self.file_remover: Optional[EarlyFileRemover] = None
@@ -215,6 +343,9 @@ class WorkflowExecutor:
         signal.signal(signal.SIGTERM, self._sighandler)
         signal.siginterrupt(signal.SIGINT, False)
         signal.siginterrupt(signal.SIGTERM, False)
+        # kill -USR1 <runner>: self-profile so far, to the action log
+        signal.signal(signal.SIGUSR1, self._dump_profile)
+        signal.siginterrupt(signal.SIGUSR1, False)
 
     # ----- small helpers -----
     @staticmethod
@@ -255,6 +386,9 @@ class WorkflowExecutor:
         # Using walltime as the node weight gives a true makespan estimate;
         # using cpu (the fallback) preserves the original heuristic.
         cp_weight = walltime if has_walltime else cpu
+        # kept for the status server's remaining-work estimate
+        self._cp_weight = cp_weight
+        self._cp_in_seconds = has_walltime
         topo = kahn_topological_order(n, self.wf.forward_adj, self.wf.indegree)
         cp = longest_path_length(self.wf.forward_adj, topo, cp_weight)
 
@@ -290,9 +424,11 @@ class WorkflowExecutor:
         task = self.wf.stages[tid]
         return os.path.join(task.get("cwd", "."), f"{task['name']}.log")
 
-    def apply_global_env(self, env: Dict[str, str]) -> None:
-        for k, v in self.wf.global_env.items():
-            env.setdefault(k, str(v))
+    def build_task_envs(self) -> None:
+        self.task_envs = TaskEnvironments(
+            os.environ, self.wf.global_env, self.wf.stages, self.alternative_envs)
+        self.actionlog.info("Prepared %d distinct task environment(s)",
+                            self.task_envs.n_distinct())
 
     # ----- signal handling -----
     def _sighandler(self, signum, frame):
@@ -301,6 +437,9 @@ class WorkflowExecutor:
             self.monitor.stop()
         except Exception:
             pass
+        if self.preemptor is not None:
+            # a stopped process would hold on to the SIGTERM below
+            self.preemptor.resume_all(self.running, time.perf_counter())
         try:
             procs = psutil.Process().children(recursive=True)
         except psutil.NoSuchProcess:
@@ -321,8 +460,12 @@ class WorkflowExecutor:
                 pass
         sys.exit(1)
 
+    def _dump_profile(self, signum, frame):
+        self.prof.log_report(self.actionlog, "Scheduler self-profile (SIGUSR1):")
+
     # ----- task submission -----
-    def submit(self, tid: int, nice: int) -> Optional[psutil.Popen]:
+    def submit(self, tid: int, nice: int, light: bool = False) -> Optional[psutil.Popen]:
+        """Start *tid*; with *light*, on the light lane (no nice, no monitor)."""
         task = self.wf.stages[tid]
         self.actionlog.debug("Submitting %s with nice=%d", task["name"], nice)
         cmd = task["cmd"]
@@ -341,29 +484,30 @@ class WorkflowExecutor:
             # psutil.Popen so that the dry-run path also answers .nice()
             return psutil.Popen(["/bin/bash", "-c", dry], cwd=workdir)
 
-        env = os.environ.copy()
-        alt = self.alternative_envs.get(tid)
-        if alt:
+        if self.task_envs is None:
+            self.build_task_envs()
+        env = self.task_envs.get(tid)
+        if self.alternative_envs.get(tid):
             self.actionlog.info("Applying alternative environment to %s", task["name"])
-            if alt.get("TERM") is not None:
-                env = dict(alt)
-            else:
-                env.update(alt)
-        if task.get("env"):
-            env.update({k: str(v) for k, v in task["env"].items()})
-        self.apply_global_env(env)
 
-        if os.environ.get("PIPELINE_RUNNER_DUMP_TASKENVS") is not None:
+        if self._dump_taskenvs:
             try:
                 with open(f"taskenv_{tid}.log", "w") as f:
-                    json.dump(env, f, indent=2)
+                    json.dump(dict(env), f, indent=2)
             except OSError as e:
                 log.warning("could not dump taskenv: %s", e)
 
+        place = None
+        if self.placer is not None and not light and nice == self.rm.nice_default:
+            place = self.placer.allocate(tid, self.rm.resources[tid].cpu_assigned)
+            if place is not None:
+                self.actionlog.info("Placing %s on CPUs %s%s", task["name"], place.cpulist,
+                                    "" if place.node is None else f" (node {place.node})")
+
         # When the runner is inside a systemd slice, wrap each task in its own
         # child scope so per-task cgroup metrics are available alongside psutil.
         slice_name = self.cfg.systemd_slice_name
-        use_scope = self.cfg.in_systemd_slice and bool(slice_name)
+        use_scope = self.cfg.in_systemd_slice and bool(slice_name) and not light
         if use_scope:
             systemd_slice = (
                 slice_name if slice_name.endswith(".slice") else f"{slice_name}.slice"
@@ -372,25 +516,41 @@ class WorkflowExecutor:
             prefix = [
                 "systemd-run", "--user", "--scope", "--collect",
                 "--expand-environment=no",  # suppress the $VAR warning; bash handles expansion
-                f"--unit={unit}", f"--slice={systemd_slice}", "--",
+                f"--unit={unit}", f"--slice={systemd_slice}",
             ]
+            if self.scope_limits is not None:
+                res = self.rm.resources[tid]
+                lim = self.scope_limits.limit_for(
+                    tid, res.cpu_assigned, res.mem_assigned,
+                    self.rm.boundaries.cpu_limit, self.rm.boundaries.mem_limit)
+                prefix += lim.properties()
+                self.actionlog.debug("Scope limits for %s: %s", task["name"],
+                                     " ".join(lim.properties()[1::2]))
+            if place is not None:
+                prefix += self.placer.scope_properties(place)
+            prefix.append("--")
         else:
             prefix = []
 
         # a tracer has to sit inside any systemd scope, or it would only ever
         # see systemd-run itself
         inner_argv = self.filegraph.wrap(["/bin/bash", "-c", cmd], task["name"], tid)
+        if place is not None:
+            inner_argv = self.placer.wrap(place) + inner_argv
         launch_argv = prefix + inner_argv
 
-        if use_scope:
-            p = psutil.Popen(launch_argv, cwd=workdir, env=env, stderr=subprocess.PIPE)
-            _start_stderr_drainer(p.stderr, self.actionlog, task["name"])
+        if light:
+            p = self.light_lane.spawn(tid, launch_argv, workdir, env)
         else:
-            p = psutil.Popen(launch_argv, cwd=workdir, env=env)
-        try:
-            p.nice(nice)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            self.actionlog.error("Could not renice %d to %d", p.pid, nice)
+            try:
+                p = self.launcher.spawn(tid, launch_argv, workdir, env, nice,
+                                        capture_stderr=use_scope)
+            except LauncherError as e:
+                self._fall_back_to_popen(task["name"], e)
+                p = self.launcher.spawn(tid, launch_argv, workdir, env, nice,
+                                        capture_stderr=use_scope)
+        if use_scope:
+            self.stderr_mux.add(p.stderr, task["name"])
 
         rt = _TaskRuntime(
             logfile=self.logfile(tid),
@@ -399,42 +559,89 @@ class WorkflowExecutor:
             pid=p.pid,
         )
         self.task_runtime[tid] = rt
+        if light:
+            return p
         self.monitor.register(
             tid, p.pid, task["name"], task.get("labels", []) or [], rt.start_time,
             resolve_cgroup=use_scope,
+            scope_counters=use_scope and (self.scope_limits is not None
+                                          or self.oom is not None),
+            hang_window=self._hang_window(tid),
         )
         return p
 
+    def _fall_back_to_popen(self, name: str, err: LauncherError) -> None:
+        """The forkserver helper is gone or stuck: launch with popen from now on.
+
+        The old launcher is kept until the end of the run, so that the tasks
+        it did start still report their exit codes.
+        """
+        self.actionlog.error("Task launcher %s failed to start %s (%s); launching with "
+                             "popen from now on", self.launcher.name, name, err)
+        self._retired_launchers.append(self.launcher)
+        self.launcher = PopenLauncher(self.reaper, self.actionlog)
+
+    def _hang_window(self, tid: int) -> Optional[float]:
+        if self._hang is None:
+            return None
+        _, min_window, fraction = self._hang
+        walltime = self.wf.stages[tid].get("resources", {}).get("walltime")
+        return hang_window(min_window, fraction, walltime)
+
     # ----- skip logic -----
     def ok_to_skip(self, tid: int) -> bool:
-        return self.cache.is_done(self.logfile(tid), self._fingerprint_by_tid[tid])
+        t0 = self.prof.now()
+        done = self.cache.is_done(self.logfile(tid), self._fingerprint_by_tid[tid])
+        self.prof.add("ok_to_skip", t0)
+        return done
 
     # ----- candidate scheduling pass -----
     def try_submit_from_candidates(
         self,
-        candidates: List[int],
+        candidates: CandidateQueue,
         finished_out: List[int],
     ) -> None:
+        """One scheduling pass; skippable and submitted tasks leave *candidates*."""
+        t_pass = self.prof.now()
         self.scheduling_iteration += 1
+        self.prof.count("candidates", len(candidates))
 
-        # skip already-done tasks first (in place)
-        remaining = []
+        # skip already-done tasks first; zero-cost ones go to the light lane
         for tid in candidates:
             if self.ok_to_skip(tid):
+                candidates.discard(tid)
                 finished_out.append(tid)
+                self.journal.record("finish", tid=tid, rc=0, skipped=True)
+                self.trace.instant(tid, self.wf.id_to_name[tid], "skip")
                 self.actionlog.info("Skipping %s", self.wf.id_to_name[tid])
                 if self.file_remover is not None:
                     self.file_remover.on_task_done(self.wf.id_to_name[tid])
-            else:
-                remaining.append(tid)
-        # mutate the list the caller passed in
-        candidates[:] = remaining
-
-        ordered = self.policy.order(candidates, self.state)
+            elif tid in self.light_tids:
+                # no booking: never holds a slot a real task could use
+                p = self.submit(tid, self.rm.nice_default, light=True)
+                if p is not None:
+                    self.running[tid] = p
+                    candidates.discard(tid)
+                    self.journal.record("submit", tid=tid, nice=self.rm.nice_default,
+                                        light=True)
+                    self.trace.submit(tid, self.wf.id_to_name[tid], light=True)
+
+        t0 = self.prof.now()
+        ordered = candidates.ordered()
+        self.prof.add("order", t0)
+        # the generator runs between submits; time only its own share
+        pick_ns = 0
+        t0 = self.prof.now()
         for tid, nice in self.policy.pick_submittable(ordered, self.rm):
+            t_submit = self.prof.now()
+            pick_ns += t_submit - t0
             self.actionlog.debug("Submitting tid=%d %s (nice=%d)",
                                  tid, self.wf.id_to_name[tid], nice)
+            if self.preemptor is not None and nice == self.rm.nice_default:
+                self._preempt_for(tid)
             p = self.submit(tid, nice)
+            self.prof.add("submit", t_submit)
+            t0 = self.prof.now()
             if p is None:
                 continue
             # pin the nice value the OS actually granted
@@ -443,58 +650,158 @@ class WorkflowExecutor:
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 actual_nice = nice
             self.rm.book(tid, actual_nice)
-            self.process_list.append((tid, p))
-            if tid in candidates:
-                candidates.remove(tid)
+            self.running[tid] = p
+            self.journal.record("submit", tid=tid, nice=actual_nice)
+            res = self.rm.resources[tid]
+            self.trace.submit(tid, self.wf.id_to_name[tid], nice=actual_nice,
+                              cpu=res.cpu_assigned, mem=res.mem_assigned)
+            candidates.discard(tid)
+            t0 = self.prof.now()
+        self.prof.add_ns("pick", pick_ns + self.prof.now() - t0)
+        if self.preemptor is not None:
+            now = time.perf_counter()
+            for tid in self.preemptor.resume_fitting(self.running, now):
+                name = self.wf.id_to_name[tid]
+                self.actionlog.info("Resuming backfill task %s (stopped %.1fs so far)",
+                                    name, self.rm.resources[tid].suspended_seconds(now))
+                self.trace.instant(tid, name, "resume")
+        self.prof.add("try_submit", t_pass)
+
+    def _preempt_for(self, tid: int) -> None:
+        """Stop backfill tasks so that default-tier *tid* gets its cores."""
+        for victim in self.preemptor.make_room(tid, self.running, time.perf_counter()):
+            name = self.wf.id_to_name[victim]
+            self.actionlog.info("Suspending backfill task %s for %s", name,
+                                self.wf.id_to_name[tid])
+            self.trace.instant(victim, name, "suspend")
+
+    # ----- live status (--status-server) -----
+    def _critical_path_remaining(self, now: float) -> float:
+        """Longest remaining path to a leaf over running and queued tasks."""
+        cp, w = self.state.critical_path, self._cp_weight
+        remaining = 0.0
+        for tid in self.running:
+            done_part = 0.0
+            rt = self.task_runtime.get(tid)
+            if self._cp_in_seconds and rt is not None:
+                done_part = min(now - rt.start_time, w[tid])
+            remaining = max(remaining, cp[tid] - done_part)
+        for tid in self._candidates or ():
+            remaining = max(remaining, cp[tid])
+        return remaining
+
+    def _publish_status(self) -> None:
+        """Replace the status the server reads; a no-op without --status-server."""
+        if not self.status_server.address or self._candidates is None:
+            return
+        now = time.perf_counter()
+        rm = self.rm
+        running = []
+        for tid in self.running:
+            res = rm.resources[tid]
+            rt = self.task_runtime.get(tid)
+            if tid in self.light_tids:
+                bucket = "light"
+            elif res.suspended:
+                bucket = "suspended"
+            elif res.nice_value is not None and res.nice_value != rm.nice_default:
+                bucket = "backfill"
+            else:
+                bucket = "default"
+            running.append({
+                "tid": tid, "name": self.wf.id_to_name[tid], "bucket": bucket,
+                "nice": res.nice_value, "cpu_booked": res.cpu_assigned if res.booked else 0.0,
+                "mem_booked": res.mem_assigned if res.booked else 0.0,
+                "start": rt.start_time if rt is not None else now,
+            })
+            if self.placer is not None and tid in self.placer.placed:
+                running[-1]["cpus"] = self.placer.placed[tid].cpulist
+        n = self.wf.n_tasks()
+        n_running, n_queued = len(self.running), len(self._candidates)
+        lim = rm.boundaries
+        cp_remaining = self._critical_path_remaining(now)
+        # a new dict every time: readers hold on to the one they got
+        self._status = {
+            "workflow": os.path.abspath(self.cfg.workflowfile),
+            "iteration": self.scheduling_iteration,
+            "published": now,
+            "tasks": {
+                "total": n, "done": self._n_done, "failed": self._n_failed,
+                "running": n_running, "queued": n_queued,
+                "waiting": max(0, n - self._n_done - self._n_failed - n_running - n_queued),
+            },
+            "resources": {
+                "cpu_limit": lim.cpu_limit, "mem_limit": lim.mem_limit,
+                "mem_budget": rm.mem_budget(), "backfill_paused": rm.backfill_paused,
+                "default": {"n": rm.n_procs,
+                            "cpu_booked": rm.cpu_booked, "cpu_free": lim.cpu_limit - rm.cpu_booked,
+                            "mem_booked": rm.mem_booked, "mem_free": lim.mem_limit - rm.mem_booked,
+                            "mem_projected": rm.mem_excess},
+                "backfill": {"n": rm.n_procs_backfill, "n_max": rm.n_backfill_max,
+                             "cpu_booked": rm.cpu_booked_backfill,
+                             "cpu_free": lim.cpu_limit - rm.cpu_booked_backfill,
+                             "mem_booked": rm.mem_booked_backfill,
+                             "mem_free": lim.mem_limit - rm.mem_booked_backfill,
+                             "mem_projected": rm.mem_excess_backfill},
+                "suspended": {"n": rm.n_suspended, "cpu": rm.cpu_suspended},
+            },
+            "running": running,
+            "critical_path": {
+                "remaining": round(cp_remaining, 3),
+                "unit": "s" if self._cp_in_seconds else "cpu-weight",
+                "eta_s": round(cp_remaining, 3) if self._cp_in_seconds else None,
+            },
+        }
+
+    def _status_view(self) -> Optional[Dict]:
+        """Status-server thread: the published status plus the latest snapshots."""
+        base = self._status
+        if base is None:
+            return None
+        snapshots = self.monitor.latest()
+        now = time.perf_counter()
+        running = []
+        for entry in base["running"]:
+            e = dict(entry)
+            e["elapsed_s"] = round(now - e.pop("start"), 3)
+            snap = snapshots.get(e["tid"])
+            if snap is not None:
+                e.update(cpu_pct=snap.cpu_pct, pss_mb=snap.pss_mb, uss_mb=snap.uss_mb,
+                         swap_mb=snap.swap_mb, cgroup_cpu_pct=snap.cgroup_cpu_pct,
+                         cgroup_mem_mb=snap.cgroup_mem_mb, idle_s=snap.idle_s)
+            running.append(e)
+        view = dict(base, running=running)
+        view["uptime_s"] = round(now - self.start_time, 3)
+        view["age_s"] = round(now - view.pop("published"), 3)
+        return view
 
     # ----- wait / complete / retry -----
     def wait_for_any(
         self,
         finished_out: List[int],
         failing_out: List[int],
+        exited: Optional[Set[int]] = None,
     ) -> bool:
         """Return True if we should keep waiting (no completion this pass).
 
-        Polls each process via poll(); pulls latest monitor snapshot and
-        feeds it into the ResourceManager for the dynamic-resources path.
+        Polls the tasks in *exited* (what the reaper woke up for), or every
+        running task when None; feeds a new monitor tick, if there is one,
+        into the ResourceManager for the dynamic-resources path.
         """
-        if not self.process_list:
+        if not self.running:
             return False
 
-        # Take each monitor tick exactly once. This loop polls faster than the
-        # monitor fires, and a snapshot recorded twice both inflates the sample
-        # lists and defeats the "too few samples" guard in sample_resources().
-        snapshots = self.monitor.latest()
-        tick = self.monitor.tick
-
-        if tick != self._last_metric_tick:
-            self._last_metric_tick = tick
-            for tid, snap in snapshots.items():
-                self.rm.add_monitored(tid, snap.t_delta_ms,
-                                      snap.cpu_pct / 100.0, snap.pss_mb)
-                self.metriclog.info({
-                    "iter": tick, "name": snap.name,
-                    "cpu": snap.cpu_pct, "uss": snap.uss_mb, "pss": snap.pss_mb,
-                    "nice": snap.nice, "swap": snap.swap_mb,
-                    "label": snap.labels, "disc": snap.disc_mb,
-                    # cgroup-based readings for comparison with psutil (None when
-                    # no per-task scope is active)
-                    "cgroup_cpu": snap.cgroup_cpu_pct, "cgroup_mem": snap.cgroup_mem_mb,
-                })
-
-            # cgroup-aggregate slice totals
-            g_cpu = self.monitor.global_cpu_pct
-            g_mem = self.monitor.global_mem_mb
-            if g_cpu is not None or g_mem is not None:
-                self.metriclog.info({
-                    "iter": tick, "name": "__cgroup_global__",
-                    "cpu": g_cpu, "uss": None, "pss": g_mem,
-                    "nice": 0, "swap": None, "label": [], "disc": -1,
-                })
+        self._consume_monitor_tick()
 
         # check for completions
+        if self.cfg.dry_run or exited is None:
+            to_check = list(self.running)
+        else:
+            to_check = [tid for tid in exited if tid in self.running]
+        self.prof.count("polled", len(to_check))
         newly_done: List[Tuple[int, psutil.Popen, int]] = []
-        for tid, p in list(self.process_list):
+        for tid in to_check:
+            p = self.running[tid]
             rc = 0 if self.cfg.dry_run else p.poll()
             if rc is None:
                 continue
@@ -505,13 +812,39 @@ class WorkflowExecutor:
             name = self.wf.id_to_name[tid]
             self.actionlog.info("Task pid=%d tid=%d %s finished rc=%d",
                                 p.pid, tid, name, rc)
-            self.rm.unbook(tid)
+            if self.rm.resources[tid].booked:  # light-lane tasks never are
+                self.rm.unbook(tid, time.perf_counter())
+            if self.rm.resources[tid].suspended_total > 0:
+                self.actionlog.info("Task %s spent %.1fs suspended", name,
+                                    self.rm.resources[tid].suspended_total)
+            # whatever the outcome, the task may have touched its markers
+            self.cache.refresh(self.logfile(tid))
+            self.journal.record("finish", tid=tid, rc=rc)
+            self.trace.finish(tid, name, rc)
+            res = self.rm.resources[tid]
+            if self.cfg.dynamic_resources and res.cpu_sampled is not None:
+                self.journal.record("sample", tid=tid, cpu=res.cpu_sampled,
+                                    mem=res.mem_sampled)
             self.proc_status[tid] = "Done"
             self.monitor.deregister(tid)
-            self.process_list.remove((tid, p))
+            self.reaper.unregister(tid)
+            if self.scope_limits is not None:
+                self.scope_limits.forget(tid)
+            if self.mem_forecaster is not None:
+                self.mem_forecaster.forget(tid)
+            if self.placer is not None:
+                self.placer.release(tid)
+            del self.running[tid]
+            hung = tid in self._hung
+            self._hung.discard(tid)
+            oom_why = None
+            if self.oom is not None:
+                oom_why = self.oom.finished(tid, rc, ours=hung)  # hung: our own SIGKILL
 
             if rc == 0:
                 finished_out.append(tid)
+                if self.resource_db is not None:
+                    self._note_usage(tid)
                 # record fingerprint sidecar (best effort)
                 rt = self.task_runtime.get(tid)
                 if rt is not None:
@@ -522,11 +855,26 @@ class WorkflowExecutor:
                     archive_task_logs(self.logfile(tid), logger=self.actionlog)
             else:
                 print(f"{name} failed ... checking retry")
+                if oom_why is not None and self._resubmit_after_oom(tid, oom_why):
+                    self.tids_marked_retry.append(tid)
+                    continue
+                if hung and self.cfg.hang_action == "retry" and tid not in self._hang_retried:
+                    # once, outside --retry-on-failure; a second hang is a failure
+                    self._hang_retried.add(tid)
+                    self.actionlog.info("Task %s marked for retry after a hang", name)
+                    self.tids_marked_retry.append(tid)
+                    continue
+                if hung and self.cfg.hang_action == "fail":
+                    failure_detected = True
+                    failing_out.append(tid)
+                    continue
                 max_retries = max(self.cfg.retry_on_failure, self.task_retries[tid])
-                if self._is_worth_retrying(tid) and self.retry_counter[tid] < max_retries:
+                if self.retry_counter[tid] < max_retries and self._is_worth_retrying(tid):
                     self.actionlog.info("Task %s marked for retry", name)
                     self.tids_marked_retry.append(tid)
                     self.retry_counter[tid] += 1
+                    self.journal.record("retry", tid=tid, count=self.retry_counter[tid])
+                    self.trace.instant(tid, name, "retry")
                 else:
                     failure_detected = True
                     failing_out.append(tid)
@@ -539,8 +887,153 @@ class WorkflowExecutor:
 
         return not finished_out
 
+    def _forecast_mem(self, tid: int, t: float, pss: float) -> None:
+        res = self.rm.resources[tid]
+        before = res.mem_excess
+        projected = self.mem_forecaster.observe(tid, t, pss, res.learned_peak())
+        if self.rm.project_mem(tid, projected) > 0 and before == 0:
+            self.actionlog.info("Task %s heads for %.0f MB within %gs (booked %.0f MB); "
+                                "admitting against that", self.wf.id_to_name[tid],
+                                projected, self.mem_forecaster.horizon, res.mem_assigned)
+
+    def _consume_monitor_tick(self) -> None:
+        """Record the monitor's latest tick, once.
+
+        The wait loop wakes on every completion as well as on the monitor
+        cadence, and a snapshot recorded twice both inflates the sample
+        lists and defeats the "too few samples" guard in sample_resources().
+        """
+        # one locked read: snapshots newer than the tick would be folded in again
+        tick, snapshots = self.monitor.latest_tick()
+        if tick == self._last_metric_tick:
+            return
+        self._last_metric_tick = tick
+        if self.pressure is not None:
+            change = self.pressure.update(self.rm)
+            if change:
+                self.actionlog.info("Pressure: %s", change)
+        self._publish_status()
+        now = time.perf_counter()
+        for tid, snap in snapshots.items():
+            res = self.rm.resources[tid]
+            suspended_s = None
+            if self.preemptor is not None:
+                suspended_s = round(res.suspended_seconds(now), 3)
+            cpu, mem = snap.cpu_pct / 100.0, snap.pss_mb
+            if self.scope_limits is not None and snap.scope_counters:
+                cpu, mem = self._scope_feedback(tid, snap.scope_counters, cpu, mem)
+            if self.oom is not None:
+                self.oom.note_scope(tid, snap.scope_counters)
+            if res.suspended:
+                # stopped on purpose; idle, but not hung
+                if self._hang is not None:
+                    self.monitor.reset_idle(tid)
+            elif snap.hung and tid not in self._hung and tid in self.running:
+                self._kill_hung(tid, snap.idle_s)
+            # a stopped task's zero CPU says nothing about what it needs
+            if not res.suspended:
+                self.rm.add_monitored(tid, snap.t_delta_ms, cpu, mem)
+                if self.mem_forecaster is not None and snap.mem_fresh and res.booked:
+                    self._forecast_mem(tid, snap.t_delta_ms / 1000.0, snap.pss_mb)
+            self.metrics.row(tick, snap.name, snap.cpu_pct, snap.uss_mb, snap.pss_mb,
+                             snap.nice, snap.swap_mb, snap.labels, snap.disc_mb,
+                             snap.cgroup_cpu_pct, snap.cgroup_mem_mb, suspended_s)
+
+        if self.trace.enabled:
+            rm = self.rm
+            self.trace.counters(
+                rm.cpu_booked + rm.cpu_booked_backfill,
+                sum(max(sn.cpu_pct, 0.0) for sn in snapshots.values()) / 100.0,
+                rm.mem_booked + rm.mem_booked_backfill,
+                sum(sn.pss_mb for sn in snapshots.values()),
+            )
+
+        # cgroup-aggregate slice totals
+        g_cpu = self.monitor.global_cpu_pct
+        g_mem = self.monitor.global_mem_mb
+        if g_cpu is not None or g_mem is not None:
+            self.metrics.row(tick, CGROUP_GLOBAL, g_cpu, None, g_mem, 0, None, [], -1)
+
+    def _scope_feedback(self, tid: int, counters: Dict[str, int],
+                        cpu: float, mem: float) -> Tuple[float, float]:
+        """Log what the scope limits did since the last tick; adjust the sample.
+
+        A task throttled at its CPUQuota, or reclaimed at MemoryHigh, was held
+        below what it asked for, so the sampler gets the limit instead.
+        """
+        events = self.scope_limits.new_events(tid, counters)
+        lim = self.scope_limits.limits.get(tid)
+        if not events or lim is None:
+            return cpu, mem
+        name = self.wf.id_to_name[tid]
+        if events.get("throttled_usec") and lim.cpu is not None:
+            self.actionlog.info("Task %s throttled at CPUQuota %.2f cores: %.2fs in %d period(s)",
+                                name, lim.cpu, events["throttled_usec"] / 1e6,
+                                events.get("nr_throttled", 0))
+            cpu = max(cpu, lim.cpu)
+        if events.get("high") and lim.mem_high is not None:
+            self.actionlog.info("Task %s over MemoryHigh %.0f MB %d time(s)",
+                                name, lim.mem_high, events["high"])
+            mem = max(mem, lim.mem_high)
+        if events.get("oom_kill") and lim.mem_max is not None:
+            self.actionlog.warning("Task %s hit MemoryMax %.0f MB: %d OOM kill(s)",
+                                   name, lim.mem_max, events["oom_kill"])
+            mem = max(mem, lim.mem_max)
+            self.trace.instant(tid, name, "oom")
+        return cpu, mem
+
+    def _kill_hung(self, tid: int, idle_s: float) -> None:
+        """SIGKILL a task the hang watchdog flagged; reaped by wait_for_any()."""
+        name = self.wf.id_to_name[tid]
+        self.actionlog.warning("Task %s looks hung: below %g%% CPU for %.0fs (window %.0fs); "
+                               "killing it (%s)", name, self._hang[0], idle_s,
+                               self._hang_window(tid), self.cfg.hang_action)
+        self._hung.add(tid)
+        signal_tree(self.running[tid].pid, signal.SIGKILL)
+        self.trace.instant(tid, name, "hang")
+
+    def _resubmit_after_oom(self, tid: int, why: str) -> bool:
+        """Raise the booking of an OOM-killed task for another attempt.
+
+        False when the booking is already at --mem-limit, or the task was
+        resubmitted MAX_RESUBMITS times already, which leaves only the normal
+        retry path.
+        """
+        name = self.wf.id_to_name[tid]
+        res = self.rm.resources[tid]
+        if res.mem_assigned >= self.rm.boundaries.mem_limit:
+            self.actionlog.warning("Task %s OOM-killed (%s) with mem at the limit "
+                                   "(%.0f MB); not resubmitting", name, why, res.mem_assigned)
+            return False
+        if self.oom_resubmits[tid] >= OOM_MAX_RESUBMITS:
+            self.actionlog.warning("Task %s OOM-killed (%s) after %d resubmission(s); "
+                                   "not resubmitting", name, why, self.oom_resubmits[tid])
+            return False
+        self.oom_resubmits[tid] += 1
+        old, new = self.rm.raise_mem(tid, self.cfg.oom_resubmit, siblings=True)
+        self.actionlog.warning("Task %s OOM-killed (%s); resubmitting with mem %.0f MB "
+                               "(was %.0f)", name, why, new, old)
+        self.journal.record("mem", tid=tid, mem=new)
+        self.trace.instant(tid, name, "oom")
+        return True
+
     def _is_worth_retrying(self, tid: int) -> bool:
-        """Hook for future log-inspection; currently always True (match prototype)."""
+        """Ask the --retry-rules about the task's log; True without rules (prototype)."""
+        if self.retry_classifier is None:
+            return True
+        action, rule = self.retry_classifier.classify(self.logfile(tid))
+        if rule is None:
+            return True
+        name = self.wf.id_to_name[tid]
+        self.actionlog.info("Task %s failure matches '%s' -> %s (%d so far)",
+                            name, rule.name, action,
+                            self.retry_classifier.counts[rule.name])
+        if action == NO_RETRY:
+            return False
+        if action == RETRY_MORE_MEM:
+            old, new = self.rm.raise_mem(tid, self.retry_classifier.factor_for(rule))
+            self.actionlog.info("Task %s retries with mem %.0f MB (was %.0f)", name, new, old)
+            self.journal.record("mem", tid=tid, mem=new, siblings=False)
         return True
 
     def _cat_logfiles(self, tids: List[int]) -> None:
@@ -556,14 +1049,67 @@ class WorkflowExecutor:
                 print(f" <---- END OF LOGFILE {logf} -----")
 
     def stop_and_exit(self) -> None:
-        for _, p in self.process_list:
+        if self.preemptor is not None:
+            # SIGKILL reaches only the root; stopped descendants would stay stopped
+            self.preemptor.resume_all(self.running, time.perf_counter())
+        for p in self.running.values():
             try:
                 p.kill()
             except Exception:
                 pass
+        self.journal.close()
+        self.trace.close()
+        self.metrics.close()
+        if self.oom is not None:
+            self.oom.close()
+        self._store_resource_db()
+        self.status_server.stop()
         self.monitor.stop()
         sys.exit(1)
 
+    # ----- resource db -----
+    def _open_resource_db(self, path: str, key_vars: str) -> None:
+        self.resource_db_key = feature_key(key_vars, {**os.environ, **self.wf.global_env})
+        try:
+            db = ResourceDB(path)
+            learned = db.stats(self.resource_db_key)
+        except (OSError, sqlite3.Error) as e:
+            self.actionlog.warning("--resource-db %s: %s; not used", path, e)
+            return
+        self.resource_db = db
+        if learned:
+            apply_resource_estimates(self.wf, learned,
+                                     f"{path} [{self.resource_db_key}]",
+                                     logger=self.actionlog, stats=self.booked_stats)
+        else:
+            self.actionlog.info("Resource db %s: nothing learned yet for %s",
+                                path, self.resource_db_key)
+
+    def _note_usage(self, tid: int) -> None:
+        """What finished *tid* used, for the resource db; needs real samples."""
+        res = self.rm.resources[tid]
+        if res.samples.n < 3:
+            return
+        lifetime = None
+        rt = self.task_runtime.get(tid)
+        if rt is not None and res.nice_value == self.rm.nice_default:
+            # as json-stat: backfill walltimes say nothing about the default tier
+            lifetime = time.perf_counter() - rt.start_time - res.suspended_total
+        self.run_stats.add(global_task_name(self.wf.stages[tid]),
+                           res.samples.cpu_mean(), res.samples.mem_max, lifetime)
+
+    def _store_resource_db(self) -> None:
+        if self.resource_db is None or not len(self.run_stats) or self.cfg.dry_run:
+            return
+        try:
+            self.resource_db.merge(self.resource_db_key, self.run_stats.elementary())
+        except sqlite3.Error as e:
+            self.actionlog.warning("Resource db %s not updated: %s", self.resource_db.path, e)
+            return
+        self.actionlog.info("Resource db %s: %d task name(s) merged into %s",
+                            self.resource_db.path, len(self.run_stats), self.resource_db_key)
+        self.resource_db = None  # once per run
+
     # ----- boot helpers -----
     def _speedup_root_init(self) -> None:
         if platform.system() != "Linux":
@@ -590,16 +1136,20 @@ class WorkflowExecutor:
         except Exception as e:
             log.warning("ROOT init speedup failed: %s", e)
 
-    def _execute_global_init_cmd(self) -> bool:
+    def _execute_global_init_cmd(self, resumed: JournalState) -> bool:
         cmd = self.wf.global_init_cmd
         if not cmd:
             return True
+        if resumed.init_cmd == digest(cmd):
+            self.actionlog.info("Global init cmd already ran (journal); not repeating it")
+            return True
         self.actionlog.info("Executing global init cmd: %s", cmd)
         p = subprocess.Popen(["/bin/bash", "-c", cmd],
                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         stdout, stderr = p.communicate()
         if p.returncode == 0:
             self.actionlog.info(stdout.decode())
+            self.journal.record("init", cmd=digest(cmd))
             return True
         self.actionlog.error("global init failed: %s", stderr.decode())
         return False
@@ -618,13 +1168,58 @@ class WorkflowExecutor:
                     name = self.wf.id_to_name[d]
                     self.actionlog.info("Marking %s for rerun", name)
                     if not self.cfg.dry_run:
-                        remove_done_flag(self.logfile(d))
+                        self.cache.remove_done(self.logfile(d))
                     else:
                         print(f"Would mark {name} as to be done again")
         if not matched:
             print(f"No task matching {self.cfg.rerun_from} found; refusing to proceed")
             sys.exit(1)
 
+    # ----- journal -----
+    def _replay_journal(self) -> JournalState:
+        if not self.cfg.journal:
+            return JournalState()
+        state = replay(self.cfg.journal, self.cfg.workflowfile, self.wf.id_to_name)
+        if not state.empty:
+            self.actionlog.info("Journal %s: resuming from %d recorded event(s)",
+                                self.cfg.journal, state.n_events)
+        # the ROOT speedup probes are skipped when these are already set
+        for k, v in state.env.items():
+            os.environ.setdefault(k, v)
+        return state
+
+    def _resume_from_journal(self, state: JournalState, ready: ReadyTracker) -> List[int]:
+        """Apply a replayed journal; return the initial candidates.
+
+        A task counts as finished only if the journal says so, its needs
+        were accepted as finished as well, and ok_to_skip() agrees now.
+        """
+        for tid, n in state.retry_counter.items():
+            self.retry_counter[tid] = n
+        if self.cfg.dynamic_resources:
+            for tid, (cpu, mem) in state.sampled.items():
+                self.rm.restore_sampled(tid, cpu, mem)
+        for tid, mem in state.mem_raised.items():
+            self.rm.restore_mem(tid, mem)
+        for tid, mem in state.mem_raised_own.items():
+            self.rm.restore_mem(tid, mem, siblings=False)
+        accepted = 0
+        order = kahn_topological_order(self.wf.n_tasks(), self.wf.forward_adj,
+                                       self.wf.indegree)
+        for tid in order:
+            if (tid in state.finished and ready.remaining[tid] == 0
+                    and self.ok_to_skip(tid)):
+                ready.complete(tid)
+                self.proc_status[tid] = "Done"
+                accepted += 1
+                if self.file_remover is not None:
+                    self.file_remover.on_task_done(self.wf.id_to_name[tid])
+        self.actionlog.info("Journal: %d task(s) finished before, %d stale entr%s ignored",
+                            accepted, len(state.finished) - accepted,
+                            "y" if len(state.finished) - accepted == 1 else "ies")
+        return [tid for tid in range(self.wf.n_tasks())
+                if ready.remaining[tid] == 0 and not ready.is_complete(tid)]
+
     # ----- bash-script emission -----
     def produce_script(self, filename: str) -> None:
         topo = kahn_topological_order(self.wf.n_tasks(),
@@ -652,11 +1247,16 @@ class WorkflowExecutor:
         with open(filename, "w") as f:
             f.writelines(lines)
 
+    def _add_candidate(self, candidates: CandidateQueue, tid: int) -> None:
+        candidates.add(tid)
+        self.trace.ready(tid, self.wf.id_to_name[tid])
+
     # ----- main loop -----
     def execute(self) -> bool:
         self.start_time = time.perf_counter()
         psutil.cpu_percent(interval=None)
         os.environ["JOBUTILS_SKIPDONE"] = "ON"
+        resumed = self._replay_journal()
         self._speedup_root_init()
 
         if not os.path.isdir("./.tmp"):
@@ -677,17 +1277,38 @@ class WorkflowExecutor:
             self.produce_script(self.cfg.produce_script)
             return False
 
-        if not self._execute_global_init_cmd():
+        self.journal.header(self.cfg.workflowfile, self.wf.id_to_name)
+        self.trace.open(self.start_time)
+        root_env = {k: os.environ[k] for k in _ROOT_SPEEDUP_VARS if k in os.environ}
+        if root_env:
+            self.journal.record("env", vars=root_env)
+
+        if not self._execute_global_init_cmd(resumed):
             sys.exit(1)
 
         self._handle_rerun_from()
 
+        # os.environ is final from here on
+        self.build_task_envs()
+        if not self.cfg.dry_run:
+            self.launcher.start()
+
         # start monitor
         self.monitor.start()
-
-        # initial candidates: tasks with no predecessors
-        candidates = [i for i, d in enumerate(self.wf.indegree) if d == 0]
-        finishedtasks_set: Set[int] = set()
+        self.status_server.start()
+
+        # initial candidates: tasks with no predecessors. A task becomes a
+        # candidate when the last of its needs completes; the tracker keeps
+        # the remaining-needs count per task so that costs O(out-degree).
+        ready = ReadyTracker(self.wf.forward_adj, self.wf.indegree)
+        candidates = CandidateQueue(self.policy, self.state)
+        initial = ready.roots()
+        if not resumed.empty:
+            initial = self._resume_from_journal(resumed, ready)
+        for tid in initial:
+            self._add_candidate(candidates, tid)
+        self._candidates = candidates
+        self._n_done = sum(1 for s in self.proc_status.values() if s == "Done")
         error_encountered = False
 
         try:
@@ -696,64 +1317,73 @@ class WorkflowExecutor:
                 self.actionlog.debug("candidates: %s",
                                      [(c, self.wf.id_to_name[c]) for c in candidates])
                 self.try_submit_from_candidates(candidates, finished)
+                self._publish_status()
 
-                if candidates and not self.process_list:
+                if candidates and not self.running:
                     self._noprogress_error()
                     error_encountered = True
                     break
 
-                # wait loop
+                # wait loop: sleep until a child exits, or at the latest
+                # until the next monitor tick is due
                 finished_running: List[int] = []
                 failing: List[int] = []
-                poll_delay = 0.1  # adaptive; grows up to 1s
-                while self.wait_for_any(finished_running, failing):
+                exited: Set[int] = set()
+                while True:
+                    t0 = self.prof.now()
+                    keep_waiting = self.wait_for_any(finished_running, failing, exited)
+                    self.prof.add("wait_for_any", t0)
+                    if not keep_waiting:
+                        break
                     if not self.cfg.dry_run:
-                        time.sleep(poll_delay)
-                        poll_delay = min(1.0, poll_delay * 1.5)
-                    else:
-                        time.sleep(0.001)
+                        exited = self.reaper.wait(self.cfg.monitor_interval_cpu)
 
                 finished.extend(finished_running)
-                finishedtasks_set.update(finished)
+                self._n_done += len(finished)
+                self._n_failed += len(failing)
 
-                # take failed tasks out of the "finished" accounting
+                # failed tasks never complete; their successors stay blocked
                 if failing:
                     error_encountered = True
-                    fs = set(failing)
-                    finished = [x for x in finished if x not in fs]
-                    finishedtasks_set.difference_update(fs)
-
-                # retries go back onto the candidate list
-                if self.tids_marked_retry:
-                    rs = set(self.tids_marked_retry)
-                    finished = [x for x in finished if x not in rs]
-                    finishedtasks_set.difference_update(rs)
-                    for t in self.tids_marked_retry:
-                        if t not in candidates:
-                            candidates.append(t)
-                    self.tids_marked_retry.clear()
-
-                # new candidates: successors whose all needs are done
+
+                # retries go back onto the candidate list without completing
+                for t in self.tids_marked_retry:
+                    self._add_candidate(candidates, t)
+                self.tids_marked_retry.clear()
+
+                # new candidates: successors whose last need just completed
                 for tid in finished:
-                    for succ in self.wf.forward_adj[tid]:
-                        if succ in candidates:
-                            continue
-                        if self.proc_status[succ] != "ToDo":
-                            continue
-                        preds = self.wf.reverse_adj[succ]
-                        if all(p in finishedtasks_set for p in preds):
-                            candidates.append(succ)
-
-                self.actionlog.debug("new candidates %s", candidates)
-
-                if not candidates and not self.process_list:
+                    for succ in ready.complete(tid):
+                        self._add_candidate(candidates, succ)
+
+                self.actionlog.debug("new candidates %s", list(candidates))
+
+                if not candidates and not self.running:
                     break
         except Exception:
             traceback.print_exc()
             self._sighandler(0, None)
 
+        self.prof.log_report(self.actionlog, "Scheduler self-profile:")
+        self._publish_status()
+        self.status_server.stop()
+        self.trace.close()
+        for launcher in self._retired_launchers + [self.launcher]:
+            launcher.stop()
+        if self.light_lane is not None:
+            self.reaper.unwatch(self.light_lane.fileno())
+            self.light_lane.shutdown()
+        self.journal.close()
+        self.stderr_mux.close()
+        if self.retry_classifier is not None and self.retry_classifier.counts:
+            self.actionlog.info("Retry classification: %s", self.retry_classifier.summary())
+        self.reaper.close()
         self.monitor.stop()
         self.monitor.join(timeout=2)
+        self.metrics.close()
+        if self.oom is not None:
+            self.oom.close()
+        self._store_resource_db()
         end = time.perf_counter()
         msg = "with failures" if error_encountered else "success"
         print(f"\n**** Pipeline done {msg} (global_runtime : {end - self.start_time:.3f}s) *****\n")
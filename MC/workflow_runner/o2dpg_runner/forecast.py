@@ -0,0 +1,79 @@
+"""Projecting the PSS of running tasks, for admission.
+
+Admission compared bookings only, and a task's memory is only read every
+--monitor-interval-mem. Digitizers and tpcreco ramp steeply: a task booked
+at 2 GB could be on its way to 4 GB while new tasks were admitted into what
+looked free, and the node went over --mem-limit. With ``--mem-forecast
+[HORIZON]`` each fresh PSS reading of a running task updates its trend, an
+exponentially smoothed slope between readings, and its memory HORIZON
+seconds ahead (default 30) is projected as
+
+  reading + max(trend, 0) x HORIZON
+
+While the reading is below the task's learned peak the projection stops
+there. The learned peak is pss.max from --update-resources / --resource-db
+or the largest peak measured on its finished siblings, whichever is
+larger. Once a task is past it, the peak was wrong and the trend alone
+counts.
+
+The ResourceManager counts each running task at max(booking, projection)
+when admitting (fits_default, fits_backfill, mem_free_default). A task that
+stays flat or shrinks is counted at its booking, as before.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HORIZON = 30.0  # s
+SMOOTHING = 0.5         # weight of the newest slope
+
+
+class PssTrend:
+    """The last PSS reading of one task and its smoothed slope (MB/s)."""
+    __slots__ = ("t", "mem", "slope")
+
+    def __init__(self):
+        self.t: Optional[float] = None
+        self.mem = 0.0
+        self.slope: Optional[float] = None
+
+    def add(self, t: float, mem: float) -> None:
+        if self.t is not None:
+            if t <= self.t:
+                return
+            s = (mem - self.mem) / (t - self.t)
+            self.slope = s if self.slope is None else SMOOTHING * s + (1 - SMOOTHING) * self.slope
+        self.t = t
+        self.mem = mem
+
+    def projected(self, horizon: float, peak: Optional[float] = None) -> float:
+        """PSS *horizon* seconds from the last reading."""
+        proj = self.mem + max(self.slope or 0.0, 0.0) * horizon
+        if peak is not None and self.mem < peak:
+            proj = min(proj, peak)
+        return proj
+
+
+class MemForecaster:
+    """A PssTrend per running task."""
+
+    def __init__(self, horizon: float = DEFAULT_HORIZON):
+        if horizon < 0:
+            raise ValueError(f"--mem-forecast {horizon}: the horizon must not be negative")
+        self.horizon = horizon
+        self._trends: Dict[int, PssTrend] = {}
+
+    def observe(self, tid: int, t: float, mem: float, peak: Optional[float] = None) -> float:
+        """Feed a fresh reading of *tid* (time *t* in s); return its projection."""
+        trend = self._trends.get(tid)
+        if trend is None:
+            trend = self._trends[tid] = PssTrend()
+        trend.add(t, mem)
+        return trend.projected(self.horizon, peak)
+
+    def forget(self, tid: int) -> None:
+        self._trends.pop(tid, None)
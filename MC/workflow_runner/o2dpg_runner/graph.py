@@ -145,6 +145,41 @@ def longest_path_length(
     return lp
 
 
+class ReadyTracker:
+    """Release nodes as their last predecessor completes.
+
+    Keeps a remaining-predecessor counter per node, seeded from the
+    ``indegree`` array of build_adjacency(), so completing a node costs
+    O(out-degree) regardless of how many predecessors its successors have.
+    complete() is idempotent: a node only releases its successors once,
+    however often it is reported.
+    """
+
+    def __init__(self, forward_adj: List[List[int]], indegree: List[int]):
+        self.forward_adj = forward_adj
+        self.remaining = list(indegree)
+        self.completed = bytearray(len(indegree))
+
+    def roots(self) -> List[int]:
+        return [i for i, d in enumerate(self.remaining) if d == 0]
+
+    def is_complete(self, node: int) -> bool:
+        return bool(self.completed[node])
+
+    def complete(self, node: int) -> List[int]:
+        """Mark ``node`` done; return the successors that became ready."""
+        if self.completed[node]:
+            return []
+        self.completed[node] = 1
+        ready: List[int] = []
+        remaining = self.remaining
+        for v in self.forward_adj[node]:
+            remaining[v] -= 1
+            if remaining[v] == 0:
+                ready.append(v)
+        return ready
+
+
 def invert_adj(forward_adj: List[List[int]]) -> List[List[int]]:
     """Compute reverse adjacency from forward adjacency."""
     n = len(forward_adj)
@@ -0,0 +1,157 @@
+"""Write-ahead journal of runner state, for resuming after a crash.
+
+A runner killed by a GRID preemption or a node OOM used to come back
+knowing nothing: it stat'ed every ``<task>.log_done`` level by level,
+repeated the global init and the ROOT speedup probes, and started over
+without the retry counters and the resource samples it had learnt.
+
+With ``--journal PATH`` every state transition is appended to PATH, one
+JSON object per line, written through to the kernel as it happens (so it
+survives the runner being killed, not the node losing power):
+
+  {"ev": "header", "workflow": ..., "n_tasks": n, "tasks": <digest>}
+  {"ev": "env", "vars": {...}}               ROOT speedup results
+  {"ev": "init", "cmd": <digest>}            global init succeeded
+  {"ev": "submit", "tid": t, "nice": n}
+  {"ev": "finish", "tid": t, "rc": rc}       rc 0 also for skipped tasks
+  {"ev": "retry", "tid": t, "count": c}
+  {"ev": "sample", "tid": t, "cpu": c, "mem": m}   --dynamic-resources
+  {"ev": "mem", "tid": t, "mem": m}          booking raised after an OOM kill
+  {"ev": "mem", "tid": t, "mem": m, "siblings": false}
+                                             ... by a retry-more-mem rule
+
+A restarted runner given the same journal replays it first (replay())
+and appends to it after a new header. Tasks are referred to by tid, so a
+header whose workflow, task count or task names differ discards what came
+before it. A torn last line is ignored. What replay claims is validated
+by the executor: a task only counts as finished if its ``_done`` file
+still says so.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+
+def digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8", "replace"))
+        h.update(b"\x1f")
+    return h.hexdigest()[:16]
+
+
+def task_digest(names: List[str]) -> str:
+    return digest(*names)
+
+
+@dataclass
+class JournalState:
+    """What a journal says about a previous run of the same workflow."""
+    env: Dict[str, str] = field(default_factory=dict)
+    init_cmd: Optional[str] = None        # digest of the global init that ran
+    finished: Set[int] = field(default_factory=set)   # rc == 0, last word
+    retry_counter: Dict[int, int] = field(default_factory=dict)
+    sampled: Dict[int, Tuple[float, float]] = field(default_factory=dict)
+    mem_raised: Dict[int, float] = field(default_factory=dict)      # siblings too
+    mem_raised_own: Dict[int, float] = field(default_factory=dict)  # the task alone
+    n_events: int = 0
+
+    @property
+    def empty(self) -> bool:
+        return self.n_events == 0
+
+
+def replay(path: str, workflow_file: str, names: List[str]) -> JournalState:
+    """Read *path*; return the state of the last run of this workflow."""
+    state = JournalState()
+    if not os.path.exists(path):
+        return state
+    want = (os.path.abspath(workflow_file), len(names), task_digest(names))
+    matching = False
+    with open(path, "rb") as f:
+        for lineno, raw in enumerate(f, 1):
+            try:
+                ev = json.loads(raw)
+            except ValueError:
+                # a line torn by the crash we are recovering from
+                log.warning("journal %s: ignoring unreadable line %d", path, lineno)
+                continue
+            kind = ev.get("ev")
+            if kind == "header":
+                same = (ev.get("workflow"), ev.get("n_tasks"), ev.get("tasks")) == want
+                if not same:
+                    state = JournalState()
+                matching = same
+                continue
+            if not matching:
+                continue
+            state.n_events += 1
+            tid = ev.get("tid")
+            if kind == "finish":
+                if ev.get("rc") == 0:
+                    state.finished.add(tid)
+                else:
+                    state.finished.discard(tid)
+            elif kind == "submit":
+                state.finished.discard(tid)
+            elif kind == "retry":
+                state.retry_counter[tid] = int(ev["count"])
+            elif kind == "sample":
+                state.sampled[tid] = (float(ev["cpu"]), float(ev["mem"]))
+            elif kind == "mem":
+                raised = state.mem_raised if ev.get("siblings", True) else state.mem_raised_own
+                raised[tid] = float(ev["mem"])
+            elif kind == "env":
+                state.env.update(ev.get("vars") or {})
+            elif kind == "init":
+                state.init_cmd = ev.get("cmd")
+    return state
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class Journal:
+    """Append-only writer; one line per event, flushed as written.
+
+    Does nothing without a path, and records nothing before header().
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._f = None
+
+    def header(self, workflow_file: str, names: List[str]) -> None:
+        if not self.path:
+            return
+        if self._f is None:
+            # line buffered: each event reaches the kernel when it is recorded
+            self._f = open(self.path, "a", buffering=1)
+            if self._f.tell() > 0 and not _ends_with_newline(self.path):
+                self._f.write("\n")  # don't glue our header to a torn line
+        self.record("header", workflow=os.path.abspath(workflow_file),
+                    n_tasks=len(names), tasks=task_digest(names))
+
+    def record(self, ev: str, **fields) -> None:
+        if self._f is None:
+            return
+        fields["ev"] = ev
+        fields["t"] = round(time.time(), 3)
+        self._f.write(json.dumps(fields, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
@@ -0,0 +1,173 @@
+"""Task-spawning helper process for ``--launcher forkserver``.
+
+Runs as its own small interpreter (``python -I -S launch_helper.py R W``),
+started by launcher.ForkserverLauncher before the runner has grown. It
+forks the tasks instead of the runner, so a launch costs a fork of this
+process rather than of the runner with its workflow, monitor caches and
+whatever it has imported since. Stdlib only: it runs without site.
+
+Requests arrive on pipe R as length-prefixed JSON frames:
+  {"op": "env",   "id": k, "env": {...}}         define environment k
+  {"op": "spawn", "tid": t, "argv": [...], "cwd": d, "env": k,
+   "nice": n, "stderr": bool}
+Replies leave on SEQPACKET socket W, one JSON datagram each:
+  {"op": "spawned", "tid": t, "pid": p, "nice": n}   (+ stderr read end
+                                                      as SCM_RIGHTS fd)
+  {"op": "error",   "tid": t, "error": "..."}
+  {"op": "exit",    "tid": t, "rc": rc}              rc < 0: killed by -rc
+The helper exits when R reaches EOF, i.e. when the runner is gone.
+"""
+
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+from collections import deque
+
+_HEADER = struct.Struct("!I")
+
+
+def _read_exactly(fd, n):
+    chunks = []
+    while n:
+        b = os.read(fd, n)
+        if not b:
+            return None
+        chunks.append(b)
+        n -= len(b)
+    return b"".join(chunks)
+
+
+def read_frame(fd):
+    head = _read_exactly(fd, _HEADER.size)
+    if head is None:
+        return None
+    body = _read_exactly(fd, _HEADER.unpack(head)[0])
+    return None if body is None else json.loads(body)
+
+
+def write_frame(fd, msg):
+    body = json.dumps(msg).encode()
+    data = memoryview(_HEADER.pack(len(body)) + body)
+    while data:
+        data = data[os.write(fd, data):]
+
+
+class _Helper:
+    def __init__(self, req_fd, rep_sock):
+        self.req_fd = req_fd
+        self.sock = rep_sock
+        self.sock.setblocking(False)
+        self.envs = {}
+        self.procs = {}       # pid -> (tid, Popen)
+        self.outbox = deque()  # (payload, fds); never block on a busy runner
+        self.sel = selectors.DefaultSelector()
+        self.sig_r, sig_w = os.pipe()
+        os.set_blocking(self.sig_r, False)
+        os.set_blocking(sig_w, False)
+        signal.set_wakeup_fd(sig_w, warn_on_full_buffer=False)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        # the runner decides how tasks are stopped, not a terminal ^C
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self.sel.register(self.req_fd, selectors.EVENT_READ, "req")
+        self.sel.register(self.sig_r, selectors.EVENT_READ, "sig")
+
+    def send(self, msg, fds=()):
+        self.outbox.append((json.dumps(msg).encode(), list(fds)))
+        self._flush()
+
+    def _flush(self):
+        while self.outbox:
+            payload, fds = self.outbox[0]
+            try:
+                if fds:
+                    socket.send_fds(self.sock, [payload], fds)
+                else:
+                    self.sock.send(payload)
+            except BlockingIOError:
+                break
+            self.outbox.popleft()
+            for fd in fds:
+                os.close(fd)
+        events = selectors.EVENT_WRITE if self.outbox else 0
+        try:
+            if events:
+                self.sel.modify(self.sock, events, "sock") \
+                    if self.sock in self.sel.get_map() else \
+                    self.sel.register(self.sock, events, "sock")
+            elif self.sock in self.sel.get_map():
+                self.sel.unregister(self.sock)
+        except (KeyError, ValueError):
+            pass
+
+    def spawn(self, req):
+        tid = req["tid"]
+        try:
+            p = subprocess.Popen(
+                req["argv"], cwd=req["cwd"], env=self.envs[req["env"]],
+                stderr=subprocess.PIPE if req.get("stderr") else None)
+        except (OSError, KeyError) as e:
+            self.send({"op": "error", "tid": tid, "error": repr(e)})
+            return
+        nice = req.get("nice")
+        if nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, p.pid, nice)
+            except OSError:
+                pass
+        try:
+            nice = os.getpriority(os.PRIO_PROCESS, p.pid)
+        except OSError:
+            pass
+        self.procs[p.pid] = (tid, p)
+        fds = ()
+        if p.stderr is not None:
+            fds = (os.dup(p.stderr.fileno()),)
+            p.stderr.close()
+        self.send({"op": "spawned", "tid": tid, "pid": p.pid, "nice": nice}, fds)
+
+    def reap(self):
+        try:
+            while os.read(self.sig_r, 4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        for pid, (tid, p) in list(self.procs.items()):
+            rc = p.poll()
+            if rc is not None:
+                del self.procs[pid]
+                self.send({"op": "exit", "tid": tid, "rc": rc})
+
+    def run(self):
+        while True:
+            for key, _ in self.sel.select(1.0):
+                if key.data == "req":
+                    msg = read_frame(self.req_fd)
+                    if msg is None:
+                        return
+                    if msg["op"] == "env":
+                        self.envs[msg["id"]] = msg["env"]
+                    elif msg["op"] == "spawn":
+                        self.spawn(msg)
+                elif key.data == "sig":
+                    self.reap()
+                else:
+                    self._flush()
+            # SIGCHLD can coalesce; a cheap sweep keeps nothing stranded
+            if self.procs:
+                self.reap()
+
+
+def main(argv):
+    req_fd = int(argv[1])
+    rep_sock = socket.socket(fileno=int(argv[2]))
+    _Helper(req_fd, rep_sock).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,282 @@
+"""How task processes are started.
+
+popen       - psutil.Popen straight from the runner (the default). Every
+              launch forks the runner itself, which by then holds the whole
+              workflow, psutil, the monitor's caches and a few threads; its
+              page tables get copied and the parent takes copy-on-write
+              faults afterwards, so a pass that submits 50 tasks pays that
+              50 times, on the scheduling thread.
+forkserver  - a small helper interpreter (launch_helper.py) is started once;
+              the runner sends it argv/cwd/env/nice over a pipe and the
+              helper does the forking. Environments are sent once per
+              distinct mapping (see taskenv.py) and referenced by id after.
+              The helper reports pid and granted nice right away, passes a
+              stderr pipe back as a descriptor when asked to, and reports
+              the exit code when the task ends. That report is what wakes
+              the scheduler: the reply socket hangs off the ChildReaper.
+
+Both return an object that answers what the executor asks of a task
+process: ``pid``, ``poll()``, ``nice()``, ``kill()`` and ``stderr``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+import psutil
+
+from . import launch_helper
+from .reaper import ChildReaper
+
+log = logging.getLogger(__name__)
+
+LAUNCHERS = ("popen", "forkserver")
+
+# a spawn is a fork+exec in the helper; anything slower means it is stuck
+_REPLY_TIMEOUT = 30.0
+
+
+class LauncherError(OSError):
+    """The forkserver helper refused a launch or is gone."""
+
+
+class PopenLauncher:
+    """psutil.Popen from the runner process; the reaper watches the pid."""
+
+    name = "popen"
+
+    def __init__(self, reaper: ChildReaper, logger: logging.Logger):
+        self.reaper = reaper
+        self.logger = logger
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def spawn(self, tid: int, argv: List[str], cwd: str, env: Mapping[str, str],
+              nice: int, capture_stderr: bool = False) -> psutil.Popen:
+        p = psutil.Popen(argv, cwd=cwd, env=env,
+                         stderr=subprocess.PIPE if capture_stderr else None)
+        try:
+            p.nice(nice)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self.logger.error("Could not renice %d to %d", p.pid, nice)
+        self.reaper.register(tid, p.pid)
+        return p
+
+
+class LaunchedProcess:
+    """A task started by the forkserver helper (not a child of the runner)."""
+
+    def __init__(self, pid: int, nice: int, stderr=None):
+        self.pid = pid
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        self._nice = nice
+
+    def poll(self) -> Optional[int]:
+        # set by ForkserverLauncher when the helper reports the exit
+        return self.returncode
+
+    def nice(self, value: Optional[int] = None) -> int:
+        if value is None:
+            return self._nice
+        try:
+            os.setpriority(os.PRIO_PROCESS, self.pid, value)
+        except ProcessLookupError:
+            raise psutil.NoSuchProcess(self.pid)
+        except PermissionError:
+            raise psutil.AccessDenied(self.pid)
+        self._nice = value
+        return value
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is not None:
+            return
+        try:
+            os.kill(self.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkserverLauncher:
+    """Spawns tasks through a long-lived launch_helper process."""
+
+    name = "forkserver"
+
+    def __init__(self, reaper: ChildReaper, logger: logging.Logger):
+        self.reaper = reaper
+        self.logger = logger
+        self._helper: Optional[subprocess.Popen] = None
+        self._req_w: Optional[int] = None
+        self._sock: Optional[socket.socket] = None
+        self._env_ids: Dict[int, Tuple[int, Mapping[str, str]]] = {}
+        self._procs: Dict[int, LaunchedProcess] = {}   # tid -> running task
+        self._exited: Set[int] = set()
+        self._dead = False
+
+    # ----- lifecycle -----
+    def start(self) -> None:
+        if self._helper is not None:
+            return
+        req_r, req_w = os.pipe()
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self._helper = subprocess.Popen(
+                [sys.executable, "-I", "-S", launch_helper.__file__,
+                 str(req_r), str(child.fileno())],
+                pass_fds=(req_r, child.fileno()),
+            )
+        finally:
+            os.close(req_r)
+            child.close()
+        self._req_w = req_w
+        self._sock = parent
+        self._sock.setblocking(False)
+        self.reaper.watch(self._sock.fileno(), self._drain)
+        self.logger.info("Task launcher helper started (pid %d)", self._helper.pid)
+
+    def stop(self) -> None:
+        if self._helper is None:
+            return
+        if not self._dead:
+            self.reaper.unwatch(self._sock.fileno())
+        os.close(self._req_w)  # EOF: the helper leaves
+        try:
+            self._helper.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._helper.kill()
+            self._helper.wait()
+        self._sock.close()
+        self._helper = None
+
+    # ----- requests -----
+    def _send(self, msg: Dict) -> None:
+        try:
+            launch_helper.write_frame(self._req_w, msg)
+        except OSError as e:
+            raise LauncherError(f"task launcher helper is gone: {e}") from e
+
+    def _env_id(self, env: Mapping[str, str]) -> int:
+        # task environments are shared, immutable mappings; send each once
+        known = self._env_ids.get(id(env))
+        if known is not None and known[1] is env:
+            return known[0]
+        k = len(self._env_ids)
+        self._send({"op": "env", "id": k, "env": dict(env)})
+        self._env_ids[id(env)] = (k, env)
+        return k
+
+    def spawn(self, tid: int, argv: List[str], cwd: str, env: Mapping[str, str],
+              nice: int, capture_stderr: bool = False) -> LaunchedProcess:
+        if self._helper is None:
+            self.start()
+        if self._dead:
+            raise LauncherError("task launcher helper is gone")
+        self._send({"op": "spawn", "tid": tid, "argv": list(argv),
+                    "cwd": os.path.abspath(cwd or "."), "env": self._env_id(env),
+                    "nice": nice, "stderr": capture_stderr})
+        while True:
+            r, _, _ = select.select([self._sock], [], [], _REPLY_TIMEOUT)
+            if not r:
+                raise LauncherError(f"no reply from the task launcher for tid {tid}")
+            reply = self._recv()
+            if reply is None:
+                continue
+            msg, fds = reply
+            if msg.get("tid") != tid or msg["op"] == "exit":
+                self._handle(msg, fds)
+                continue
+            if msg["op"] == "error":
+                raise LauncherError(msg["error"])
+            stderr = os.fdopen(fds[0], "rb") if fds else None
+            if msg.get("nice") != nice:
+                self.logger.error("Could not renice %d to %d", msg["pid"], nice)
+            proc = LaunchedProcess(msg["pid"], msg.get("nice", nice), stderr)
+            self._procs[tid] = proc
+            if self._exited:
+                # exits read while waiting for this reply won't wake the reaper
+                self.reaper.notify(self._exited)
+                self._exited = set()
+            return proc
+
+    # ----- replies -----
+    def _recv(self) -> Optional[Tuple[Dict, List[int]]]:
+        try:
+            data, fds, _, _ = socket.recv_fds(self._sock, 65536, 1)
+        except (BlockingIOError, InterruptedError):
+            return None
+        if not data:
+            self._helper_died()
+            raise LauncherError("task launcher helper is gone")
+        return json.loads(data), fds
+
+    def _handle(self, msg: Dict, fds: List[int]) -> None:
+        for fd in fds:
+            os.close(fd)
+        if msg["op"] == "exit":
+            proc = self._procs.pop(msg["tid"], None)
+            if proc is not None:
+                proc.returncode = msg["rc"]
+                self._exited.add(msg["tid"])
+        elif msg["op"] == "spawned":
+            # came after spawn() gave up waiting; the runner started the task
+            # another way or not at all, so nobody would ever reap this one
+            self.logger.error("Late launch of tid %d (pid %d); killing it",
+                              msg["tid"], msg["pid"])
+            try:
+                os.kill(msg["pid"], signal.SIGKILL)
+            except OSError:
+                pass
+
+    def _drain(self) -> Set[int]:
+        """Reaper callback: take every pending report, return exited tids."""
+        try:
+            while True:
+                reply = self._recv()
+                if reply is None:
+                    break
+                self._handle(*reply)
+        except LauncherError:
+            pass
+        done, self._exited = self._exited, set()
+        return done
+
+    def _helper_died(self) -> None:
+        if self._dead:
+            return
+        self._dead = True
+        self.reaper.unwatch(self._sock.fileno())
+        rc = self._helper.poll() if self._helper is not None else None
+        self.logger.error("Task launcher helper exited (rc=%s); failing %d running task(s)",
+                          rc, len(self._procs))
+        # nobody is left to report their exit codes
+        for tid, proc in self._procs.items():
+            proc.kill()
+            proc.returncode = -signal.SIGKILL
+            self._exited.add(tid)
+        self._procs.clear()
+
+
+def make_launcher(name: str, reaper: ChildReaper, logger: logging.Logger):
+    if name == "forkserver":
+        return ForkserverLauncher(reaper, logger)
+    if name == "popen":
+        return PopenLauncher(reaper, logger)
+    raise ValueError(f"unknown launcher {name!r}; choose from {', '.join(LAUNCHERS)}")
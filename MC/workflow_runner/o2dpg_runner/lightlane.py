@@ -0,0 +1,110 @@
+"""A side lane for bookkeeping tasks declared with no CPU or memory cost.
+
+The generators declare ``cpu: 0`` for tasks that only move a file around
+or make a link, and ``mem: 0`` as well for the cheapest of them
+(linkGRP_<tf>, ...). Through the normal path each of them still takes a
+ResourceManager booking and with it one of the --maxjobs slots a real
+reconstruction task could have, gets renice'd, and is registered with the
+psutil monitor, which then walks its process tree every tick.
+
+LightLane runs them from a small pool of threads instead, one blocking
+subprocess per thread, outside the ResourceManager and the monitor, which
+is why a task declaring memory is not eligible: nothing here would keep
+that memory booked. The command line, cwd and environment are the ones
+submit() would use, so the taskwrapper writes logfiles and ``_done``
+markers as usual. Completions
+are reported through a pipe that the ChildReaper watches, so the
+scheduling loop wakes for them like for any other task.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Mapping, Optional, Set
+
+log = logging.getLogger(__name__)
+
+
+class LaneTask:
+    """Handle to a task queued in or running on the light lane."""
+
+    def __init__(self):
+        self.pid = 0                 # known once a worker has started it
+        self.returncode: Optional[int] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._killed = False
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def kill(self) -> None:
+        self._killed = True
+        if self._proc is not None and self.returncode is None:
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+
+
+class LightLane:
+    """Bounded thread pool running zero-cost tasks as plain subprocesses."""
+
+    def __init__(self, workers: int, logger: logging.Logger):
+        self.workers = workers
+        self.logger = logger
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix="light-lane")
+        self._lock = threading.Lock()
+        self._finished: List[int] = []
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+
+    def fileno(self) -> int:
+        """Readable whenever drain() has something to report."""
+        return self._wake_r
+
+    def spawn(self, tid: int, argv: List[str], cwd: str,
+              env: Mapping[str, str]) -> LaneTask:
+        task = LaneTask()
+        self._pool.submit(self._run, tid, task, argv, cwd, env)
+        return task
+
+    def _run(self, tid: int, task: LaneTask, argv: List[str], cwd: str,
+             env: Mapping[str, str]) -> None:
+        rc = -9
+        if not task._killed:
+            try:
+                task._proc = subprocess.Popen(argv, cwd=cwd, env=env)
+                task.pid = task._proc.pid
+                rc = task._proc.wait()
+            except OSError as e:
+                self.logger.error("light lane: could not start tid %d: %s", tid, e)
+                rc = 127
+        with self._lock:
+            task.returncode = rc
+            self._finished.append(tid)
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def drain(self) -> Set[int]:
+        """Reaper callback: tids that finished since the last call."""
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            done, self._finished = self._finished, []
+        return set(done)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
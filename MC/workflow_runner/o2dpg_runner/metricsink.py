@@ -0,0 +1,167 @@
+"""Where pipeline_metric rows go.
+
+Every monitor tick writes one row per running task. Through the metric
+logger each row was a dict repr formatted by the logging machinery on the
+scheduling thread, and ``o2dpg_sim_metrics.line_to_dict`` had to undo the
+repr with string replaces (``'``, ``None``, ``True``) before json.loads.
+
+``--metric-format log`` (the default) keeps that format. With
+``--metric-format ndjson`` the same file is newline-delimited JSON with a
+fixed schema, written by a background thread:
+
+  {"format": "o2dpg-pipeline-metric", "version": 1, "fields": [...],
+   "units": {...}, "started": "<local ISO time>"}          header, once
+  {"meta": {...}, "time": <epoch s>}                       run meta, once
+  [<time>, <iter>, "<name>", <cpu>, <uss>, <pss>, ...]    one row per line
+
+Rows are arrays in ``fields`` order. The scheduling thread only appends a
+tuple to a list; formatting and writing happen every FLUSH_INTERVAL
+seconds or FLUSH_ROWS rows on the writer thread. o2dpg_sim_metrics.py
+reads both formats.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+FORMAT_NAME = "o2dpg-pipeline-metric"
+FORMAT_VERSION = 1
+FORMATS = ("log", "ndjson")
+
+FIELDS = ("time", "iter", "name", "cpu", "uss", "pss", "nice", "swap", "label",
+          "disc", "cgroup_cpu", "cgroup_mem", "suspended")
+UNITS = {"time": "s since epoch", "cpu": "% of one core", "uss": "MB", "pss": "MB",
+         "swap": "MB", "disc": "MB (-1: not monitored)",
+         "cgroup_cpu": "% of one core", "cgroup_mem": "MB",
+         "suspended": "s stopped so far (--preempt-backfill)"}
+
+# the slice-wide cgroup totals travel as a row under this name
+CGROUP_GLOBAL = "__cgroup_global__"
+
+FLUSH_INTERVAL = 2.0
+FLUSH_ROWS = 4096
+
+
+class LogMetricSink:
+    """The prototype format: one dict repr per line through a logger."""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def meta(self, meta: Dict[str, Any]) -> None:
+        self.logger.info(meta)
+
+    def row(self, it: int, name: str, cpu, uss, pss, nice, swap, label, disc,
+            cgroup_cpu=None, cgroup_mem=None, suspended=None) -> None:
+        d = {"iter": it, "name": name, "cpu": cpu, "uss": uss, "pss": pss,
+             "nice": nice, "swap": swap, "label": label, "disc": disc}
+        if name != CGROUP_GLOBAL:
+            # cgroup-based readings for comparison with psutil (None when
+            # no per-task scope is active)
+            d["cgroup_cpu"] = cgroup_cpu
+            d["cgroup_mem"] = cgroup_mem
+        if suspended is not None:
+            d["suspended"] = suspended
+        self.logger.info(d)
+
+    def close(self) -> None:
+        pass
+
+
+class NdjsonMetricSink:
+    """Fixed-schema NDJSON, buffered and written from a background thread."""
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL,
+                 flush_rows: int = FLUSH_ROWS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self._f = open(path, "w")
+        self._f.write(json.dumps({
+            "format": FORMAT_NAME, "version": FORMAT_VERSION,
+            "fields": list(FIELDS), "units": UNITS,
+            "started": datetime.now().isoformat(timespec="milliseconds"),
+        }) + "\n")
+        self._f.flush()
+        self._buf: List[Tuple] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="o2dpg-metric-writer")
+        self._thread.start()
+
+    def meta(self, meta: Dict[str, Any]) -> None:
+        # written through: the meta line must precede the first row
+        with self._cond:
+            self._f.write(json.dumps({"meta": meta, "time": round(time.time(), 3)},
+                                     default=str) + "\n")
+            self._f.flush()
+
+    def row(self, it: int, name: str, cpu, uss, pss, nice, swap, label, disc,
+            cgroup_cpu=None, cgroup_mem=None, suspended=None) -> None:
+        r = (time.time(), it, name, cpu, uss, pss, nice, swap, label, disc,
+             cgroup_cpu, cgroup_mem, suspended)
+        with self._cond:
+            if self._closed:
+                return
+            if self._thread is None:
+                self._start()
+            self._buf.append(r)
+            if len(self._buf) >= self.flush_rows:
+                self._cond.notify()
+
+    def _write(self, rows: List[Tuple]) -> None:
+        dumps = json.JSONEncoder(separators=(",", ":"), default=str).encode
+        lines = []
+        for r in rows:
+            lines.append(dumps((round(r[0], 3),) + r[1:]))
+        lines.append("")
+        self._f.write("\n".join(lines))
+        self._f.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buf) < self.flush_rows:
+                    self._cond.wait(self.flush_interval)
+                rows, self._buf = self._buf, []
+                closed = self._closed
+            if rows:
+                try:
+                    self._write(rows)
+                except (OSError, ValueError) as e:
+                    log.warning("metric writer: dropping %d row(s): %s", len(rows), e)
+            if closed:
+                return
+
+    def close(self) -> None:
+        """Write out what is buffered; safe to call more than once."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self._f.close()
+
+
+def make_metric_sink(fmt: str, path: str, logger: Optional[logging.Logger] = None):
+    """Sink for --metric-format *fmt*; ``log`` writes through *logger*."""
+    if fmt == "log":
+        if logger is None:
+            raise ValueError("the log metric format needs a logger")
+        return LogMetricSink(logger)
+    if fmt == "ndjson":
+        return NdjsonMetricSink(path)
+    raise ValueError(f"unknown metric format {fmt!r}; choose from {', '.join(FORMATS)}")
@@ -6,6 +6,13 @@ separate thread with independent CPU (cheap, 1 Hz) and MEM (expensive,
 0.2 Hz) cadences. The scheduler reads the latest snapshot lock-free via
 an atomic dict reference.
 
+With ``--hang-watchdog CPU,WINDOW,FRACTION`` the thread also times how
+long each task's process tree has stayed below CPU percent of one core,
+and flags the task (TaskSnapshot.hung) once that reaches its window:
+WINDOW seconds, or FRACTION of the task's learned walltime if longer.
+A DPL workflow deadlocked at shutdown sits at 0% holding its booking
+until the GRID TTL; the executor kills flagged tasks instead.
+
 Backend interface: a callable
   sample(task_pid_list) -> {pid: {"cpu_pct": float, "pss_mb": float,
                                   "uss_mb": float, "swap_mb": float,
@@ -20,7 +27,12 @@ import subprocess
 import threading
 import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .scopelimits import read_scope_counters
+
+if TYPE_CHECKING:
+    from .profiling import PassProfiler
 
 try:
     import psutil
@@ -30,6 +42,8 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+HANG_DEFAULT_SPEC = "2,600,0.25"
+
 
 @dataclass
 class TaskSnapshot:
@@ -48,6 +62,39 @@ class TaskSnapshot:
     # cgroup-based metrics (None when not in a systemd slice / no per-task scope)
     cgroup_cpu_pct: Optional[float] = None   # aggregate CPU % from cgroup cpu.stat
     cgroup_mem_mb: Optional[float] = None    # aggregate memory from cgroup memory.current
+    # cumulative throttle / memory event counters of the scope (--scope-limits)
+    scope_counters: Optional[Dict[str, int]] = None
+    # --hang-watchdog: seconds below the CPU threshold, and whether that
+    # reached the task's window
+    idle_s: float = 0.0
+    hung: bool = False
+
+
+def parse_hang_spec(spec: str) -> Tuple[float, float, float]:
+    """``CPU,WINDOW,FRACTION`` -> (cpu percent, min window s, walltime fraction)."""
+    parts = spec.split(",")
+    if len(parts) != 3:
+        raise ValueError(f"--hang-watchdog {spec!r}: expected CPU,WINDOW,FRACTION")
+    values = []
+    for field, part in zip(("CPU", "WINDOW", "FRACTION"), parts):
+        try:
+            v = float(part)
+        except ValueError:
+            raise ValueError(f"--hang-watchdog {spec!r}: {field} {part!r} is not a number") from None
+        if field == "FRACTION" and v < 0:
+            raise ValueError(f"--hang-watchdog {spec!r}: FRACTION cannot be negative")
+        if field != "FRACTION" and v <= 0:
+            raise ValueError(f"--hang-watchdog {spec!r}: {field} must be positive")
+        values.append(v)
+    cpu, window, fraction = values
+    return cpu, window, fraction
+
+
+def hang_window(min_window: float, fraction: float, walltime: Optional[float]) -> float:
+    """How long a task may stay idle: WINDOW, or FRACTION of its walltime if longer."""
+    if walltime:
+        return max(min_window, fraction * walltime)
+    return min_window
 
 
 def _get_child_procs_fallback(base_pid: int) -> List[int]:
@@ -255,6 +302,10 @@ class CgroupV2Monitor:
     def available(self) -> bool:
         return self._cgroup_dir is not None
 
+    @property
+    def cgroup_dir(self) -> Optional[str]:
+        return self._cgroup_dir
+
     def sample(self) -> Tuple[Optional[float], Optional[float]]:
         """Return (cpu_pct, mem_mb).  cpu_pct is None on the first call."""
         if not self._cgroup_dir:
@@ -312,8 +363,12 @@ class MonitorThread(threading.Thread):
         monitor_disc: bool = False,
         disc_path: str = ".",
         global_cgroup_dir: Optional[str] = None,
+        profiler: Optional["PassProfiler"] = None,
+        hang_cpu_pct: Optional[float] = None,
     ):
         super().__init__(daemon=True, name="o2dpg-monitor")
+        self.profiler = profiler
+        self.hang_cpu_pct = hang_cpu_pct  # None: no hang watchdog
         self.cpu_interval = cpu_interval
         self.mem_interval = mem_interval
         self.backend = backend if backend is not None else PsutilBackend()
@@ -359,6 +414,8 @@ class MonitorThread(threading.Thread):
         labels: List[str],
         start_time: float,
         resolve_cgroup: bool = False,
+        scope_counters: bool = False,
+        hang_window: Optional[float] = None,
     ) -> None:
         """Register a task for monitoring.
 
@@ -367,6 +424,9 @@ class MonitorThread(threading.Thread):
         *pid* (which is the systemd-run wrapper when per-task scopes are used).
         Once resolved a per-task CgroupV2Monitor is created and its readings
         are stored in the TaskSnapshot alongside the psutil figures.
+        With *scope_counters* the scope's throttle and memory event counters
+        are read as well (see scopelimits.py). *hang_window* is the idle time
+        after which the task is flagged as hung (with a hang_cpu_pct).
         """
         with self._lock:
             self._registered[tid] = {
@@ -376,8 +436,18 @@ class MonitorThread(threading.Thread):
                 "start_time": start_time,
                 "resolve_cgroup": resolve_cgroup,
                 "cgroup_monitor": None,  # filled lazily by _one_pass
+                "scope_counters": scope_counters,
+                "hang_window": hang_window,
+                "idle_since": None,
             }
 
+    def reset_idle(self, tid: int) -> None:
+        """Restart *tid*'s idle clock (it was stopped, not hung)."""
+        with self._lock:
+            entry = self._registered.get(tid)
+            if entry is not None:
+                entry["idle_since"] = None
+
     def deregister(self, tid: int) -> None:
         with self._lock:
             entry = self._registered.pop(tid, None)
@@ -390,6 +460,11 @@ class MonitorThread(threading.Thread):
         with self._lock:
             return dict(self._snapshots)
 
+    def latest_tick(self) -> Tuple[int, Dict[int, TaskSnapshot]]:
+        """The current tick and a copy of its snapshots, read together."""
+        with self._lock:
+            return self.tick, dict(self._snapshots)
+
     def latest_for(self, tid: int) -> Optional[TaskSnapshot]:
         with self._lock:
             return self._snapshots.get(tid)
@@ -407,8 +482,6 @@ class MonitorThread(threading.Thread):
             return -1.0
 
     def _one_pass(self, now: float) -> None:
-        self.tick += 1
-
         # cgroup global totals (cheap reads, always done every pass)
         if self._cgroup is not None and self._cgroup.available:
             g_cpu, g_mem = self._cgroup.sample()
@@ -460,9 +533,12 @@ class MonitorThread(threading.Thread):
 
             cgroup_cpu: Optional[float] = None
             cgroup_mem: Optional[float] = None
+            counters: Optional[Dict[str, int]] = None
             cm: Optional[CgroupV2Monitor] = info.get("cgroup_monitor")
             if cm is not None and cm.available:
                 cgroup_cpu, cgroup_mem = cm.sample()
+                if info.get("scope_counters"):
+                    counters = read_scope_counters(cm.cgroup_dir)
                 # cgroup_cpu is None on the very first sample() call (no prior
                 # baseline yet) and whenever the scope's cpu.stat is unreadable
                 # (e.g. after --collect removes the finished scope).  In both
@@ -470,6 +546,21 @@ class MonitorThread(threading.Thread):
                 # value — one tick with None is preferable to a wrong number.
             # -------------------------------------------------------
 
+            # --- hang watchdog ---
+            # the first reading is CPU since process creation, not since the
+            # last pass: it neither starts nor stops the idle clock
+            idle_s = 0.0
+            hung = False
+            window = info.get("hang_window")
+            if window and self.hang_cpu_pct is not None and prev is not None:
+                if cpu_pct >= self.hang_cpu_pct:
+                    info["idle_since"] = None
+                elif info["idle_since"] is None:
+                    info["idle_since"] = now
+                if info["idle_since"] is not None:
+                    idle_s = now - info["idle_since"]
+                    hung = idle_s >= window
+
             t_delta_ms = int((now - info["start_time"]) * 1000)
             new_snaps[tid] = TaskSnapshot(
                 tid=tid, name=info["name"],
@@ -480,10 +571,16 @@ class MonitorThread(threading.Thread):
                 mem_fresh=want_mem,
                 cgroup_cpu_pct=cgroup_cpu,
                 cgroup_mem_mb=cgroup_mem,
+                scope_counters=counters,
+                idle_s=idle_s,
+                hung=hung,
             )
 
         with self._lock:
             self._snapshots = new_snaps
+            # bumped only once the snapshots are in place, so a reader who
+            # sees a new tick also gets the snapshots that belong to it
+            self.tick += 1
 
         # housekeeping: evict dead cached Process objects once per pass
         try:
@@ -496,10 +593,13 @@ class MonitorThread(threading.Thread):
                   self.cpu_interval, self.mem_interval)
         while not self._stop_event.is_set():
             now = time.perf_counter()
+            t0 = time.perf_counter_ns()
             try:
                 self._one_pass(now)
             except Exception:
                 log.exception("Monitor pass failed (continuing)")
+            if self.profiler is not None:
+                self.profiler.add("monitor_pass", t0)
             # Sleep at the CPU cadence; MEM is gated by its own interval.
             self._stop_event.wait(self.cpu_interval)
         log.debug("Monitor thread exiting")
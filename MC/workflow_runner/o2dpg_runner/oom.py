@@ -0,0 +1,175 @@
+"""Telling OOM kills from other failures.
+
+A task killed by the OOM killer came back through wait_for_any() like any
+other failure and was retried with the same mem_assigned. Usually it was
+killed again, or it only got through because its neighbours happened to
+need less. With ``--oom-resubmit [FACTOR]`` a failure counts as an OOM
+kill when the task died of SIGKILL (rc -9, or 137 from the wrapping bash)
+and one of these agrees:
+
+  memory.events oom_kill of the task's own scope        (--systemd-run)
+  memory.events oom_kill of the runner's slice          (--systemd-run)
+  "Killed process" lines in /dev/kmsg                   otherwise
+
+Slice and kernel-log kills cannot be pinned on one task, so each counts
+for one SIGKILL exit seen within PENDING_WINDOW seconds of it. SIGKILL
+alone is not enough: the user or the hang watchdog sends it too. With none
+of the sources readable nothing is taken as an OOM kill, and a task the
+runner killed itself never is.
+
+The task is then resubmitted with its memory booking raised by FACTOR
+(default 1.5, must be above 1), capped at --mem-limit, and its
+not-yet-started siblings are raised to at least the same. This does not
+use up --retry-on-failure, but a task gets at most MAX_RESUBMITS of these.
+A task OOM-killed at the cap, or past MAX_RESUBMITS, goes through the
+normal retry path.
+"""
+
+from __future__ import annotations
+
+import errno
+import logging
+import os
+import re
+import signal
+import time
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FACTOR = 1.5
+PENDING_WINDOW = 30.0
+MAX_RESUBMITS = 3  # per task
+
+_KMSG_OOM_RE = re.compile(rb"Killed process \d+")
+
+
+def killed_by_sigkill(rc: int) -> bool:
+    """rc of a process killed by SIGKILL, directly or as bash's last command."""
+    return rc in (-signal.SIGKILL, 128 + signal.SIGKILL)
+
+
+def read_oom_kills(cgroup_dir: str) -> Optional[int]:
+    """The oom_kill counter of a cgroup's memory.events, None if unreadable."""
+    try:
+        with open(os.path.join(cgroup_dir, "memory.events")) as f:
+            for line in f:
+                key, _, val = line.partition(" ")
+                if key == "oom_kill":
+                    return int(val)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class KernelLog:
+    """Counts OOM kills the kernel reports in /dev/kmsg from now on."""
+
+    def __init__(self, path: str = "/dev/kmsg"):
+        self._fd: Optional[int] = None
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            return
+        try:
+            os.lseek(fd, 0, os.SEEK_END)  # only what happens during this run
+        except OSError:
+            pass
+        self._fd = fd
+
+    @property
+    def available(self) -> bool:
+        return self._fd is not None
+
+    def oom_kills(self) -> int:
+        """New OOM kill records since the last call."""
+        if self._fd is None:
+            return 0
+        n = 0
+        while True:
+            try:
+                rec = os.read(self._fd, 8192)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EPIPE:
+                    continue  # records overwritten under us; carry on
+                break
+            if not rec:
+                break
+            n += len(_KMSG_OOM_RE.findall(rec))
+        return n
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class OomDetector:
+    """Decides, for a finished task, whether it was OOM-killed."""
+
+    def __init__(self, slice_dir: Optional[str] = None, kmsg_path: str = "/dev/kmsg"):
+        self._slice = slice_dir if slice_dir and read_oom_kills(slice_dir) is not None else None
+        self._slice_last = read_oom_kills(self._slice) if self._slice else None
+        self._kmsg: Optional[KernelLog] = None
+        if self._slice is None:
+            kl = KernelLog(kmsg_path)
+            self._kmsg = kl if kl.available else None
+        self._scope_kills: Dict[int, int] = {}
+        self._pending: List[float] = []  # times of kills nobody has claimed yet
+
+    @property
+    def source(self) -> Optional[str]:
+        if self._slice is not None:
+            return f"{self._slice}/memory.events"
+        if self._kmsg is not None:
+            return "kernel log"
+        return None
+
+    @property
+    def available(self) -> bool:
+        """Whether any source of OOM evidence could be read."""
+        return self.source is not None
+
+    def note_scope(self, tid: int, counters: Optional[Dict[str, int]]) -> None:
+        """Remember the oom_kill count last read from *tid*'s scope."""
+        if counters and "oom_kill" in counters:
+            self._scope_kills[tid] = counters["oom_kill"]
+
+    def _poll(self, now: float) -> None:
+        new = 0
+        if self._slice is not None:
+            cur = read_oom_kills(self._slice)
+            if cur is not None:
+                new = max(0, cur - (self._slice_last or 0))
+                self._slice_last = cur
+        elif self._kmsg is not None:
+            new = self._kmsg.oom_kills()
+        self._pending = [t for t in self._pending if now - t <= PENDING_WINDOW]
+        self._pending += [now] * new
+
+    def finished(self, tid: int, rc: int, now: Optional[float] = None,
+                 ours: bool = False) -> Optional[str]:
+        """Account for *tid* exiting with *rc*; what says it was OOM-killed, if anything.
+
+        *ours*: the runner killed the task itself; it claims no pending kill.
+        """
+        if now is None:
+            now = time.monotonic()
+        self._poll(now)
+        scope_kills = self._scope_kills.pop(tid, 0)
+        # the slice counts these too; they are accounted for
+        del self._pending[:scope_kills]
+        if ours or not killed_by_sigkill(rc):
+            return None
+        if scope_kills > 0:
+            return "oom_kill in the task's scope"
+        if self._pending:
+            self._pending.pop(0)
+            return f"oom_kill in {self.source}"
+        return None
+
+    def close(self) -> None:
+        if self._kmsg is not None:
+            self._kmsg.close()
@@ -0,0 +1,194 @@
+"""Pinning default-tier tasks to CPU sets, one NUMA node where possible.
+
+Tasks ran wherever the kernel put them. On a dual-socket node a
+multithreaded tpcreco or the sim workers drifted across sockets, away from
+the memory they had touched first. With ``--cpu-placement METHOD`` every
+default-tier task gets ceil(cpu_assigned) CPUs of its own for as long as
+it runs:
+
+  - from a single NUMA node if one has that many free; of those, the node
+    with the fewest free (best fit), and the lowest run of consecutive CPU
+    numbers in it if there is one
+  - otherwise spread over the nodes with the most free CPUs, no node
+    preferred
+  - not at all if fewer are free than it needs (the backfill CPU factor
+    allows bookings beyond the cores there are); the task runs unpinned
+
+The pool is the runner's own affinity mask, split by
+/sys/devices/system/node/node*/cpulist (a single node without sysfs).
+Backfill tasks are never pinned: they are niced so that they soak up
+whatever the pinned tasks leave idle, on any core.
+
+METHOD says how the set is applied:
+
+  numactl   numactl --physcpubind=SET [--preferred=NODE] --
+  taskset   taskset -c SET                     (CPUs only)
+  scope     systemd-run -p AllowedCPUs=SET     (--systemd-run; the slice
+                                                needs the cpuset controller)
+  auto      numactl if installed, else taskset
+
+Memory is preferred, not bound, to the node: a full node spills over
+instead of OOM-killing the task.
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import math
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+METHODS = ("off", "auto", "numactl", "taskset", "scope")
+NODE_SYSFS = "/sys/devices/system/node"
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """``0-3,8,10-11`` -> [0, 1, 2, 3, 8, 10, 11]."""
+    out: List[int] = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        out.extend(range(int(lo), int(hi or lo) + 1))
+    return out
+
+
+def format_cpulist(cpus: List[int]) -> str:
+    """The inverse of parse_cpulist(), ranges folded."""
+    runs: List[str] = []
+    cpus = sorted(cpus)
+    i = 0
+    while i < len(cpus):
+        j = i
+        while j + 1 < len(cpus) and cpus[j + 1] == cpus[j] + 1:
+            j += 1
+        runs.append(str(cpus[i]) if i == j else f"{cpus[i]}-{cpus[j]}")
+        i = j + 1
+    return ",".join(runs)
+
+
+def read_numa_nodes(sysfs: str = NODE_SYSFS) -> Dict[int, List[int]]:
+    """{node: [cpu, ...]} from sysfs; empty if there is none."""
+    nodes: Dict[int, List[int]] = {}
+    for path in glob.glob(os.path.join(sysfs, "node[0-9]*", "cpulist")):
+        m = re.search(r"node(\d+)", path)
+        try:
+            with open(path) as f:
+                cpus = parse_cpulist(f.read())
+        except (OSError, ValueError):
+            continue
+        if m and cpus:
+            nodes[int(m.group(1))] = cpus
+    return nodes
+
+
+@dataclass(frozen=True)
+class Placement:
+    cpus: List[int]
+    node: Optional[int]  # None: spread over nodes
+
+    @property
+    def cpulist(self) -> str:
+        return format_cpulist(self.cpus)
+
+
+def _lowest_run(free: List[int], n: int) -> List[int]:
+    """The first *n* consecutive CPU numbers in sorted *free*, else its first *n*."""
+    for i in range(len(free) - n + 1):
+        if free[i + n - 1] - free[i] == n - 1:
+            return free[i:i + n]
+    return free[:n]
+
+
+class CpuPlacer:
+    """A free pool of CPUs per NUMA node, handed out per task."""
+
+    def __init__(self, nodes: Dict[int, List[int]], method: str = "taskset"):
+        if method not in METHODS or method in ("off", "auto"):
+            raise ValueError(f"CpuPlacer needs a concrete method, not {method!r}")
+        self.method = method
+        self.free: Dict[int, List[int]] = {n: sorted(c) for n, c in nodes.items() if c}
+        self._home = {c: n for n, cpus in self.free.items() for c in cpus}
+        self.placed: Dict[int, Placement] = {}
+
+    @classmethod
+    def from_system(cls, method: str, in_scope: bool,
+                    sysfs: str = NODE_SYSFS) -> Optional["CpuPlacer"]:
+        """The runner's CPUs by node, with *method* resolved to a usable one.
+
+        None, with a warning, if the tool *method* needs is not installed:
+        the run goes ahead unpinned, as with ``--cpu-placement off``.
+        """
+        allowed = set(os.sched_getaffinity(0))
+        nodes = {n: [c for c in cpus if c in allowed]
+                 for n, cpus in read_numa_nodes(sysfs).items()}
+        if not any(nodes.values()):
+            nodes = {0: sorted(allowed)}
+        if method == "scope" and not in_scope:
+            log.warning("--cpu-placement scope needs --systemd-run; using auto")
+            method = "auto"
+        if method == "auto":
+            method = "numactl" if shutil.which("numactl") else "taskset"
+        if method in ("numactl", "taskset") and not shutil.which(method):
+            log.warning("--cpu-placement %s: %s not found on PATH; tasks run unpinned",
+                        method, method)
+            return None
+        return cls(nodes, method)
+
+    def n_free(self) -> int:
+        return sum(len(c) for c in self.free.values())
+
+    def allocate(self, tid: int, cpu: float) -> Optional[Placement]:
+        """CPUs for *tid* booked at *cpu* cores; None: run it unpinned."""
+        n = math.ceil(cpu)
+        if n <= 0 or n > self.n_free():
+            return None
+        fitting = [node for node, c in self.free.items() if len(c) >= n]
+        if fitting:
+            node = min(fitting, key=lambda k: (len(self.free[k]), k))
+            cpus = _lowest_run(self.free[node], n)
+            pl = Placement(cpus, node)
+        else:
+            cpus = []
+            for node in sorted(self.free, key=lambda k: (-len(self.free[k]), k)):
+                cpus += self.free[node][:n - len(cpus)]
+                if len(cpus) == n:
+                    break
+            pl = Placement(sorted(cpus), None)
+        taken = set(pl.cpus)
+        for node in self.free:
+            self.free[node] = [c for c in self.free[node] if c not in taken]
+        self.placed[tid] = pl
+        return pl
+
+    def release(self, tid: int) -> None:
+        pl = self.placed.pop(tid, None)
+        if pl is None:
+            return
+        for c in pl.cpus:
+            self.free[self._home[c]].append(c)
+        for node in {self._home[c] for c in pl.cpus}:
+            self.free[node].sort()
+
+    def wrap(self, pl: Placement) -> List[str]:
+        """argv prefix applying *pl* (taskset / numactl)."""
+        if self.method == "numactl":
+            out = ["numactl", f"--physcpubind={pl.cpulist}"]
+            if pl.node is not None:
+                out.append(f"--preferred={pl.node}")
+            return out + ["--"]
+        if self.method == "taskset":
+            return ["taskset", "-c", pl.cpulist]
+        return []
+
+    def scope_properties(self, pl: Placement) -> List[str]:
+        """systemd-run arguments applying *pl* (scope)."""
+        if self.method != "scope":
+            return []
+        return ["-p", f"AllowedCPUs={pl.cpulist}"]
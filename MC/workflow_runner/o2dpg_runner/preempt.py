@@ -0,0 +1,115 @@
+"""Stopping backfill tasks to make room for default-tier ones.
+
+Backfill tasks (``nice_backfill``, booked through fits_backfill) run on the
+CPU the default tier leaves free at the time they start. A default-tier
+task admitted later shares the cores with them, niced or not. With
+``--preempt-backfill``, before a default-tier task starts, enough
+backfill task trees are SIGSTOPped that the CPU of everything still
+running, the new task included, fits in --cpu-limit. The lowest-priority
+ones go first: worst policy rank, then most recently started.
+
+Stopped tasks are SIGCONTed, best rank first, as soon as their CPU fits
+again. That is checked after every scheduling pass, once the default
+tier has had its pick. A stopped task keeps its memory, so it stays
+booked in the backfill bucket; ResourceManager only moves its CPU to
+``cpu_suspended``. Monitor samples are not recorded while a task is
+stopped, and the seconds it spent stopped go into its metric rows.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+from .resources import ResourceManager
+
+log = logging.getLogger(__name__)
+
+
+def signal_tree(pid: int, sig: int) -> int:
+    """Send *sig* to *pid* and all its descendants; return how many got it.
+
+    The root is signalled first, so a stopped root cannot fork any more
+    children while the tree is walked.
+    """
+    n = 0
+    try:
+        os.kill(pid, sig)
+        n += 1
+    except OSError:
+        return 0
+    try:
+        children = psutil.Process(pid).children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return n
+    for c in children:
+        try:
+            os.kill(c.pid, sig)
+            n += 1
+        except OSError:
+            pass
+    return n
+
+
+class BackfillPreemptor:
+    """Chooses which backfill tasks to stop and when to continue them."""
+
+    def __init__(self, rm: ResourceManager, rank: Optional[Callable[[int], object]],
+                 logger: logging.Logger):
+        self.rm = rm
+        self.rank = rank      # policy sort key (smaller: better); None: start order only
+        self.logger = logger
+
+    def _backfill_running(self, running: Dict[int, object], suspended: bool) -> List[int]:
+        rm = self.rm
+        out = []
+        for tid in running:
+            res = rm.resources[tid]
+            if res.booked and res.nice_value != rm.nice_default and res.suspended == suspended:
+                out.append(tid)
+        return out
+
+    def _worst_first(self, tids: List[int]) -> List[int]:
+        tids = tids[::-1]  # running is in start order: latest first
+        if self.rank is not None:
+            tids.sort(key=self.rank, reverse=True)
+        return tids
+
+    def make_room(self, tid: int, running: Dict[int, object], now: float) -> List[int]:
+        """Stop backfill tasks until *tid* fits next to the rest; return them."""
+        rm = self.rm
+        excess = rm.cpu_active() + rm.resources[tid].cpu_assigned - rm.boundaries.cpu_limit
+        stopped: List[int] = []
+        if excess <= 0:
+            return stopped
+        for victim in self._worst_first(self._backfill_running(running, suspended=False)):
+            if excess <= 0:
+                break
+            if signal_tree(running[victim].pid, signal.SIGSTOP) == 0:
+                continue  # already gone; the reaper will tell
+            rm.suspend(victim, now)
+            excess -= rm.resources[victim].cpu_assigned
+            stopped.append(victim)
+        return stopped
+
+    def resume_fitting(self, running: Dict[int, object], now: float) -> List[int]:
+        """Continue stopped tasks, best first, while their CPU fits."""
+        rm = self.rm
+        resumed: List[int] = []
+        for tid in reversed(self._worst_first(self._backfill_running(running, suspended=True))):
+            res = rm.resources[tid]
+            if rm.cpu_active() + res.cpu_assigned > rm.boundaries.cpu_limit:
+                break  # keep the order: nobody overtakes a better-ranked task
+            signal_tree(running[tid].pid, signal.SIGCONT)
+            rm.resume(tid, now)
+            resumed.append(tid)
+        return resumed
+
+    def resume_all(self, running: Dict[int, object], now: float) -> None:
+        for tid in self._backfill_running(running, suspended=True):
+            signal_tree(running[tid].pid, signal.SIGCONT)
+            self.rm.resume(tid, now)
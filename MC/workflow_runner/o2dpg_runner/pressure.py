@@ -0,0 +1,188 @@
+"""Admission control from kernel pressure-stall information (PSI).
+
+fits_default() and fits_backfill() compare booked numbers with a fixed
+--mem-limit, so the runner kept launching while the kernel was busy
+reclaiming: the bookings fit, the node did not. With ``--psi-admission``
+the executor reads, once per monitor tick,
+
+  memory.pressure, cpu.pressure, memory.events   of the runner's slice
+                                                 (under --systemd-run)
+  /proc/pressure/memory, /proc/pressure/cpu      otherwise
+
+and acts on the avg10 stall percentages:
+
+  memory "some" >= MEM_SOME, or cpu "some" >= CPU_SOME
+      stop admitting backfill tasks
+  memory "full" >= MEM_FULL, or new high/max/oom events in memory.events
+      shrink the memory budget of new admissions to SHRINK_FACTOR of
+      --mem-limit
+
+The thresholds are ``--psi-admission MEM_SOME,MEM_FULL,CPU_SOME`` (percent,
+default 10,5,60; 0 turns a check off). A state is left again only after RELAX_HOLD consecutive
+readings below RELAX_RATIO of its threshold, so a run hovering at a
+threshold does not flap. Running tasks are never touched, and with nothing
+booked the full budget applies (ResourceManager.mem_budget()).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = "10,5,60"
+SHRINK_FACTOR = 0.75
+RELAX_RATIO = 0.5
+RELAX_HOLD = 3
+
+_EVENT_KEYS = ("high", "max", "oom")
+
+
+def read_psi(path: str) -> Optional[Dict[str, float]]:
+    """``{"some": avg10, "full": avg10}`` from a PSI file, None if unreadable."""
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError:
+        return None
+    out: Dict[str, float] = {}
+    for line in text.splitlines():
+        kind, _, rest = line.partition(" ")
+        for tok in rest.split():
+            key, _, val = tok.partition("=")
+            if key == "avg10":
+                try:
+                    out[kind] = float(val)
+                except ValueError:
+                    pass
+    return out
+
+
+def read_memory_events(path: str) -> Optional[int]:
+    """Sum of the high/max/oom counters of a cgroup memory.events file."""
+    try:
+        with open(path) as f:
+            total = 0
+            for line in f:
+                key, _, val = line.partition(" ")
+                if key in _EVENT_KEYS:
+                    total += int(val)
+            return total
+    except (OSError, ValueError):
+        return None
+
+
+def parse_thresholds(spec: str) -> Tuple[float, float, float]:
+    parts = spec.split(",")
+    if len(parts) != 3:
+        raise ValueError(f"--psi-admission {spec!r}: expected MEM_SOME,MEM_FULL,CPU_SOME")
+    try:
+        mem_some, mem_full, cpu_some = (float(p) for p in parts)
+    except ValueError:
+        raise ValueError(f"--psi-admission {spec!r}: thresholds must be numbers") from None
+    if min(mem_some, mem_full, cpu_some) < 0:
+        raise ValueError(f"--psi-admission {spec!r}: thresholds must not be negative "
+                         "(0 turns a check off)")
+    return mem_some, mem_full, cpu_some
+
+
+def _over(value: float, threshold: float) -> bool:
+    return threshold > 0 and value >= threshold
+
+
+def _under(value: float, threshold: float) -> bool:
+    return threshold <= 0 or value < RELAX_RATIO * threshold
+
+
+@dataclass
+class PressureReading:
+    mem_some: float = 0.0
+    mem_full: float = 0.0
+    cpu_some: float = 0.0
+    new_events: int = 0
+
+
+class _Gate:
+    """One on/off state with hysteresis."""
+
+    def __init__(self):
+        self.on = False
+        self._calm = 0
+
+    def update(self, hot: bool, cool: bool) -> bool:
+        """Feed one reading; True if the state changed."""
+        if hot:
+            self._calm = 0
+            if not self.on:
+                self.on = True
+                return True
+            return False
+        if self.on and cool:
+            self._calm += 1
+            if self._calm >= RELAX_HOLD:
+                self.on = False
+                self._calm = 0
+                return True
+        else:
+            self._calm = 0
+        return False
+
+
+class PressureController:
+    """Turns PSI readings into ResourceManager admission settings."""
+
+    def __init__(self, thresholds: str = DEFAULT_THRESHOLDS,
+                 cgroup_dir: Optional[str] = None,
+                 proc_dir: str = "/proc/pressure"):
+        self.mem_some_max, self.mem_full_max, self.cpu_some_max = parse_thresholds(thresholds)
+        if cgroup_dir and os.path.exists(os.path.join(cgroup_dir, "memory.pressure")):
+            self.source = cgroup_dir
+            self._mem = os.path.join(cgroup_dir, "memory.pressure")
+            self._cpu = os.path.join(cgroup_dir, "cpu.pressure")
+            self._events: Optional[str] = os.path.join(cgroup_dir, "memory.events")
+        else:
+            self.source = proc_dir
+            self._mem = os.path.join(proc_dir, "memory")
+            self._cpu = os.path.join(proc_dir, "cpu")
+            self._events = None
+        self.available = read_psi(self._mem) is not None
+        self._last_events = read_memory_events(self._events) if self._events else None
+        self.backfill_gate = _Gate()
+        self.shrink_gate = _Gate()
+        self.last = PressureReading()
+
+    def read(self) -> PressureReading:
+        mem = read_psi(self._mem) or {}
+        cpu = read_psi(self._cpu) or {}
+        r = PressureReading(mem.get("some", 0.0), mem.get("full", 0.0), cpu.get("some", 0.0))
+        if self._events:
+            events = read_memory_events(self._events)
+            if events is not None:
+                if self._last_events is not None and events > self._last_events:
+                    r.new_events = events - self._last_events
+                self._last_events = events
+        return r
+
+    def update(self, rm, reading: Optional[PressureReading] = None) -> Optional[str]:
+        """Read (or take) one reading, apply it to *rm*; describe any change."""
+        r = reading if reading is not None else self.read()
+        self.last = r
+        changes = []
+        if self.backfill_gate.update(
+                hot=_over(r.mem_some, self.mem_some_max) or _over(r.cpu_some, self.cpu_some_max),
+                cool=_under(r.mem_some, self.mem_some_max) and _under(r.cpu_some, self.cpu_some_max)):
+            changes.append("backfill " + ("paused" if self.backfill_gate.on else "resumed"))
+        if self.shrink_gate.update(
+                hot=_over(r.mem_full, self.mem_full_max) or r.new_events > 0,
+                cool=_under(r.mem_full, self.mem_full_max)):
+            changes.append(f"memory budget at {SHRINK_FACTOR:.0%}" if self.shrink_gate.on
+                           else "memory budget restored")
+        rm.backfill_paused = self.backfill_gate.on
+        rm.mem_budget_factor = SHRINK_FACTOR if self.shrink_gate.on else 1.0
+        if not changes:
+            return None
+        return (f"{', '.join(changes)} (memory some {r.mem_some:.1f}% full {r.mem_full:.1f}%, "
+                f"cpu some {r.cpu_some:.1f}%, {r.new_events} new memory event(s))")
@@ -0,0 +1,109 @@
+"""Where the runner's own time goes.
+
+On wide workflows the runner can become the bottleneck itself: a pass
+over thousands of candidates, a monitor pass over hundreds of process
+trees. PassProfiler keeps a log2 histogram per phase
+
+  try_submit      one scheduling pass (all of the below but wait_for_any)
+  ok_to_skip      one skip check of one candidate
+  order           policy.order / CandidateQueue.ordered
+  pick            policy.pick_submittable, without the submits
+  submit          starting one task (launcher, renice, monitor registration)
+  wait_for_any    one completion check
+  monitor_pass    one MonitorThread._one_pass (monitor thread)
+
+and, per pass, of the number of candidates and of processes polled. It
+costs two perf_counter_ns() calls and a few integer updates per phase;
+report() goes to the action log at the end of the run and on SIGUSR1.
+Each histogram has a single writing thread, so no lock is taken.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, List
+
+log = logging.getLogger(__name__)
+
+PHASES = ("try_submit", "ok_to_skip", "order", "pick", "submit", "wait_for_any",
+          "monitor_pass")
+COUNTS = ("candidates", "polled")
+
+_N_BUCKETS = 48
+
+
+class Log2Histogram:
+    """Counts values into power-of-two buckets; keeps n, sum and max exact."""
+
+    __slots__ = ("n", "total", "max", "buckets")
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * _N_BUCKETS
+
+    def add(self, value: int) -> None:
+        self.n += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.buckets[min(value.bit_length(), _N_BUCKETS - 1)] += 1
+
+    def quantile(self, q: float) -> int:
+        """Upper edge of the bucket holding the *q* quantile (0 if empty)."""
+        if not self.n:
+            return 0
+        target = q * self.n
+        seen = 0
+        for i, c in enumerate(self.buckets):
+            seen += c
+            if seen >= target:
+                return min((1 << i) - 1 if i else 0, self.max)
+        return self.max
+
+
+class PassProfiler:
+    """Phase timings (ns) and per-pass counts of the scheduling loop."""
+
+    def __init__(self):
+        self.timings: Dict[str, Log2Histogram] = {p: Log2Histogram() for p in PHASES}
+        self.counts: Dict[str, Log2Histogram] = {c: Log2Histogram() for c in COUNTS}
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def add(self, phase: str, t_start_ns: int) -> None:
+        """Record the time since *t_start_ns* (from now()) against *phase*."""
+        self.timings[phase].add(time.perf_counter_ns() - t_start_ns)
+
+    def add_ns(self, phase: str, ns: int) -> None:
+        """Record a duration measured by the caller (e.g. summed over a loop)."""
+        self.timings[phase].add(ns)
+
+    def count(self, what: str, n: int) -> None:
+        self.counts[what].add(n)
+
+    def report(self) -> List[str]:
+        lines = [f"{'phase':<14}{'n':>9}{'total s':>10}{'mean us':>10}"
+                 f"{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}"]
+        for name, h in self.timings.items():
+            if not h.n:
+                continue
+            lines.append(
+                f"{name:<14}{h.n:>9}{h.total / 1e9:>10.3f}{h.total / h.n / 1e3:>10.1f}"
+                f"{h.quantile(0.5) / 1e3:>10.1f}{h.quantile(0.9) / 1e3:>10.1f}"
+                f"{h.quantile(0.99) / 1e3:>10.1f}{h.max / 1e3:>10.1f}")
+        for name, h in self.counts.items():
+            if not h.n:
+                continue
+            lines.append(
+                f"{name:<14}{h.n:>9}{'':>10}{h.total / h.n:>10.1f}"
+                f"{h.quantile(0.5):>10}{h.quantile(0.9):>10}"
+                f"{h.quantile(0.99):>10}{h.max:>10}")
+        return lines
+
+    def log_report(self, logger: logging.Logger, title: str) -> None:
+        logger.info("%s\n%s", title, "\n".join(self.report()))
@@ -0,0 +1,156 @@
+"""Event-driven wake-up on task completion.
+
+The scheduler used to sleep 0.1 s ramping to 1 s between passes and
+poll() every running process on each pass, so a completion could sit
+unnoticed for up to a second on the critical path. ChildReaper instead
+blocks in a selector until something actually happened:
+
+  pidfd   - one ``os.pidfd_open`` descriptor per task (Linux >= 5.3,
+            Python >= 3.9). Readable once the process has exited, so the
+            wake-up names the task that finished. Nothing is reaped here;
+            the owner's poll() still collects the exit status.
+  SIGCHLD - fallback without pidfd: a self-pipe fed by
+            ``signal.set_wakeup_fd``. The wake-up does not say which child
+            exited, so every registered task is reported as a candidate.
+  timeout - last resort (not the main thread, no signals): behaves like
+            the old fixed-interval poll.
+
+Other producers of completions (a launcher helper, a worker pool) can
+hang a descriptor off the same selector with watch(); its callback
+drains the descriptor and returns the tids it knows to be finished.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import selectors
+import signal
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set
+
+log = logging.getLogger(__name__)
+
+
+class ChildReaper:
+    """Blocks until a registered task may have exited or a timeout passes."""
+
+    def __init__(self, use_pidfd: Optional[bool] = None):
+        self._sel = selectors.DefaultSelector()
+        if use_pidfd is None:
+            use_pidfd = hasattr(os, "pidfd_open")
+        self.use_pidfd = use_pidfd
+        self._pidfds: Dict[int, int] = {}      # tid -> pidfd
+        self._registered: Set[int] = set()     # tids without a pidfd
+        self._pending: Set[int] = set()        # reported via notify()
+        self._sigchld_r: Optional[int] = None
+        self._sigchld_w: Optional[int] = None
+        self._old_wakeup_fd: Optional[int] = None
+        self._old_sigchld = None
+        if not self.use_pidfd:
+            self._install_sigchld()
+        self.mode = ("pidfd" if self.use_pidfd
+                     else "sigchld" if self._sigchld_r is not None
+                     else "timeout")
+        log.debug("ChildReaper using %s wake-ups", self.mode)
+
+    def _install_sigchld(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        r, w = os.pipe()
+        os.set_blocking(r, False)
+        os.set_blocking(w, False)
+        try:
+            self._old_wakeup_fd = signal.set_wakeup_fd(w, warn_on_full_buffer=False)
+            # a Python-level handler is needed for the wakeup fd to be
+            # written at all; it does nothing itself
+            self._old_sigchld = signal.signal(signal.SIGCHLD, lambda *_: None)
+        except (ValueError, OSError) as e:
+            log.debug("SIGCHLD wake-up unavailable: %s", e)
+            os.close(r)
+            os.close(w)
+            return
+        self._sigchld_r, self._sigchld_w = r, w
+        self._sel.register(r, selectors.EVENT_READ, data=None)
+
+    # ----- registration -----
+    def register(self, tid: int, pid: int) -> None:
+        """Watch *pid*, a direct or indirect child, on behalf of task *tid*."""
+        if self.use_pidfd:
+            try:
+                fd = os.pidfd_open(pid)
+            except OSError as e:
+                # nothing to wait on; fall back to polling this one task
+                log.debug("pidfd_open(%d) failed: %s", pid, e)
+                self._registered.add(tid)
+                return
+            self._pidfds[tid] = fd
+            self._sel.register(fd, selectors.EVENT_READ, data=tid)
+        else:
+            self._registered.add(tid)
+
+    def unregister(self, tid: int) -> None:
+        self._registered.discard(tid)
+        fd = self._pidfds.pop(tid, None)
+        if fd is not None:
+            self._sel.unregister(fd)
+            os.close(fd)
+
+    def watch(self, fd: int, callback: Callable[[], Iterable[int]]) -> None:
+        """Wake up when *fd* is readable; *callback* returns finished tids."""
+        self._sel.register(fd, selectors.EVENT_READ, data=callback)
+
+    def unwatch(self, fd: int) -> None:
+        self._sel.unregister(fd)
+
+    def notify(self, tids: Iterable[int]) -> None:
+        """Report finished tids learnt outside a wait(); the next one returns them."""
+        self._pending.update(tids)
+
+    # ----- waiting -----
+    def wait(self, timeout: float) -> Set[int]:
+        """Block up to *timeout* seconds; return tids that may have exited.
+
+        The result can be empty (timeout) and can contain tids that are in
+        fact still running (SIGCHLD for some other child); callers poll()
+        what they get, and only that.
+        """
+        ready, self._pending = self._pending, set()
+        all_registered = False
+        for key, _ in self._sel.select(0 if ready else timeout):
+            data = key.data
+            if data is None:
+                self._drain_sigchld()
+                all_registered = True
+            elif callable(data):
+                ready.update(data())
+            else:
+                ready.add(data)
+        # under pidfd, _registered only holds the tasks pidfd_open refused;
+        # like everything in timeout mode they are polled on every wake-up
+        if all_registered or self.mode != "sigchld":
+            ready |= self._registered
+        return ready
+
+    def _drain_sigchld(self) -> None:
+        try:
+            while os.read(self._sigchld_r, 4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def close(self) -> None:
+        for tid in list(self._pidfds):
+            self.unregister(tid)
+        if self._sigchld_r is not None:
+            self._sel.unregister(self._sigchld_r)
+            try:
+                signal.set_wakeup_fd(self._old_wakeup_fd
+                                     if self._old_wakeup_fd is not None else -1)
+                signal.signal(signal.SIGCHLD, self._old_sigchld or signal.SIG_DFL)
+            except (ValueError, OSError, TypeError):
+                pass
+            os.close(self._sigchld_r)
+            os.close(self._sigchld_w)
+            self._sigchld_r = self._sigchld_w = None
+        self._sel.close()
@@ -0,0 +1,231 @@
+"""A local store of learned resource estimates, kept up to date by every run.
+
+Learned estimates used to take a manual chain: ``o2dpg_sim_metrics.py
+json-stat`` on the metric file, ``merge-json-stats`` over the runs, then
+``--update-resources file.json``. With ``--resource-db [PATH]`` the runner
+keeps that aggregate itself, in an SQLite file (default
+~/.cache/o2dpg/resource-estimates.sqlite):
+
+  - at startup the aggregate for this run's feature key is applied like an
+    --update-resources file (an explicit --update-resources is applied
+    afterwards and wins)
+  - at the end of the run, successful or not, what every task that
+    finished with rc 0 used is merged in
+
+The feature key is built from the environment variables named by
+``--resource-db-key VAR,...`` (default: collision system, NWORKERS and the
+O2 installation, i.e. the software tag). Runs with a different key neither
+see nor disturb each other's numbers.
+
+What is stored per (key, global task name, metric) are the ``merge_stats``
+aggregates of o2dpg_sim_metrics.py -- count, Welford mean and M2, min,
+max -- with one run weighing as much as one json-stat file, so stats()
+returns exactly what ``merge-json-stats`` would have written. A run
+contributes per global task name the min/mean/max over its tasks of the
+mean CPU (cores), the peak PSS (MB) and, for default-nice tasks, the
+walltime (s), and the QUANTILES of each of those over its tasks (plus any
+a --resource-quantile asks for). Quantiles are merged across runs as a
+count-weighted mean, as merge_stats does.
+
+Concurrent runners on one node are safe: every merge is one ``BEGIN
+IMMEDIATE`` transaction (the read-modify-write of the aggregates is
+serialised by SQLite's write lock; a runner waits up to LOCK_TIMEOUT
+seconds for it), and the file is in WAL mode, so readers at startup never
+block a writer.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sqlite3
+from contextlib import closing
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+log = logging.getLogger(__name__)
+
+DEFAULT_KEY_VARS = "ALIEN_JDL_LPMINTERACTIONTYPE,NWORKERS,O2_ROOT"
+LOCK_TIMEOUT = 60.0  # s
+QUANTILES = (50.0, 90.0, 99.0)  # as json-stat's default
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " key TEXT PRIMARY KEY, count INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS names ("
+    " key TEXT, name TEXT, count INTEGER NOT NULL, PRIMARY KEY (key, name))",
+    "CREATE TABLE IF NOT EXISTS stats ("
+    " key TEXT, name TEXT, metric TEXT, count INTEGER NOT NULL,"
+    " mean REAL, m2 REAL NOT NULL, min REAL, max REAL,"
+    " PRIMARY KEY (key, name, metric))",
+    "CREATE TABLE IF NOT EXISTS quantiles ("
+    " key TEXT, name TEXT, metric TEXT, q TEXT, count INTEGER NOT NULL, value REAL,"
+    " PRIMARY KEY (key, name, metric, q))",
+)
+
+
+def default_path() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache, "o2dpg", "resource-estimates.sqlite")
+
+
+def feature_key(variables: str, env: Mapping[str, str]) -> str:
+    """``VAR=value;...`` for the comma-separated *variables*, unset ones empty."""
+    names = [v.strip() for v in variables.split(",") if v.strip()]
+    return ";".join(f"{v}={env.get(v, '')}" for v in names)
+
+
+def _r3(x: Optional[float]) -> Optional[float]:
+    return None if x is None else round(x, 3)
+
+
+def quantile(values: Sequence[float], q: float) -> float:
+    """The *q* percent quantile, interpolated linearly (numpy's default)."""
+    v = sorted(values)
+    pos = (len(v) - 1) * q / 100.0
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(v) - 1)
+    return v[lo] + (v[hi] - v[lo]) * (pos - lo)
+
+
+def _is_quantile_key(key: str) -> bool:
+    return key.startswith("p") and key[1:].replace(".", "", 1).isdigit()
+
+
+class RunStats:
+    """What the tasks of this run used, per global task name."""
+
+    def __init__(self, quantiles: Iterable[float] = QUANTILES):
+        self.quantiles = sorted(set(quantiles))
+        # name -> metric -> one value per task (a name has one per timeframe)
+        self._by_name: Dict[str, Dict[str, List[float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def add(self, name: str, cpu: float, pss: float,
+            lifetime: Optional[float] = None) -> None:
+        entry = self._by_name.setdefault(name, {})
+        for metric, v in (("cpu", cpu), ("pss", pss), ("lifetime", lifetime)):
+            if v is not None:
+                entry.setdefault(metric, []).append(v)
+
+    def elementary(self) -> Dict:
+        """This run as one json-stat document (count 1)."""
+        out: Dict = {"count": 1}
+        for name, entry in self._by_name.items():
+            out[name] = {}
+            for metric, values in entry.items():
+                stat = {"min": _r3(min(values)), "max": _r3(max(values)),
+                        "mean": _r3(sum(values) / len(values))}
+                for q in self.quantiles:
+                    stat[f"p{q:g}"] = _r3(quantile(values, q))
+                out[name][metric] = stat
+        return out
+
+
+class ResourceDB:
+    """The SQLite store; a connection per operation, nothing held open."""
+
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        with self._connect() as db:
+            try:
+                db.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.OperationalError:
+                pass  # e.g. a file system without shared memory; rollback journal then
+            for stmt in _SCHEMA:
+                db.execute(stmt)
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        return closing(sqlite3.connect(self.path, timeout=LOCK_TIMEOUT,
+                                       isolation_level=None))
+
+    def merge(self, key: str, elementary: Mapping) -> None:
+        """Fold a json-stat document into the aggregate for *key* (merge_stats)."""
+        n_new = int(elementary.get("count", 1))
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT INTO runs VALUES (?, ?) ON CONFLICT(key) "
+                           "DO UPDATE SET count = count + excluded.count", (key, n_new))
+                for name, metrics in elementary.items():
+                    if name in ("count", "meta-data") or not isinstance(metrics, Mapping):
+                        continue
+                    db.execute("INSERT INTO names VALUES (?, ?, ?) ON CONFLICT(key, name) "
+                               "DO UPDATE SET count = count + excluded.count",
+                               (key, name, n_new))
+                    for metric, vals in metrics.items():
+                        if isinstance(vals, Mapping):
+                            self._merge_metric(db, key, name, metric, vals, n_new)
+                            self._merge_quantiles(db, key, name, metric, vals, n_new)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _merge_metric(db, key: str, name: str, metric: str,
+                      vals: Mapping, n_new: int) -> None:
+        row = db.execute("SELECT count, mean, m2, min, max FROM stats "
+                         "WHERE key = ? AND name = ? AND metric = ?",
+                         (key, name, metric)).fetchone()
+        e_min, e_max, mean_b = vals.get("min"), vals.get("max"), vals.get("mean")
+        if row is None:
+            db.execute("INSERT INTO stats VALUES (?, ?, ?, ?, ?, 0.0, ?, ?)",
+                       (key, name, metric, n_new, mean_b, e_min, e_max))
+            return
+        n_old, mean_a, m2, lo, hi = row
+        if e_min is not None:
+            lo = e_min if lo is None else min(lo, e_min)
+        if e_max is not None:
+            hi = e_max if hi is None else max(hi, e_max)
+        count = n_old
+        if mean_a is None and mean_b is not None:
+            mean_a, m2, count = mean_b, 0.0, n_new
+        elif mean_a is not None and mean_b is not None:
+            # Welford / Chan: combine two means and their M2
+            count = n_old + n_new
+            delta = mean_b - mean_a
+            mean_a += delta * n_new / count
+            m2 += delta * delta * n_old * n_new / count
+        db.execute("UPDATE stats SET count = ?, mean = ?, m2 = ?, min = ?, max = ? "
+                   "WHERE key = ? AND name = ? AND metric = ?",
+                   (count, mean_a, m2, lo, hi, key, name, metric))
+
+    @staticmethod
+    def _merge_quantiles(db, key: str, name: str, metric: str,
+                         vals: Mapping, n_new: int) -> None:
+        for q, value in vals.items():
+            if not _is_quantile_key(q) or value is None:
+                continue
+            db.execute("INSERT INTO quantiles VALUES (?, ?, ?, ?, ?, ?) "
+                       "ON CONFLICT(key, name, metric, q) DO UPDATE SET "
+                       "value = (value * count + excluded.value * excluded.count)"
+                       " / (count + excluded.count), count = count + excluded.count",
+                       (key, name, metric, q, n_new, value))
+
+    def stats(self, key: str) -> Dict:
+        """The aggregate for *key* in merge_stats form; ``{}`` if there is none."""
+        with self._connect() as db:
+            runs = db.execute("SELECT count FROM runs WHERE key = ?", (key,)).fetchone()
+            if runs is None:
+                return {}
+            out: Dict = {"count": runs[0]}
+            for name, count in db.execute(
+                    "SELECT name, count FROM names WHERE key = ?", (key,)):
+                out[name] = {"count": count}
+            for name, metric, count, mean, m2, lo, hi in db.execute(
+                    "SELECT name, metric, count, mean, m2, min, max FROM stats "
+                    "WHERE key = ?", (key,)):
+                std = math.sqrt(m2 / count) if count > 1 else 0.0
+                out.setdefault(name, {"count": count})[metric] = {
+                    "min": _r3(lo), "max": _r3(hi), "mean": _r3(mean), "std": _r3(std),
+                    "M2": m2, "count": count}
+            for name, metric, q, value in db.execute(
+                    "SELECT name, metric, q, value FROM quantiles WHERE key = ?", (key,)):
+                out[name].setdefault(metric, {})[q] = _r3(value)
+        return out
+
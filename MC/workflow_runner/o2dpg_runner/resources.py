@@ -7,13 +7,17 @@ with three changes:
   3. Booking/unbooking is explicit about which bucket (default / backfill).
 
 Sibling-sampling for --dynamic-resources still runs inside unbook(), same
-ordering as before.
+ordering as before, but only updates the RelatedGroup's running aggregate;
+each un-started sibling takes the estimate over when it is next checked
+for submission. Monitor samples are folded into a SampleAccumulator as
+they arrive instead of being kept in lists for the lifetime of the task.
 """
 
 from __future__ import annotations
 
 import logging
 import os
+import time
 from dataclasses import dataclass, field
 from typing import Dict, Iterator, List, Optional, Tuple
 
@@ -38,6 +42,126 @@ class Semaphore:
         self.locked = False
 
 
+class SampleAccumulator:
+    """Running summary of a task's monitor samples, O(1) in their number.
+
+    Gives what the prototype computed from its three sample lists at the
+    end: the mean CPU weighted by the interval before each sample (the
+    first sample only starts the clock; negative readings add no CPU but
+    still count as time) and the maximum memory over all samples.
+    """
+    __slots__ = ("n", "t_first", "t_last", "cpu_integral", "mem_max",
+                 "last_cpu", "last_mem")
+
+    def __init__(self):
+        self.n = 0
+        self.t_first = 0.0
+        self.t_last = 0.0
+        self.cpu_integral = 0.0
+        self.mem_max = 0.0
+        self.last_cpu = 0.0
+        self.last_mem = 0.0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def add(self, t: float, cpu: float, mem: float) -> None:
+        if self.n == 0:
+            self.t_first = t
+            self.mem_max = mem
+        else:
+            if cpu >= 0:
+                self.cpu_integral += cpu * (t - self.t_last)
+            if mem > self.mem_max:
+                self.mem_max = mem
+        self.t_last = t
+        self.last_cpu = cpu
+        self.last_mem = mem
+        self.n += 1
+
+    def cpu_mean(self) -> float:
+        return self.cpu_integral / ((self.t_last - self.t_first) or 1.0)
+
+
+class RelatedGroup(list):
+    """The TaskResources sharing a global task name, with running aggregates.
+
+    Still the list TaskResources.related_tasks refers to. Every finished
+    sibling's sample is folded in once (contribute), so the estimate for
+    the rest -- mean sampled CPU, max sampled MEM -- costs O(1) per finished
+    task instead of a pass over the whole group. publish() only stores the
+    estimate with a new version; an un-started sibling takes it over in
+    refresh(), when it is next considered for booking.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._contrib: Dict[int, Tuple[float, float]] = {}  # tid -> (cpu, mem)
+        self.cpu_sum = 0.0
+        self.mem_max = 0.0
+        self.estimate: Optional[Tuple[float, float]] = None  # (cpu, mem) to hand on
+        self.version = 0
+
+    def contribute(self, res: "TaskResources") -> None:
+        """Fold in (or update) the sample of finished *res*."""
+        old = self._contrib.get(res.tid)
+        cpu, mem = res.cpu_sampled, res.mem_sampled
+        self._contrib[res.tid] = (cpu, mem)
+        if old is not None:
+            self.cpu_sum -= old[0]
+            if old[1] >= self.mem_max and mem < old[1]:
+                self.mem_max = max(m for _, m in self._contrib.values())
+        self.cpu_sum += cpu
+        if mem > self.mem_max:
+            self.mem_max = mem
+
+    def withdraw(self, res: "TaskResources") -> None:
+        """Take *res* out again: it runs once more and is not finished."""
+        old = self._contrib.pop(res.tid, None)
+        if old is None:
+            return
+        self.cpu_sum -= old[0]
+        if old[1] >= self.mem_max:
+            self.mem_max = max((m for _, m in self._contrib.values()), default=0.0)
+
+    def publish(self, res: "TaskResources") -> None:
+        """Store the current estimate; *res*'s assignment replaces a useless one."""
+        if not self._contrib:
+            return
+        cpu_agg = self.cpu_sum / len(self._contrib)
+        mem_agg = self.mem_max
+        boundaries = res.boundaries
+
+        if cpu_agg > boundaries.cpu_limit:
+            log.warning("Sampled CPU (%.2f) exceeds limit (%.2f)",
+                        cpu_agg, boundaries.cpu_limit)
+        elif cpu_agg <= 0:
+            # a zero reading is missing information, not a task that needs no
+            # CPU; handing it on would let every sibling be admitted at once
+            log.debug("Sampled CPU<=0 for %s; reverting to assigned", res.name)
+            cpu_agg = res.cpu_assigned
+
+        if mem_agg > boundaries.mem_limit:
+            log.warning("Sampled MEM (%.2f) exceeds limit (%.2f)",
+                        mem_agg, boundaries.mem_limit)
+        elif mem_agg <= 0:
+            log.debug("Sampled MEM<=0 for %s; reverting to assigned", res.name)
+            mem_agg = res.mem_assigned
+
+        self.estimate = (cpu_agg, mem_agg)
+        self.version += 1
+
+    def refresh(self, res: "TaskResources") -> None:
+        """Give un-started *res* the latest estimate, if it has not got it yet."""
+        if res.estimate_version == self.version or res.is_done or res.booked:
+            return
+        cpu_agg, mem_agg = self.estimate
+        res.cpu_assigned = cpu_agg * res.cpu_relative
+        res.mem_assigned = mem_agg
+        res.limit_resources()
+        res.estimate_version = self.version
+
+
 @dataclass
 class ResourceBoundaries:
     cpu_limit: float
@@ -72,19 +196,40 @@ class TaskResources:
         self.cpu_sampled: Optional[float] = None
         self.mem_sampled: Optional[float] = None
         # live monitor feed
-        self.time_collect: List[float] = []
-        self.cpu_collect: List[float] = []
-        self.mem_collect: List[float] = []
+        self.samples = SampleAccumulator()
         # siblings (same "global" task name)
-        self.related_tasks: Optional[List["TaskResources"]] = None
+        self.related_tasks: Optional[RelatedGroup] = None
+        self.estimate_version = 0  # RelatedGroup estimate last taken over
         self.semaphore: Optional[Semaphore] = None
         self.nice_value: Optional[int] = None
         self.booked = False
+        # --preempt-backfill: SIGSTOPped while booked
+        self.suspended = False
+        self.suspended_since = 0.0
+        self.suspended_total = 0.0
+        # --mem-forecast: peak learned by earlier runs, and how far the
+        # projection of the running task is above its booking
+        self.mem_peak: Optional[float] = None
+        self.mem_excess = 0.0
 
     # ----- helpers -----
+    def suspended_seconds(self, now: float) -> float:
+        """Time spent stopped so far, including a suspension still going on."""
+        if self.suspended:
+            return self.suspended_total + (now - self.suspended_since)
+        return self.suspended_total
+
+    def learned_peak(self) -> Optional[float]:
+        """The larger of the learned pss.max and the peak of finished siblings."""
+        peaks = [p for p in (self.mem_peak,
+                             self.related_tasks.mem_max if self.related_tasks else None)
+                 if p]
+        return max(peaks) if peaks else None
+
     @property
     def is_done(self) -> bool:
-        return bool(self.time_collect) and not self.booked
+        # a sample restored from a journal counts as a run of its own
+        return (self.samples.n > 0 or self.cpu_sampled is not None) and not self.booked
 
     def is_within_limits(self) -> bool:
         """Check the current assignment against global boundaries."""
@@ -108,16 +253,14 @@ class TaskResources:
 
     def add_sample(self, time_passed: float, cpu_fraction: float, mem_mb: float) -> None:
         """Record a monitor sample."""
-        self.time_collect.append(time_passed)
-        self.cpu_collect.append(cpu_fraction)
-        self.mem_collect.append(mem_mb)
+        self.samples.add(time_passed, cpu_fraction, mem_mb)
 
     def sample_resources(self) -> None:
         """Compute CPU/MEM sample and propagate to un-started siblings."""
         if not self.is_done:
             return
 
-        if len(self.time_collect) < 3:
+        if len(self.samples) < 3:
             self.cpu_sampled = self.cpu_assigned
             self.mem_sampled = self.mem_assigned
             log.debug("Task %s: not enough samples (<3); using assigned as sampled",
@@ -125,51 +268,43 @@ class TaskResources:
         else:
             # Weighted mean of CPU over sample intervals, skipping the first
             # (cpu_percent(interval=None) first reading is meaningless).
-            deltas = [self.time_collect[i + 1] - self.time_collect[i]
-                      for i in range(len(self.time_collect) - 1)]
-            tot = sum(deltas) or 1.0
-            cpu_integral = sum(
-                c * dt for c, dt in zip(self.cpu_collect[1:], deltas) if c >= 0
-            )
-            self.cpu_sampled = cpu_integral / tot
-            self.mem_sampled = max(self.mem_collect)
-
-        if self.related_tasks is None:
-            return
-
-        # aggregate over finished siblings
-        mem_agg = 0.0
-        cpu_list: List[float] = []
-        for sib in self.related_tasks:
-            if sib.is_done and sib.cpu_sampled is not None and sib.mem_sampled is not None:
-                mem_agg = max(mem_agg, sib.mem_sampled)
-                cpu_list.append(sib.cpu_sampled)
-        if not cpu_list:
-            return
-        cpu_agg = sum(cpu_list) / len(cpu_list)
-
-        if cpu_agg > self.boundaries.cpu_limit:
-            log.warning("Sampled CPU (%.2f) exceeds limit (%.2f)",
-                        cpu_agg, self.boundaries.cpu_limit)
-        elif cpu_agg <= 0:
-            # a zero reading is missing information, not a task that needs no
-            # CPU; handing it on would let every sibling be admitted at once
-            log.debug("Sampled CPU<=0 for %s; reverting to assigned", self.name)
-            cpu_agg = self.cpu_assigned
-
-        if mem_agg > self.boundaries.mem_limit:
-            log.warning("Sampled MEM (%.2f) exceeds limit (%.2f)",
-                        mem_agg, self.boundaries.mem_limit)
-        elif mem_agg <= 0:
-            log.debug("Sampled MEM<=0 for %s; reverting to assigned", self.name)
-            mem_agg = self.mem_assigned
-
-        for sib in self.related_tasks:
-            if sib.is_done or sib.booked:
+            self.cpu_sampled = self.samples.cpu_mean()
+            self.mem_sampled = self.samples.mem_max
+
+        self.propagate_to_siblings()
+
+    def raise_siblings_mem(self, mem: float) -> int:
+        """Raise un-started siblings to at least *mem* MB; return how many changed.
+
+        Our own sample, taken below the point where the task was killed,
+        must not pull them back down when a later sibling finishes.
+        """
+        group = self.related_tasks
+        if self.mem_sampled is not None and self.mem_sampled < mem:
+            self.mem_sampled = mem
+            if group is not None and self.is_done and self.cpu_sampled is not None:
+                group.contribute(self)
+                group.publish(self)
+        if group is None:
+            return 0
+        n = 0
+        for sib in group:
+            if sib is self or sib.is_done or sib.booked:
                 continue
-            sib.cpu_assigned = cpu_agg * sib.cpu_relative
-            sib.mem_assigned = mem_agg
-            sib.limit_resources()
+            group.refresh(sib)
+            if sib.mem_assigned < mem:
+                sib.mem_assigned = min(mem, self.boundaries.mem_limit)
+                n += 1
+        return n
+
+    def propagate_to_siblings(self) -> None:
+        """Update the estimate un-started siblings take over (RelatedGroup.refresh)."""
+        group = self.related_tasks
+        if group is None:
+            return
+        if self.is_done and self.cpu_sampled is not None and self.mem_sampled is not None:
+            group.contribute(self)
+        group.publish(self)
 
 
 class ResourceManager:
@@ -190,7 +325,7 @@ class ResourceManager:
             cpu_limit, mem_limit, dynamic_resources, optimistic_resources
         )
         self.resources: List[TaskResources] = []
-        self._related_by_name: Dict[str, List[TaskResources]] = {}
+        self._related_by_name: Dict[str, RelatedGroup] = {}
         self._semaphores: Dict[str, Semaphore] = {}
 
         # default-priority bucket
@@ -202,6 +337,14 @@ class ResourceManager:
         self.cpu_booked_backfill = 0.0
         self.mem_booked_backfill = 0.0
         self.n_procs_backfill = 0
+        # backfill tasks stopped by --preempt-backfill: still in the backfill
+        # bucket (they keep their memory), but their CPU is not in use
+        self.cpu_suspended = 0.0
+        self.n_suspended = 0
+        # --mem-forecast: projected memory of running tasks above their
+        # bookings, per bucket (forecast.py); admission counts it as booked
+        self.mem_excess = 0.0
+        self.mem_excess_backfill = 0.0
 
         self.procs_parallel_max = procs_parallel_max
         self.n_backfill_max = n_backfill_max
@@ -214,6 +357,11 @@ class ResourceManager:
             self.nice_default = 0
         self.nice_backfill = self.nice_default + 19
 
+        # set by the --psi-admission controller (pressure.py) while the
+        # kernel reports memory/CPU stalls; neutral otherwise
+        self.mem_budget_factor = 1.0
+        self.backfill_paused = False
+
     # ----- registration -----
     def add_task(
         self,
@@ -223,10 +371,12 @@ class ResourceManager:
         cpu_relative: Optional[float],
         mem: float,
         semaphore_string: Optional[str] = None,
+        mem_peak: Optional[float] = None,
     ) -> TaskResources:
         res = TaskResources(
             len(self.resources), name, cpu, cpu_relative, mem, self.boundaries
         )
+        res.mem_peak = mem_peak
         if not res.is_within_limits() and not self.boundaries.optimistic_resources:
             raise ResourceLimitExceeded(
                 f"Task {name} exceeds resource boundaries "
@@ -243,7 +393,9 @@ class ResourceManager:
             res.semaphore = self._semaphores[semaphore_string]
 
         if related_name:
-            bucket = self._related_by_name.setdefault(related_name, [])
+            bucket = self._related_by_name.get(related_name)
+            if bucket is None:
+                bucket = self._related_by_name[related_name] = RelatedGroup()
             bucket.append(res)
             res.related_tasks = bucket
 
@@ -253,9 +405,39 @@ class ResourceManager:
     def add_monitored(self, tid: int, t_delta: float, cpu_fraction: float, mem_mb: float) -> None:
         self.resources[tid].add_sample(t_delta, cpu_fraction, mem_mb)
 
+    def restore_sampled(self, tid: int, cpu: float, mem: float) -> None:
+        """Reinstate a sample measured by a previous run (journal replay)."""
+        res = self.resources[tid]
+        res.cpu_sampled = cpu
+        res.mem_sampled = mem
+        res.propagate_to_siblings()
+
+    def raise_mem(self, tid: int, factor: float, siblings: bool = False) -> Tuple[float, float]:
+        """Scale an unbooked task's memory assignment, capped at the limit.
+
+        With *siblings*, its un-started siblings get at least as much.
+        """
+        res = self.resources[tid]
+        old = res.mem_assigned
+        res.mem_assigned = min(old * factor, self.boundaries.mem_limit)
+        if siblings:
+            res.raise_siblings_mem(res.mem_assigned)
+        return old, res.mem_assigned
+
+    def restore_mem(self, tid: int, mem: float, siblings: bool = True) -> None:
+        """Reinstate a booking raised by raise_mem() (journal replay)."""
+        res = self.resources[tid]
+        res.mem_assigned = min(max(res.mem_assigned, mem), self.boundaries.mem_limit)
+        if siblings:
+            res.raise_siblings_mem(res.mem_assigned)
+
     # ----- booking -----
     def book(self, tid: int, nice_value: int) -> None:
         res = self.resources[tid]
+        if res.related_tasks is not None:
+            res.related_tasks.refresh(res)
+            # a retry: not finished any more, so not part of the estimate
+            res.related_tasks.withdraw(res)
         # Prior check is expected to have set nice_value; if not, force backfill.
         if res.nice_value is None:
             log.warning("Task %d booked without prior ok_to_submit check; forcing backfill",
@@ -275,8 +457,25 @@ class ResourceManager:
             self.cpu_booked += res.cpu_assigned
             self.mem_booked += res.mem_assigned
 
-    def unbook(self, tid: int) -> None:
+    def project_mem(self, tid: int, projected: float) -> float:
+        """Account booked *tid* as heading for *projected* MB; return the excess."""
+        res = self.resources[tid]
+        excess = max(0.0, projected - res.mem_assigned) if res.booked else 0.0
+        delta = excess - res.mem_excess
+        res.mem_excess = excess
+        if res.nice_value != self.nice_default:
+            self.mem_excess_backfill += delta
+        else:
+            self.mem_excess += delta
+        return excess
+
+    def unbook(self, tid: int, now: Optional[float] = None) -> None:
+        """Release *tid*'s booking; *now* is suspend()'s clock (perf_counter)."""
         res = self.resources[tid]
+        if res.suspended:  # killed while stopped; that time counts too
+            self.resume(tid, time.perf_counter() if now is None else now)
+        if res.mem_excess:
+            self.project_mem(tid, 0.0)
         res.booked = False
         if self.boundaries.dynamic_resources:
             res.sample_resources()
@@ -289,6 +488,7 @@ class ResourceManager:
             if self.n_procs_backfill <= 0:
                 self.cpu_booked_backfill = 0.0
                 self.mem_booked_backfill = 0.0
+                self.mem_excess_backfill = 0.0
         else:
             self.n_procs -= 1
             self.cpu_booked -= res.cpu_assigned
@@ -296,8 +496,32 @@ class ResourceManager:
             if self.n_procs <= 0:
                 self.cpu_booked = 0.0
                 self.mem_booked = 0.0
+                self.mem_excess = 0.0
+
+    def suspend(self, tid: int, now: float) -> None:
+        """Account a booked backfill task as stopped."""
+        res = self.resources[tid]
+        if res.suspended or not res.booked or res.nice_value == self.nice_default:
+            raise ValueError(f"task {res.name} is not a running backfill task")
+        res.suspended = True
+        res.suspended_since = now
+        self.cpu_suspended += res.cpu_assigned
+        self.n_suspended += 1
+
+    def resume(self, tid: int, now: float) -> None:
+        res = self.resources[tid]
+        if not res.suspended:
+            return
+        res.suspended = False
+        res.suspended_total += now - res.suspended_since
+        self.n_suspended -= 1
+        self.cpu_suspended = 0.0 if self.n_suspended <= 0 else self.cpu_suspended - res.cpu_assigned
 
     # ----- queries -----
+    def cpu_active(self) -> float:
+        """Booked CPU of both buckets that is not stopped."""
+        return self.cpu_booked + self.cpu_booked_backfill - self.cpu_suspended
+
     def total_procs(self) -> int:
         return self.n_procs + self.n_procs_backfill
 
@@ -307,13 +531,23 @@ class ResourceManager:
     def cpu_free_default(self) -> float:
         return self.boundaries.cpu_limit - self.cpu_booked
 
+    def mem_budget(self) -> float:
+        """mem_limit, shrunk under memory pressure while anything is booked.
+
+        With nothing booked the full limit applies, so pressure from outside
+        the run can slow it down but never stall it.
+        """
+        if self.mem_budget_factor == 1.0 or self.total_procs() == 0:
+            return self.boundaries.mem_limit
+        return self.boundaries.mem_limit * self.mem_budget_factor
+
     def mem_free_default(self) -> float:
-        return self.boundaries.mem_limit - self.mem_booked
+        return self.mem_budget() - self.mem_booked - self.mem_excess
 
     def fits_default(self, res: TaskResources) -> bool:
         return (
             self.cpu_booked + res.cpu_assigned <= self.boundaries.cpu_limit
-            and self.mem_booked + res.mem_assigned <= self.boundaries.mem_limit
+            and self.mem_booked + self.mem_excess + res.mem_assigned <= self.mem_budget()
         )
 
     def fits_backfill(
@@ -326,7 +560,7 @@ class ResourceManager:
             cpu_factor = self.backfill_cpu_factor
         if mem_factor is None:
             mem_factor = self.backfill_mem_factor
-        if self.n_procs_backfill >= self.n_backfill_max:
+        if self.n_procs_backfill >= self.n_backfill_max or self.backfill_paused:
             return False
         # don't backfill with huge tasks (originals: avoid tasks too close to limit)
         if res.cpu_assigned > 0.9 * self.boundaries.cpu_limit:
@@ -343,8 +577,9 @@ class ResourceManager:
             <= cpu_factor * self.boundaries.cpu_limit
         )
         ok_mem = (
-            self.mem_booked + self.mem_booked_backfill + res.mem_assigned
-            <= mem_factor * self.boundaries.mem_limit
+            self.mem_booked + self.mem_booked_backfill + self.mem_excess
+            + self.mem_excess_backfill + res.mem_assigned
+            <= mem_factor * self.mem_budget()
         )
         return ok_cpu and ok_mem
 
@@ -354,6 +589,9 @@ class ResourceManager:
             return False
         if res.semaphore is not None and res.semaphore.locked:
             return False
+        if res.related_tasks is not None:
+            # every policy asks this first; pick up what finished siblings measured
+            res.related_tasks.refresh(res)
         return True
 
 
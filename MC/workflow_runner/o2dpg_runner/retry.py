@@ -0,0 +1,137 @@
+"""Decide from a failed task's log whether another attempt can help.
+
+_is_worth_retrying() used to say yes to everything, so a deterministic
+failure (a bad configuration, a CCDB object that does not exist) was paid
+--retry-on-failure more times, which for sgnsim is hours. With
+``--retry-rules FILE`` the end of the task's logfile is matched against a
+list of signatures, first match wins:
+
+  {
+    "tail_bytes": 262144,       optional; how much of the log to look at
+    "tail_lines": 400,          optional; ... at most
+    "rules": [
+      {"name": "ccdb-missing", "pattern": "Could not retrieve .* from CCDB",
+       "action": "no-retry"},
+      {"name": "bad-alloc", "pattern": "std::bad_alloc",
+       "action": "retry-more-mem", "mem_factor": 2.0},
+      {"name": "zmq-events", "pattern": "ZMQ_EVENTS", "action": "retry"}
+    ]
+  }
+
+Actions: ``retry`` (as before), ``no-retry`` (fail now), and
+``retry-more-mem`` (retry with the task's memory booking raised by
+mem_factor, a number above 1, --retry-mem-factor by default, capped at
+--mem-limit). A log no rule matches is retried, as before. Patterns are
+Python regular expressions applied to the raw bytes of the tail.
+
+The tail is found by scanning backwards through an mmap of the log, so a
+multi-GB log costs a few pages, not a read of the whole file.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+RETRY = "retry"
+NO_RETRY = "no-retry"
+RETRY_MORE_MEM = "retry-more-mem"
+ACTIONS = (RETRY, NO_RETRY, RETRY_MORE_MEM)
+
+
+@dataclass
+class RetryRule:
+    name: str
+    pattern: "re.Pattern[bytes]"
+    action: str
+    mem_factor: Optional[float] = None
+
+
+def read_tail(path: str, max_bytes: int = 256 * 1024, max_lines: int = 400) -> bytes:
+    """Return the last *max_lines* lines of *path*, at most *max_bytes*."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return b""
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lo = max(0, size - max_bytes)
+            end = size - 1 if mm[size - 1:size] == b"\n" else size
+            # without a newline in the window, keep what there is; a line
+            # cut by the window start is dropped otherwise
+            start, pos = lo, end
+            for _ in range(max_lines):
+                i = mm.rfind(b"\n", lo, pos)
+                if i < 0:
+                    if lo == 0:
+                        start = 0
+                    break
+                start, pos = i + 1, i
+            return mm[start:size]
+
+
+class RetryClassifier:
+    """Matches log tails against rules; counts what matched."""
+
+    def __init__(self, rules: List[RetryRule], tail_bytes: int = 256 * 1024,
+                 tail_lines: int = 400, mem_factor: float = 1.5):
+        self.rules = rules
+        self.tail_bytes = tail_bytes
+        self.tail_lines = tail_lines
+        self.mem_factor = mem_factor
+        self.counts: Counter = Counter()
+
+    @classmethod
+    def from_file(cls, path: str, mem_factor: float = 1.5) -> "RetryClassifier":
+        with open(path) as f:
+            spec = json.load(f)
+        rules = []
+        for r in spec.get("rules", []):
+            action = r.get("action", RETRY)
+            if action not in ACTIONS:
+                raise ValueError(f"{path}: rule {r.get('name')!r}: unknown action "
+                                 f"{action!r}; choose from {', '.join(ACTIONS)}")
+            factor = r.get("mem_factor")
+            if factor is not None and (isinstance(factor, bool)
+                                       or not isinstance(factor, (int, float)) or factor <= 1):
+                raise ValueError(f"{path}: rule {r.get('name')!r}: mem_factor must be a "
+                                 f"number above 1, got {factor!r}")
+            rules.append(RetryRule(
+                name=r.get("name") or r["pattern"],
+                pattern=re.compile(r["pattern"].encode()),
+                action=action,
+                mem_factor=factor,
+            ))
+        return cls(rules,
+                   tail_bytes=int(spec.get("tail_bytes", 256 * 1024)),
+                   tail_lines=int(spec.get("tail_lines", 400)),
+                   mem_factor=mem_factor)
+
+    def classify(self, logfile: str) -> Tuple[str, Optional[RetryRule]]:
+        """Return (action, matching rule or None) for a failed task's log."""
+        if not self.rules:
+            return RETRY, None
+        tail = read_tail(logfile, self.tail_bytes, self.tail_lines)
+        for rule in self.rules:
+            if rule.pattern.search(tail):
+                self.counts[rule.name] += 1
+                return rule.action, rule
+        self.counts["<no match>"] += 1
+        return RETRY, None
+
+    def factor_for(self, rule: RetryRule) -> float:
+        return rule.mem_factor if rule.mem_factor is not None else self.mem_factor
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}: {n}" for name, n in self.counts.most_common())
@@ -1,4 +1,4 @@
-from .base import SchedulerPolicy, SchedulerState
+from .base import CandidateQueue, SchedulerPolicy, SchedulerState
 from .timeframe import TimeframeFirstPolicy
 from .critical_path import CriticalPathPolicy
 from .best_fit import BestFitBackfillPolicy
@@ -16,7 +16,7 @@ def get_policy(name: str) -> SchedulerPolicy:
 
 
 __all__ = [
-    "SchedulerPolicy", "SchedulerState",
+    "CandidateQueue", "SchedulerPolicy", "SchedulerState",
     "TimeframeFirstPolicy", "CriticalPathPolicy", "BestFitBackfillPolicy",
     "get_policy",
 ]
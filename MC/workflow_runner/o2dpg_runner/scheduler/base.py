@@ -10,12 +10,19 @@ A SchedulerPolicy has two responsibilities:
 Resources-aware bookkeeping (what's currently booked, what the limits
 are) lives in ResourceManager. Policies only read it; they don't mutate
 it. The executor calls rm.book() after picking a task.
+
+A policy whose priorities are fixed for the whole run exposes them via
+sort_key(); the executor then keeps its candidates in a CandidateQueue
+that stays sorted across passes instead of re-sorting on every pass.
+Policies that re-rank on the fly return None and get order() called
+each pass, as before.
 """
 
 from __future__ import annotations
 
+import bisect
 from dataclasses import dataclass, field
-from typing import Iterator, List, Tuple, TYPE_CHECKING
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..resources import ResourceManager
@@ -44,9 +51,20 @@ class SchedulerPolicy:
 
     name = "base"
 
+    def sort_key(self, state: SchedulerState) -> Optional[Callable[[int], Tuple]]:
+        """Static per-task priority key (smaller first), or None.
+
+        None means the ranking can change between passes, and the
+        executor must call order() on every pass.
+        """
+        return None
+
     def order(self, candidates: List[int], state: SchedulerState) -> List[int]:
         """Return candidates ordered by policy preference (best first)."""
-        raise NotImplementedError
+        key = self.sort_key(state)
+        if key is None:
+            raise NotImplementedError
+        return sorted(candidates, key=key)
 
     def pick_submittable(
         self,
@@ -60,3 +78,57 @@ class SchedulerPolicy:
         read-only view onto rm's current state.
         """
         raise NotImplementedError
+
+
+class CandidateQueue:
+    """Runnable tasks, kept in policy order across scheduling passes.
+
+    With a static sort_key() the entries live in a list sorted by
+    (key, insertion sequence, tid): insertion and removal are a bisect plus
+    a memmove, and ordered() needs no sort. The insertion sequence
+    reproduces the tie-breaking of a stable sort over a list the tasks were
+    appended to, so the submission order is unchanged. Without a static
+    key, ordered() falls back to policy.order() over insertion order.
+    """
+
+    def __init__(self, policy: SchedulerPolicy, state: SchedulerState):
+        self.policy = policy
+        self.state = state
+        self._key = policy.sort_key(state)
+        self._entries: Dict[int, Tuple] = {}   # tid -> sort entry (insertion-ordered)
+        self._sorted: List[Tuple] = []
+        self._seq = 0
+
+    def add(self, tid: int) -> None:
+        if tid in self._entries:
+            return
+        self._seq += 1
+        if self._key is None:
+            self._entries[tid] = ()
+            return
+        entry = (self._key(tid), self._seq, tid)
+        self._entries[tid] = entry
+        bisect.insort(self._sorted, entry)
+
+    def discard(self, tid: int) -> None:
+        entry = self._entries.pop(tid, None)
+        if entry is None or self._key is None:
+            return
+        i = bisect.bisect_left(self._sorted, entry)
+        del self._sorted[i]
+
+    def ordered(self) -> List[int]:
+        """Candidates, best first."""
+        if self._key is None:
+            return self.policy.order(list(self._entries), self.state)
+        return [e[2] for e in self._sorted]
+
+    def __contains__(self, tid: int) -> bool:
+        return tid in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[int]:
+        """Insertion order."""
+        return iter(list(self._entries))
@@ -35,6 +35,8 @@ class BestFitBackfillPolicy(SchedulerPolicy):
         self._ordering = CriticalPathPolicy()
         self._state: Optional[SchedulerState] = None
 
+    # sort_key() stays None: pick_submittable re-ranks against the budget
+    # left on every pass, and order() is where it learns the state
     def order(self, candidates: List[int], state: SchedulerState) -> List[int]:
         self._state = state
         return self._ordering.order(candidates, state)
@@ -22,14 +22,11 @@ from ..resources import ResourceManager
 class CriticalPathPolicy(SchedulerPolicy):
     name = "critical-path"
 
-    def order(self, candidates: List[int], state: SchedulerState) -> List[int]:
+    def sort_key(self, state: SchedulerState):
         cp = state.critical_path
         tfw = state.timeframe_weight
         # primary: longest path (largest first); tie-break: timeframe, tid
-        return sorted(
-            candidates,
-            key=lambda t: (-cp[t] if cp else 0, tfw[t][0], t),
-        )
+        return lambda t: (-cp[t] if cp else 0, tfw[t][0], t)
 
     def pick_submittable(
         self, ordered: List[int], rm: ResourceManager
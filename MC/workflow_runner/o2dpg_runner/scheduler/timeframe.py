@@ -31,12 +31,10 @@ class TimeframeFirstPolicy(SchedulerPolicy):
         # but keeps scanning, so a light task can slip past a heavy one.
         self.drop_should_break = drop_should_break
 
-    def order(self, candidates: List[int], state: SchedulerState) -> List[int]:
-        # sort prefers small timeframe, then more descendants
-        return sorted(
-            candidates,
-            key=lambda t: (state.timeframe_weight[t][0], -state.timeframe_weight[t][1]),
-        )
+    def sort_key(self, state: SchedulerState):
+        # prefers small timeframe, then more descendants
+        tfw = state.timeframe_weight
+        return lambda t: (tfw[t][0], -tfw[t][1])
 
     def pick_submittable(
         self, ordered: List[int], rm: ResourceManager
@@ -0,0 +1,114 @@
+"""cgroup limits on the per-task scopes, from what the task booked.
+
+Under --systemd-run every task runs in a ``systemd-run --scope`` of its
+own, but the scope only served monitoring: a reco task going far past its
+booking took cores and memory from everything else in the slice. With
+``--scope-limits CPU,HIGH,MAX`` each scope is started with
+
+  CPUQuota   = CPU  x cpu_assigned   cores      (cpu.max)
+  MemoryHigh = HIGH x mem_assigned   MB         (memory.high: reclaim, throttle)
+  MemoryMax  = MAX  x mem_assigned   MB         (memory.max: OOM kill)
+
+The factors are headroom over the booking (default 1.5,1.25,2; 0 leaves a
+limit unset, anything else must be at least 1). No limit goes above --cpu-limit / --mem-limit, and
+MemoryHigh stays below MemoryMax.
+
+What the limits did is read back from the scope once per monitor tick
+(cpu.stat nr_throttled/throttled_usec, memory.events high/max/oom_kill):
+new events are written to the action log, and the dynamic-resources
+sampler is told that a throttled CPU reading or a reclaimed memory reading
+is a lower bound, not what the task wanted.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FACTORS = "1.5,1.25,2"
+
+# counters read back from a scope; all cumulative since the scope started
+CPU_STAT_KEYS = ("nr_throttled", "throttled_usec")
+MEMORY_EVENT_KEYS = ("high", "max", "oom", "oom_kill")
+
+
+def read_scope_counters(cgroup_dir: str) -> Optional[Dict[str, int]]:
+    """Throttle and memory event counters of a scope; None once it is gone."""
+    out: Dict[str, int] = {}
+    for fname, keys in (("cpu.stat", CPU_STAT_KEYS), ("memory.events", MEMORY_EVENT_KEYS)):
+        try:
+            with open(os.path.join(cgroup_dir, fname)) as f:
+                for line in f:
+                    key, _, val = line.partition(" ")
+                    if key in keys:
+                        out[key] = int(val)
+        except (OSError, ValueError):
+            continue
+    return out or None
+
+
+@dataclass(frozen=True)
+class ScopeLimit:
+    """The limits one scope was started with (None: not set)."""
+    cpu: Optional[float] = None       # cores
+    mem_high: Optional[float] = None  # MB
+    mem_max: Optional[float] = None   # MB
+
+    def properties(self) -> List[str]:
+        """systemd-run arguments setting these limits."""
+        out: List[str] = []
+        if self.cpu is not None:
+            out += ["-p", f"CPUQuota={max(1, round(self.cpu * 100))}%"]
+        if self.mem_high is not None:
+            out += ["-p", f"MemoryHigh={max(1, int(self.mem_high))}M"]
+        if self.mem_max is not None:
+            out += ["-p", f"MemoryMax={max(1, int(self.mem_max))}M"]
+        return out
+
+
+class ScopeLimits:
+    """Headroom factors -> per-task limits, and the events they caused."""
+
+    def __init__(self, factors: str = DEFAULT_FACTORS):
+        parts = factors.split(",")
+        if len(parts) != 3:
+            raise ValueError(f"--scope-limits {factors!r}: expected CPU,HIGH,MAX")
+        try:
+            self.cpu_factor, self.high_factor, self.max_factor = (float(p) for p in parts)
+        except ValueError:
+            raise ValueError(f"--scope-limits {factors!r}: factors must be numbers") from None
+        for f in (self.cpu_factor, self.high_factor, self.max_factor):
+            if f < 0:
+                raise ValueError(f"--scope-limits {factors!r}: factors must not be "
+                                 "negative (0 leaves a limit unset)")
+            if 0 < f < 1:
+                raise ValueError(f"--scope-limits {factors!r}: a factor below 1 would "
+                                 "cap a task under its own booking")
+        self.limits: Dict[int, ScopeLimit] = {}
+        self._seen: Dict[int, Dict[str, int]] = {}
+
+    def limit_for(self, tid: int, cpu: float, mem: float,
+                  cpu_limit: float, mem_limit: float) -> ScopeLimit:
+        """Limits for *tid* booked at *cpu* cores / *mem* MB; remembered."""
+        quota = min(cpu * self.cpu_factor, cpu_limit) if cpu > 0 and self.cpu_factor else None
+        mem_max = min(mem * self.max_factor, mem_limit) if mem > 0 and self.max_factor else None
+        high = min(mem * self.high_factor, mem_limit) if mem > 0 and self.high_factor else None
+        if high is not None and mem_max is not None and high >= mem_max:
+            high = None  # memory.high at or above memory.max never triggers
+        lim = ScopeLimit(quota, high, mem_max)
+        self.limits[tid] = lim
+        self._seen.pop(tid, None)  # a resubmitted task gets a fresh scope
+        return lim
+
+    def new_events(self, tid: int, counters: Dict[str, int]) -> Dict[str, int]:
+        """Counter increases since the last call for *tid* (only non-zero ones)."""
+        last = self._seen.get(tid, {})
+        self._seen[tid] = counters
+        return {k: v - last.get(k, 0) for k, v in counters.items() if v > last.get(k, 0)}
+
+    def forget(self, tid: int) -> None:
+        self._seen.pop(tid, None)
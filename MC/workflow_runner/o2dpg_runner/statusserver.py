@@ -0,0 +1,227 @@
+"""Live status of a running workflow over a local HTTP endpoint.
+
+On a shared node, progress used to be read by tailing pipeline_action.
+With ``--status-server ADDR`` the runner answers
+
+  GET /metrics    Prometheus text exposition format
+  GET /status     JSON (also GET /)
+
+on ADDR, which is ``PORT`` (127.0.0.1), ``HOST:PORT`` or ``unix:PATH``:
+
+  curl -s localhost:9123/metrics
+  curl -s --unix-socket /tmp/wf.sock http://runner/status | jq .
+
+Served: tasks by state, booked and free CPU/MEM in the default and the
+backfill bucket, each running task with its latest TaskSnapshot, and the
+remaining critical path (an ETA in seconds when the workflow carries
+learned walltimes, see --update-resources).
+
+Requests are answered from threads of their own and never take a lock
+the scheduler holds: the executor publishes a new status dict by
+replacing one reference, and the provider merges it with the monitor's
+snapshot dict, which is published the same way.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_PROM_PREFIX = "o2dpg_runner_"
+
+
+def parse_address(addr: str) -> Tuple[str, Any]:
+    """``PORT`` / ``HOST:PORT`` / ``unix:PATH`` -> ("tcp", (host, port)) or ("unix", path)."""
+    if addr.startswith("unix:"):
+        path = addr[len("unix:"):]
+        if not path:
+            raise ValueError("--status-server unix: needs a socket path")
+        return "unix", path
+    host, sep, port = addr.rpartition(":")
+    if not sep:
+        host = "127.0.0.1"
+    try:
+        return "tcp", (host.strip("[]") or "127.0.0.1", int(port))
+    except ValueError:
+        raise ValueError(f"--status-server {addr!r}: expected PORT, HOST:PORT "
+                         "or unix:PATH") from None
+
+
+def check_address(addr: str) -> Tuple[str, Any]:
+    """parse_address(), and for ``unix:PATH`` that PATH is free or a socket.
+
+    A socket left behind by a runner that was killed is replaced; anything
+    else at PATH (a typo'd ``unix:$HOME/.bashrc``) is never touched.
+    """
+    kind, where = parse_address(addr)
+    if kind == "unix":
+        try:
+            st = os.lstat(where)
+        except FileNotFoundError:
+            return kind, where
+        except OSError as e:
+            raise ValueError(f"--status-server {addr!r}: {e}") from None
+        if not stat.S_ISSOCK(st.st_mode):
+            raise ValueError(f"--status-server {addr!r}: {where} exists and is not a socket")
+    return kind, where
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(status: Dict[str, Any]) -> str:
+    """Render a status dict (see WorkflowExecutor._status_view) as exposition text."""
+    out: List[str] = []
+
+    def metric(name: str, kind: str, help_: str, samples) -> None:
+        out.append(f"# HELP {_PROM_PREFIX}{name} {help_}")
+        out.append(f"# TYPE {_PROM_PREFIX}{name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            lab = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            out.append(f"{_PROM_PREFIX}{name}{{{lab}}} {float(value):g}" if lab
+                       else f"{_PROM_PREFIX}{name} {float(value):g}")
+
+    metric("tasks", "gauge", "Tasks by state.",
+           [({"state": s}, n) for s, n in status["tasks"].items() if s != "total"])
+    res = status["resources"]
+    metric("cpu_limit", "gauge", "CPU limit (cores).", [({}, res["cpu_limit"])])
+    metric("mem_limit_mb", "gauge", "Memory limit (MB).", [({}, res["mem_limit"])])
+    for what, unit, key in (("cpu", "cores", "cpu"), ("mem", "MB", "mem")):
+        suffix = "_mb" if what == "mem" else ""
+        metric(f"{what}_booked{suffix}", "gauge", f"Booked {what.upper()} ({unit}).",
+               [({"bucket": b}, res[b][f"{key}_booked"]) for b in ("default", "backfill")])
+        metric(f"{what}_free{suffix}", "gauge", f"Unbooked {what.upper()} ({unit}).",
+               [({"bucket": b}, res[b][f"{key}_free"]) for b in ("default", "backfill")])
+    metric("mem_projected_mb", "gauge",
+           "Projected PSS of running tasks above their bookings (--mem-forecast, MB).",
+           [({"bucket": b}, res[b].get("mem_projected")) for b in ("default", "backfill")])
+    running = status["running"]
+    for name, key, help_ in (("task_cpu_percent", "cpu_pct", "Measured CPU (100 = one core)."),
+                             ("task_pss_mb", "pss_mb", "Measured PSS (MB)."),
+                             ("task_uss_mb", "uss_mb", "Measured USS (MB)."),
+                             ("task_elapsed_seconds", "elapsed_s", "Time since submission.")):
+        metric(name, "gauge", help_,
+               [({"task": t["name"], "bucket": t["bucket"]}, t.get(key)) for t in running])
+    cp = status["critical_path"]
+    metric("critical_path_remaining", "gauge",
+           f"Longest remaining path to a leaf ({cp['unit']}).",
+           [({"unit": cp["unit"]}, cp["remaining"])])
+    metric("eta_seconds", "gauge", "Critical-path ETA (with learned walltimes only).",
+           [({}, cp["eta_s"])])
+    metric("uptime_seconds", "gauge", "Time since the run started.", [({}, status["uptime_s"])])
+    return "\n".join(out) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "o2dpg-runner"
+
+    def do_GET(self):  # noqa: N802 (http.server naming)
+        path = self.path.split("?", 1)[0]
+        try:
+            status = self.server.status_server.current()
+        except Exception as e:  # the scheduler must never notice a bad request
+            log.warning("status server: could not assemble status: %s", e)
+            self.send_error(503, "status unavailable")
+            return
+        if status is None:
+            self.send_error(503, "runner not started")
+            return
+        if path == "/metrics":
+            body = prometheus_text(status).encode()
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif path in ("/", "/status"):
+            body = json.dumps(status, default=str).encode()
+            ctype = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, fmt, *args):
+        log.debug("status server: " + fmt, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _ = super().get_request()
+        return conn, ("unix", 0)
+
+
+class _TCP6HTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+
+
+class StatusServer:
+    """Serves what *provider* returns; does nothing without an address."""
+
+    def __init__(self, address: Optional[str], provider: Callable[[], Optional[Dict]]):
+        self.address = address
+        self.provider = provider
+        self._httpd = None
+        self._thread: Optional[threading.Thread] = None
+        self._unix_path: Optional[str] = None
+
+    def current(self) -> Optional[Dict]:
+        return self.provider()
+
+    def start(self) -> None:
+        if not self.address or self._httpd is not None:
+            return
+        kind, where = check_address(self.address)
+        if kind == "unix":
+            if os.path.lexists(where):
+                os.unlink(where)  # a socket left behind by a runner that was killed
+            self._httpd = _UnixHTTPServer(where, _Handler)
+            self._unix_path = where
+        else:
+            cls = _TCP6HTTPServer if ":" in where[0] else ThreadingHTTPServer
+            self._httpd = cls(where, _Handler)
+        self._httpd.status_server = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        kwargs={"poll_interval": 0.5},
+                                        daemon=True, name="o2dpg-status")
+        self._thread.start()
+        log.info("Status server listening on %s", self.bound_address())
+
+    def bound_address(self) -> Optional[str]:
+        if self._httpd is None:
+            return None
+        if self._unix_path is not None:
+            return f"unix:{self._unix_path}"
+        host, port = self._httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def stop(self) -> None:
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._unix_path is not None:
+            try:
+                os.unlink(self._unix_path)
+            except OSError:
+                pass
+        self._httpd = None
@@ -0,0 +1,128 @@
+"""One thread forwarding the stderr of every systemd-scoped task.
+
+Inside a slice each task is started through ``systemd-run --scope``, whose
+own messages ("Running as unit: ...") belong in the action log, not on the
+terminal. That used to be one draining thread per task; with --maxjobs 100
+that is a hundred threads taking turns at the GIL with the monitor and the
+scheduling loop for a handful of lines. StderrMultiplexer reads all those
+pipes from a single selector thread instead, started on first use.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import selectors
+import threading
+from typing import List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class StderrMultiplexer:
+    """Forwards lines from any number of pipes to *logger*, in one thread."""
+
+    def __init__(self, logger: logging.Logger, prefix: str = "[systemd]"):
+        self.logger = logger
+        self.prefix = prefix
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._incoming: List[Tuple[object, str]] = []
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, data=None)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+    def add(self, pipe, tag: str) -> None:
+        """Forward *pipe* (a binary file object) line by line until EOF."""
+        with self._lock:
+            # the selector belongs to the reader thread; hand the pipe over
+            self._incoming.append((pipe, tag))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name="stderr-mux")
+                self._thread.start()
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # already pending
+
+    def n_open(self) -> int:
+        m = self._sel.get_map()  # None once closed
+        return len(m) - 1 if m is not None else 0
+
+    # ----- reader thread -----
+    def _run(self) -> None:
+        while not self._stop:
+            for key, _ in self._sel.select():
+                if key.data is None:
+                    self._take_incoming()
+                else:
+                    self._read(key)
+        self._take_incoming()
+        for key in list(self._sel.get_map().values()):
+            if key.data is not None:
+                while self._read(key):
+                    pass
+                if key.fd in self._sel.get_map():
+                    self._finish(key)
+
+    def _take_incoming(self) -> None:
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            incoming, self._incoming = self._incoming, []
+        for pipe, tag in incoming:
+            fd = pipe.fileno()
+            os.set_blocking(fd, False)
+            self._sel.register(fd, selectors.EVENT_READ, data=[pipe, tag, b""])
+
+    def _read(self, key) -> bool:
+        """Forward the complete lines readable now; False once nothing is."""
+        try:
+            chunk = os.read(key.fd, 65536)
+        except BlockingIOError:
+            return False
+        except OSError:
+            chunk = b""
+        if not chunk:
+            self._finish(key)
+            return False
+        lines = (key.data[2] + chunk).split(b"\n")
+        key.data[2] = lines.pop()  # unterminated tail waits for the rest
+        for line in lines:
+            self._emit(key.data[1], line)
+        return True
+
+    def _finish(self, key) -> None:
+        pipe, tag, partial = key.data
+        self._emit(tag, partial)
+        self._sel.unregister(key.fd)
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+    def _emit(self, tag: str, raw: bytes) -> None:
+        line = raw.rstrip().decode(errors="replace")
+        if line:
+            self.logger.info("%s %s: %s", self.prefix, tag, line)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Forward what is already readable, then stop the thread."""
+        self._stop = True
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._thread is None or not self._thread.is_alive():
+            self._sel.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
@@ -0,0 +1,88 @@
+"""Launch environments, computed once per distinct task environment.
+
+submit() used to copy os.environ (some 300 variables under O2), merge the
+alternative alienv environment, the task's own env and the global env, on
+every launch. The result only depends on those three inputs, and almost
+every task has neither an alternative package nor an env of its own, so
+almost every task ends up with the same environment.
+
+TaskEnvironments builds each distinct environment once, as an immutable
+mapping that all tasks with the same inputs share. A task's own env and
+its alternative package are layered over the shared base with a ChainMap,
+so a task with a three-variable env costs three variables, not a copy of
+the whole environment. subprocess only needs ``items()`` of what it gets.
+
+Precedence is the one submit() always had:
+  alternative env  replaces the base when it defines TERM (a full
+                   environment from ``alienv printenv``), else overlays it
+  task env         overlays both
+  global env       only fills variables nobody else set
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import ChainMap
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+def _frozen(env: Mapping[str, str]) -> Mapping[str, str]:
+    return MappingProxyType(dict(env))
+
+
+class TaskEnvironments:
+    """Per-task launch environments over one shared base environment."""
+
+    def __init__(
+        self,
+        base_env: Mapping[str, str],
+        global_env: Mapping[str, str],
+        stages: List[Dict],
+        alternative_envs: Optional[Dict[int, Dict[str, str]]] = None,
+    ):
+        alternative_envs = alternative_envs or {}
+        globals_ = {k: str(v) for k, v in global_env.items()}
+        # base + global env: what every plain task gets
+        default = dict(base_env)
+        for k, v in globals_.items():
+            default.setdefault(k, v)
+        self.default: Mapping[str, str] = _frozen(default)
+        self._globals = _frozen(globals_)
+
+        self._by_tid: List[Mapping[str, str]] = []
+        interned: Dict[Tuple, Mapping[str, str]] = {}
+        for tid, task in enumerate(stages):
+            alt = alternative_envs.get(tid)
+            own = {k: str(v) for k, v in (task.get("env") or {}).items()}
+            key = (id(alt) if alt else None, tuple(sorted(own.items())))
+            env = interned.get(key)
+            if env is None:
+                env = self._compose(alt, own)
+                interned[key] = env
+            self._by_tid.append(env)
+        log.debug("%d task environments, %d distinct", len(self._by_tid), len(interned))
+
+    def _compose(self, alt: Optional[Dict[str, str]],
+                 own: Dict[str, str]) -> Mapping[str, str]:
+        if not alt and not own:
+            return self.default
+        layers: List[Mapping[str, str]] = []
+        if own:
+            layers.append(_frozen(own))
+        if alt:
+            layers.append(_frozen(alt))
+            if alt.get("TERM") is not None:
+                # a complete environment of its own; only global env fills gaps
+                layers.append(self._globals)
+                return ChainMap(*layers)
+        layers.append(self.default)
+        return ChainMap(*layers)
+
+    def get(self, tid: int) -> Mapping[str, str]:
+        return self._by_tid[tid]
+
+    def n_distinct(self) -> int:
+        return len({id(e) for e in self._by_tid})
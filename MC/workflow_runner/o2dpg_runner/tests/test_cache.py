@@ -117,3 +117,40 @@ def test_remove_done_flag_removes_both(tmp_path):
     remove_done_flag(logfile)
     assert not os.path.exists(done_path(logfile))
     assert not os.path.exists(fp_path)
+
+
+def test_cache_lists_each_directory_once_and_memoizes(tmp_path, monkeypatch):
+    done = [_mkdone(tmp_path, f"t{i}.log") for i in range(5)]
+    todo = os.path.join(str(tmp_path), "u.log")
+    c = TaskCache("lenient")
+    fp = compute_fingerprint(_make_task())
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda d: scans.append(d) or real_scandir(d))
+    for _ in range(3):
+        assert all(c.is_done(lf, fp) for lf in done)
+        assert c.is_done(todo, fp) is False
+    assert scans == [str(tmp_path)]
+
+
+def test_cache_refresh_sees_what_a_task_wrote(tmp_path):
+    logfile = os.path.join(str(tmp_path), "t.log")
+    c = TaskCache("lenient")
+    fp = compute_fingerprint(_make_task())
+    assert c.is_done(logfile, fp) is False
+    open(done_path(logfile), "w").close()      # the task ran
+    assert c.is_done(logfile, fp) is False      # memoized until told
+    c.refresh(logfile)
+    c.record(logfile, fp)
+    assert os.path.exists(fingerprint_path(logfile))
+    assert c.is_done(logfile, fp) is True
+
+
+def test_cache_remove_done_updates_index(tmp_path):
+    logfile = _mkdone(tmp_path)
+    c = TaskCache("off")
+    fp = compute_fingerprint(_make_task())
+    assert c.is_done(logfile, fp) is True
+    c.remove_done(logfile)
+    assert not os.path.exists(done_path(logfile))
+    assert c.is_done(logfile, fp) is False
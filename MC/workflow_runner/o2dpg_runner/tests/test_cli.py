@@ -0,0 +1,73 @@
+import json
+import socket
+
+import pytest
+
+from o2dpg_runner.cli import _check_learned_statistics, build_parser
+
+
+def _parse(*args):
+    return build_parser().parse_args(["-f", "wf.json", *args])
+
+
+def _rejected(capsys, *args):
+    with pytest.raises(SystemExit):
+        _parse(*args)
+    return capsys.readouterr().err
+
+
+def test_status_server_address_is_checked_up_front(tmp_path, capsys):
+    assert _parse("--status-server", "9123").status_server == "9123"
+    assert "expected PORT" in _rejected(capsys, "--status-server", "localhost:http")
+    rc = tmp_path / ".bashrc"
+    rc.write_text("keep me")
+    assert "is not a socket" in _rejected(capsys, "--status-server", f"unix:{rc}")
+    assert rc.read_text() == "keep me"
+    stale = tmp_path / "s.sock"
+    s = socket.socket(socket.AF_UNIX)
+    s.bind(str(stale))
+    s.close()
+    assert _parse("--status-server", f"unix:{stale}").status_server == f"unix:{stale}"
+
+
+def test_light_lane_workers_cannot_be_negative(capsys):
+    assert _parse("--light-lane-workers", "0").light_lane_workers == 0
+    assert _parse("--light-lane-workers", "4").light_lane_workers == 4
+    assert "cannot be negative" in _rejected(capsys, "--light-lane-workers", "-2")
+    assert "not an integer" in _rejected(capsys, "--light-lane-workers", "two")
+
+
+def test_retry_mem_factor_must_raise_the_booking(capsys):
+    assert _parse("--retry-mem-factor", "2").retry_mem_factor == 2.0
+    assert "1 or less" in _rejected(capsys, "--retry-mem-factor", "1")
+    assert "1 or less" in _rejected(capsys, "--retry-mem-factor", "0.5")
+
+
+def test_hang_watchdog_spec_is_checked_up_front(capsys):
+    assert _parse("--hang-watchdog", "2,600,0.5").hang_watchdog == "2,600,0.5"
+    assert "FRACTION cannot be negative" in _rejected(capsys, "--hang-watchdog", "2,600,-1")
+
+
+def test_psi_admission_thresholds_are_checked_up_front(capsys):
+    assert _parse("--psi-admission", "20,10,80").psi_admission == "20,10,80"
+    assert _parse("--psi-admission").psi_admission == "10,5,60"
+    assert "expected MEM_SOME,MEM_FULL,CPU_SOME" in _rejected(capsys, "--psi-admission", "1,2")
+
+
+def test_scope_limits_are_checked_without_a_slice(capsys):
+    assert _parse("--scope-limits", "1,1.2,1.5").scope_limits == "1,1.2,1.5"
+    assert "below 1" in _rejected(capsys, "--scope-limits", "1,0.5,2")
+    assert "must not be negative" in _rejected(capsys, "--scope-limits=-1,1,1")
+
+
+def test_resource_quantile_is_checked_against_the_learned_data(tmp_path, capsys):
+    assert "bad quantile" in _rejected(capsys, "--resource-quantile", "mem=p0")
+    res = tmp_path / "res.json"
+    res.write_text(json.dumps({"sgnsim": {"pss": {"max": 3000, "p50": 2000, "p90": 2500}}}))
+    parser = build_parser()
+    ns = _parse("--update-resources", str(res), "--resource-quantile", "mem=p90")
+    _check_learned_statistics(parser, ns)
+    ns.resource_quantile = "mem=p97"
+    with pytest.raises(SystemExit):
+        _check_learned_statistics(parser, ns)
+    assert "has no pss.p97" in capsys.readouterr().err
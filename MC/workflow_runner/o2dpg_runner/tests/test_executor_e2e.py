@@ -9,6 +9,7 @@ import logging
 import os
 import shutil
 import sys
+import time
 from types import SimpleNamespace
 
 import pytest
@@ -16,6 +17,11 @@ import pytest
 from o2dpg_runner.config import RunnerConfig
 from o2dpg_runner.workflow import build_workflow, load_json
 from o2dpg_runner.executor import WorkflowExecutor
+from o2dpg_runner.graph import ReadyTracker
+from o2dpg_runner.launcher import LauncherError, PopenLauncher
+from o2dpg_runner.scopelimits import ScopeLimits
+from o2dpg_runner.pressure import RELAX_HOLD, PressureController
+from o2dpg_runner.oom import MAX_RESUBMITS as OOM_MAX_RESUBMITS, OomDetector
 
 FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "tiny_workflow.json")
 
@@ -46,7 +52,7 @@ def _prep_workflow_in_tmp(tmp_path):
     return str(fixture_path)
 
 
-def _make_executor(tmp_path, cfg_overrides=None):
+def _make_executor(tmp_path, cfg_overrides=None, resources=None):
     os.chdir(str(tmp_path))
     wf_path = _prep_workflow_in_tmp(tmp_path)
     cfg = RunnerConfig(
@@ -61,6 +67,8 @@ def _make_executor(tmp_path, cfg_overrides=None):
         for k, v in cfg_overrides.items():
             setattr(cfg, k, v)
     raw = load_json(wf_path)
+    for t in raw["stages"]:
+        t["resources"].update((resources or {}).get(t["name"], {}))
     wf = build_workflow(raw, cfg.target_tasks, cfg.target_labels)
     action_logger = _make_logger("a", str(tmp_path / "act.log"))
     metric_logger = _make_logger("m", str(tmp_path / "met.log"))
@@ -92,10 +100,11 @@ class _FakeMonitor:
         self.snap = SimpleNamespace(
             tid=0, name="t", t_delta_ms=1000, cpu_pct=100.0, uss_mb=1.0,
             pss_mb=2.0, swap_mb=0.0, nice=0, labels=[], disc_mb=-1,
-            cgroup_cpu_pct=None, cgroup_mem_mb=None)
+            cgroup_cpu_pct=None, cgroup_mem_mb=None, scope_counters=None,
+            idle_s=0.0, hung=False, mem_fresh=False)
 
-    def latest(self):
-        return {0: self.snap}
+    def latest_tick(self):
+        return self.tick, {0: self.snap}
 
 
 def test_a_monitor_tick_is_recorded_once_however_often_it_is_polled(tmp_path):
@@ -103,16 +112,69 @@ def test_a_monitor_tick_is_recorded_once_however_often_it_is_polled(tmp_path):
     snapshot twice defeats the 'too few samples' guard in sample_resources()."""
     exe = _make_executor(tmp_path)
     exe.monitor = _FakeMonitor()
-    exe.process_list = [(0, _FakeProc())]
+    exe.running = {0: _FakeProc()}
 
     for _ in range(5):
         exe.wait_for_any([], [])
-    assert len(exe.rm.resources[0].time_collect) == 1
+    assert len(exe.rm.resources[0].samples) == 1
 
     exe.monitor.tick = 2
     exe.monitor.snap.t_delta_ms = 2000
     exe.wait_for_any([], [])
-    assert exe.rm.resources[0].time_collect == [1000, 2000]
+    samples = exe.rm.resources[0].samples
+    assert (samples.n, samples.t_first, samples.t_last) == (2, 1000, 2000)
+
+
+def test_mem_forecast_holds_back_admission(tmp_path):
+    exe = _make_executor(tmp_path, {"mem_forecast": 30.0})
+    exe.monitor = _FakeMonitor()
+    exe.running = {0: _FakeProc()}
+    exe.rm.resources[0].nice_value = exe.rm.nice_default
+    exe.rm.book(0, exe.rm.nice_default)  # bkg, 500 MB
+    big = exe.rm.resources[exe.wf.tid("sgnsim_1")]
+    big.mem_assigned = 12000
+    assert exe.rm.fits_default(big)
+
+    snap = exe.monitor.snap
+    snap.mem_fresh, snap.pss_mb = True, 400.0
+    exe.wait_for_any([], [])
+    assert exe.rm.mem_excess == 0.0
+    # +200 MB/s: 6400 MB in 30 s
+    exe.monitor.tick, snap.t_delta_ms, snap.pss_mb = 2, 2000, 600.0
+    exe.wait_for_any([], [])
+    assert exe.rm.mem_excess == pytest.approx(6100.0)
+    assert not exe.rm.fits_default(big)
+    assert "Task bkg heads for 6600 MB within 30s (booked 500 MB)" in \
+        (tmp_path / "act.log").read_text()
+    # a stale reading changes nothing
+    exe.monitor.tick, snap.mem_fresh, snap.pss_mb = 3, False, 5000.0
+    exe.wait_for_any([], [])
+    assert exe.rm.mem_excess == pytest.approx(6100.0)
+    exe.rm.unbook(0)
+    assert exe.rm.mem_excess == 0.0 and exe.rm.fits_default(big)
+
+
+def test_scope_limit_events_reach_the_sampler_and_the_action_log(tmp_path):
+    """A task throttled at its CPUQuota or reclaimed at MemoryHigh wanted at
+    least the limit; the sampler must not learn the capped reading."""
+    exe = _make_executor(tmp_path)
+    exe.monitor = _FakeMonitor()
+    exe.running = {0: _FakeProc()}
+    exe.scope_limits = ScopeLimits("1.5,1.25,2")
+    exe.scope_limits.limit_for(0, cpu=2, mem=1000, cpu_limit=8, mem_limit=16000)
+
+    exe.monitor.snap.scope_counters = {"nr_throttled": 0, "throttled_usec": 0, "high": 0}
+    exe.wait_for_any([], [])
+    assert exe.rm.resources[0].samples.last_cpu == pytest.approx(1.0)
+
+    exe.monitor.tick = 2
+    exe.monitor.snap.scope_counters = {"nr_throttled": 7, "throttled_usec": 350000, "high": 3}
+    exe.wait_for_any([], [])
+    assert exe.rm.resources[0].samples.last_cpu == pytest.approx(3.0)
+    assert exe.rm.resources[0].samples.last_mem == pytest.approx(1250.0)
+    text = (tmp_path / "act.log").read_text()
+    assert "throttled at CPUQuota 3.00 cores: 0.35s in 7 period(s)" in text
+    assert "over MemoryHigh 1250 MB 3 time(s)" in text
 
 
 def test_executor_runs_all_tasks(tmp_path):
@@ -169,6 +231,202 @@ def test_executor_best_fit_policy(tmp_path):
                for t in wf.stages)
 
 
+def test_executor_forkserver_launcher(tmp_path):
+    rc, wf, path = _run(tmp_path, {"launcher": "forkserver"})
+    assert rc is False
+    assert all((path / (t.get("cwd", ".") or ".") / f"{t['name']}.log_done").exists()
+               for t in wf.stages)
+
+
+def test_executor_falls_back_to_popen_when_the_forkserver_fails(tmp_path):
+    exe = _make_executor(tmp_path, {"launcher": "forkserver"})
+    forkserver = exe.launcher
+
+    def stuck(tid, *args, **kwargs):
+        raise LauncherError(f"no reply from the task launcher for tid {tid}")
+
+    forkserver.spawn = stuck
+    assert exe.execute() is False
+    assert isinstance(exe.launcher, PopenLauncher)
+    assert exe._retired_launchers == [forkserver]
+    assert "launching with popen from now on" in (tmp_path / "act.log").read_text()
+    assert all((tmp_path / f"{t['name']}.log_done").exists()
+               for t in exe.wf.stages if not t.get("cwd"))
+
+
+def test_executor_resumes_from_journal(tmp_path):
+    journal = str(tmp_path / "runner.journal")
+    rc, wf, path = _run(tmp_path, {"journal": journal})
+    assert rc is False
+
+    # a task whose _done went away since is a stale entry and runs again;
+    # the rest counts as finished without a level-by-level stat pass, and
+    # what is downstream of the stale task waits for it (then skips as usual)
+    reco_2 = next(t for t in wf.stages if t["name"] == "reco_2")
+    done = path / (reco_2.get("cwd", ".") or ".") / "reco_2.log_done"
+    done.unlink()
+    exe = _make_executor(tmp_path, {"journal": journal})
+    resumed = exe._replay_journal()
+    assert resumed.finished == set(range(wf.n_tasks()))
+    ready = ReadyTracker(exe.wf.forward_adj, exe.wf.indegree)
+    initial = exe._resume_from_journal(resumed, ready)
+    assert [exe.wf.id_to_name[t] for t in initial] == ["reco_2"]
+    assert exe.proc_status[exe.wf.tid("qc_2")] == "ToDo"
+    assert exe.proc_status[exe.wf.tid("qc_1")] == "Done"
+
+    assert exe.execute() is False
+    assert done.exists()
+    events = [json.loads(line) for line in open(journal)]
+    last_header = max(i for i, e in enumerate(events) if e["ev"] == "header")
+    submitted = [wf.id_to_name[e["tid"]] for e in events[last_header:]
+                 if e["ev"] == "submit"]
+    assert submitted == ["reco_2"]
+
+
+def test_executor_light_lane_runs_zero_cpu_tasks_unbooked(tmp_path):
+    exe = _make_executor(tmp_path, {"light_lane_workers": 2})
+    assert exe.light_tids == set()  # the fixture declares no cpu-0 task
+    exe.light_tids = {exe.wf.tid("qc_1"), exe.wf.tid("qc_2")}
+    booked = []
+    real_book = exe.rm.book
+    exe.rm.book = lambda tid, nice: (booked.append(tid), real_book(tid, nice))
+    assert exe.execute() is False
+    names = {exe.wf.id_to_name[t] for t in booked}
+    assert names == {t["name"] for t in exe.wf.stages} - {"qc_1", "qc_2"}
+    for name in ("qc_1", "qc_2"):
+        t = exe.wf.stages[exe.wf.tid(name)]
+        assert (tmp_path / (t.get("cwd", ".") or ".") / f"{name}.log_done").exists()
+    assert exe.rm.total_procs() == 0
+
+
+def test_executor_light_lane_takes_only_tasks_declaring_no_memory(tmp_path):
+    # the lane books nothing, so a task declaring memory must stay booked
+    zero = {"cpu": 0, "relative_cpu": None}
+    exe = _make_executor(tmp_path, {"light_lane_workers": 2},
+                         resources={"qc_1": dict(zero, mem=0), "qc_2": zero})
+    assert exe.light_tids == {exe.wf.tid("qc_1")}
+
+
+def test_executor_retry_rules_stop_deterministic_failures(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"rules": [
+        {"name": "no-such-file", "pattern": "No such file", "action": "no-retry"},
+    ]}))
+    exe = _make_executor(tmp_path, {"retry_rules": str(rules), "retry_on_failure": 2,
+                                    "keep_going": True})
+    tid = exe.wf.tid("qc_1")
+    exe.wf.stages[tid]["cmd"] = "(cat /does/not/exist) > qc_1.log 2>&1"
+    assert exe.execute() is True
+    assert exe.retry_counter[tid] == 0
+    assert exe.retry_classifier.counts == {"no-such-file": 1}
+
+
+def test_executor_retry_more_mem_is_journaled_for_a_resume(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"rules": [
+        {"name": "oom", "pattern": "bad_alloc", "action": "retry-more-mem", "mem_factor": 2},
+    ]}))
+    journal = str(tmp_path / "runner.journal")
+    cfg = {"retry_rules": str(rules), "retry_on_failure": 1, "keep_going": True,
+           "journal": journal}
+    exe = _make_executor(tmp_path, cfg)
+    tid = exe.wf.tid("qc_1")
+    exe.wf.stages[tid]["cmd"] = "(echo std::bad_alloc; exit 1) > qc_1.log 2>&1"
+    assert exe.execute() is True
+    assert exe.rm.resources[tid].mem_assigned == 1000
+
+    exe = _make_executor(tmp_path, cfg)
+    exe._resume_from_journal(exe._replay_journal(),
+                             ReadyTracker(exe.wf.forward_adj, exe.wf.indegree))
+    assert exe.rm.resources[tid].mem_assigned == 1000
+    assert exe.rm.resources[exe.wf.tid("qc_2")].mem_assigned == 500  # not its siblings
+
+
+def test_executor_resubmits_oom_killed_task_with_more_memory(tmp_path):
+    kmsg = tmp_path / "kmsg"
+    kmsg.write_bytes(b"")
+    exe = _make_executor(tmp_path, {"oom_resubmit": 2.0})
+    exe.oom = OomDetector(None, kmsg_path=str(kmsg))
+    tid = exe.wf.tid("qc_1")
+    # the "kernel" reports the kill, then the task dies of SIGKILL
+    exe.wf.stages[tid]["cmd"] = (
+        "if [ -e killed_once ]; then (echo ok) > qc_1.log && touch qc_1.log_done; "
+        f"else touch killed_once; echo \"6,1,1,-;Killed process $$ (qc)\" >> {kmsg}; "
+        "kill -9 $$; fi")
+    assert exe.execute() is False
+    assert exe.retry_counter[tid] == 0       # --retry-on-failure untouched
+    assert exe.oom_resubmits[tid] == 1
+    assert exe.rm.resources[tid].mem_assigned == 1000
+    assert "OOM-killed (oom_kill in kernel log); resubmitting with mem 1000 MB (was 500)" in \
+        (tmp_path / "act.log").read_text()
+
+
+def test_executor_oom_resubmits_are_capped(tmp_path):
+    kmsg = tmp_path / "kmsg"
+    kmsg.write_bytes(b"")
+    exe = _make_executor(tmp_path, {"oom_resubmit": 1.1, "keep_going": True})
+    exe.oom = OomDetector(None, kmsg_path=str(kmsg))
+    tid = exe.wf.tid("qc_1")
+    exe.wf.stages[tid]["cmd"] = f"echo \"6,1,1,-;Killed process $$ (qc)\" >> {kmsg}; kill -9 $$"
+    assert exe.execute() is True
+    assert exe.oom_resubmits[tid] == OOM_MAX_RESUBMITS
+    assert "after %d resubmission(s); not resubmitting" % OOM_MAX_RESUBMITS in \
+        (tmp_path / "act.log").read_text()
+
+
+def test_executor_sigkill_without_evidence_is_no_oom(tmp_path):
+    exe = _make_executor(tmp_path, {"oom_resubmit": 2.0, "keep_going": True})
+    exe.oom = OomDetector(None, kmsg_path=str(tmp_path / "no-kmsg"))
+    tid = exe.wf.tid("qc_1")
+    exe.wf.stages[tid]["cmd"] = "kill -9 $$"
+    assert exe.execute() is True
+    assert exe.oom_resubmits[tid] == 0
+    assert exe.rm.resources[tid].mem_assigned == 500
+
+
+@pytest.mark.skipif(shutil.which("taskset") is None, reason="needs taskset")
+def test_executor_cpu_placement(tmp_path):
+    # one task at a time: each finds its CPU free even on a single-core machine
+    exe = _make_executor(tmp_path, {"cpu_placement": "taskset", "maxjobs": 1})
+    n_cpus = exe.placer.n_free()
+    assert exe.execute() is False
+    assert exe.placer.n_free() == n_cpus and not exe.placer.placed
+    assert "Placing qc_1 on CPUs" in (tmp_path / "act.log").read_text()  # cpu 1
+
+
+def test_executor_resource_db_learns_and_applies(tmp_path):
+    db = str(tmp_path / "estimates.sqlite")
+    exe = _make_executor(tmp_path, {"resource_db": db, "resource_db_key": "NWORKERS"})
+    assert "nothing learned yet" in (tmp_path / "act.log").read_text()
+    # echo is gone before the monitor sees it; give reco_1/2 the samples it would have
+    for name, cpu in (("reco_1", 1.0), ("reco_2", 3.0)):
+        for i in range(4):
+            exe.rm.add_monitored(exe.wf.tid(name), i * 1.0, cpu, 700.0 + 100 * cpu)
+    assert exe.execute() is False
+
+    exe = _make_executor(tmp_path, {"resource_db": db, "resource_db_key": "NWORKERS"})
+    reco = exe.wf.stages[exe.wf.tid("reco_2")]["resources"]
+    assert reco["cpu"] == pytest.approx(2.0)
+    assert reco["mem"] == pytest.approx(1000.0)
+    assert reco["walltime"] >= 0
+    # the fixture's other tasks ran unseen and stay as declared
+    assert exe.wf.stages[exe.wf.tid("digi_2")]["resources"]["cpu"] == 2
+
+
+def test_executor_hang_watchdog_kills_idle_tasks(tmp_path):
+    # anything below 50% of a core for 0.5 s counts as hung here
+    exe = _make_executor(tmp_path, {"hang_watchdog": "50,0.5,0", "keep_going": True})
+    tid = exe.wf.tid("qc_1")
+    exe.wf.stages[tid]["cmd"] = "sleep 60"
+    t0 = time.time()
+    assert exe.execute() is True
+    assert time.time() - t0 < 30
+    text = (tmp_path / "act.log").read_text()
+    # killed, retried once (retry_on_failure is 0), killed again, failed
+    assert text.count("Task qc_1 looks hung") == 2
+    assert "Task qc_1 marked for retry after a hang" in text
+
+
 def test_executor_drop_should_break(tmp_path):
     rc, wf, path = _run(tmp_path, {"drop_should_break": True})
     assert rc is False
@@ -214,3 +472,97 @@ def test_executor_cache_lenient_end_to_end(tmp_path):
                    if s["name"] == t)
         assert os.path.exists(str(tmp_path / cwd / f"{t}.log_done"))
         assert os.path.exists(str(tmp_path / cwd / f"{t}.log_done.json"))
+
+
+def test_executor_trace_file(tmp_path):
+    trace = tmp_path / "trace.json"
+    rc, wf, _ = _run(tmp_path, {"trace_file": str(trace)})
+    assert rc is False
+    events = json.loads(trace.read_text())
+    begins = [e for e in events if e["ph"] == "B"]
+    ends = [e for e in events if e["ph"] == "E"]
+    assert sorted(e["name"] for e in begins) == sorted(t["name"] for t in wf.stages)
+    assert len(ends) == len(begins)
+    # every task queued as a candidate before it started
+    queued = {e["name"] for e in events if e["ph"] == "b"}
+    assert queued == {t["name"] for t in wf.stages}
+    # a slot never holds two tasks at once
+    open_on = {}
+    for e in sorted(begins + ends, key=lambda e: (e["ts"], e["ph"] == "B")):
+        key = (e["pid"], e["tid"])
+        if e["ph"] == "B":
+            assert key not in open_on
+            open_on[key] = e["name"]
+        else:
+            del open_on[key]
+
+
+def test_executor_status_server_publishes_progress(tmp_path):
+    sock = tmp_path / "status.sock"
+    exe = _make_executor(tmp_path, {"status_server": f"unix:{sock}"})
+    assert exe._status_view() is None  # nothing published before execute()
+    assert exe.execute() is False
+    assert not sock.exists()  # removed when the server stops
+    status = exe._status_view()
+    n = exe.wf.n_tasks()
+    assert status["tasks"]["total"] == n
+    assert status["tasks"]["done"] == n and status["tasks"]["running"] == 0
+    assert status["tasks"]["failed"] == 0
+    assert status["resources"]["default"]["cpu_free"] <= status["resources"]["cpu_limit"]
+    assert status["critical_path"]["unit"] == "cpu-weight"
+
+
+def test_executor_psi_admission(tmp_path):
+    """Monitor ticks feed the pressure gate; backfill stops and comes back
+    only after RELAX_HOLD calm readings."""
+    psi = tmp_path / "pressure"
+    psi.mkdir()
+
+    def stall(mem_some):
+        for f in ("memory", "cpu"):
+            (psi / f).write_text(f"some avg10={mem_some if f == 'memory' else 0:.2f} "
+                                 "avg60=0.00 avg300=0.00 total=1\n"
+                                 "full avg10=0.00 avg60=0.00 avg300=0.00 total=1\n")
+
+    stall(0.0)
+    exe = _make_executor(tmp_path, {"psi_admission": "10,5,60"})
+    exe.pressure = PressureController("10,5,60", proc_dir=str(psi))
+    exe.monitor = _FakeMonitor()
+    exe.running = {0: _FakeProc()}
+    backfill = exe.rm.resources[exe.wf.tid("sgnsim_1")]
+    assert exe.rm.fits_backfill(backfill)
+
+    def tick(mem_some):
+        stall(mem_some)
+        exe.monitor.tick += 1
+        exe.wait_for_any([], [])
+
+    tick(12.0)
+    assert exe.rm.backfill_paused and not exe.rm.fits_backfill(backfill)
+    tick(7.0)  # below the threshold, above the relax level
+    for _ in range(RELAX_HOLD - 1):
+        tick(1.0)
+    assert exe.rm.backfill_paused
+    tick(1.0)
+    assert not exe.rm.backfill_paused and exe.rm.fits_backfill(backfill)
+    text = (tmp_path / "act.log").read_text()
+    assert text.count("Pressure: backfill paused") == 1
+    assert text.count("Pressure: backfill resumed") == 1
+
+
+def test_executor_preempt_backfill(tmp_path):
+    """cpu 6: sgnsim_2 (4) runs as backfill next to sgnsim_1; reco_1 (4)
+    needs its cores and stops it until reco_1 is done."""
+    exe = _make_executor(tmp_path, {"preempt_backfill": True, "cpu_limit": 6})
+    for name, cmd in (("sgnsim_2", "sleep 2"), ("reco_1", "sleep 0.5")):
+        task = exe.wf.stages[exe.wf.tid(name)]
+        task["cmd"] = task["cmd"].replace(f"(echo {name})", f"({cmd})")
+    assert exe.execute() is False
+    res = exe.rm.resources[exe.wf.tid("sgnsim_2")]
+    assert res.nice_value == exe.rm.nice_backfill
+    assert 0.4 < res.suspended_total < 2.0
+    assert exe.rm.n_suspended == 0 and exe.rm.cpu_suspended == 0
+    text = (tmp_path / "act.log").read_text()
+    assert text.index("Suspending backfill task sgnsim_2 for reco_1") \
+        < text.index("reco_1 finished rc=0") \
+        < text.index("Resuming backfill task sgnsim_2")
@@ -0,0 +1,64 @@
+import pytest
+
+from o2dpg_runner.forecast import MemForecaster, PssTrend
+from o2dpg_runner.resources import ResourceManager
+
+
+def test_trend_extrapolates_growth_only():
+    tr = PssTrend()
+    tr.add(0.0, 1000.0)
+    assert tr.projected(30) == 1000.0  # one reading: no slope yet
+    tr.add(5.0, 2000.0)                 # +200 MB/s
+    assert tr.projected(10) == pytest.approx(4000.0)
+    tr.add(10.0, 2500.0)                # +100 MB/s, smoothed with the last
+    assert tr.slope == pytest.approx(150.0)
+    tr.add(10.0, 9999.0)                # no time passed: ignored
+    assert tr.mem == 2500.0
+    tr.add(15.0, 1000.0)                # shrinking: counted at the reading
+    assert tr.projected(30) == 1000.0
+
+
+def test_learned_peak_caps_the_projection_until_passed():
+    fc = MemForecaster(horizon=30)
+    fc.observe(1, 0.0, 1000.0, peak=3000.0)
+    assert fc.observe(1, 1.0, 1500.0, peak=3000.0) == 3000.0
+    # beyond its learned peak the peak was wrong; the trend alone counts
+    assert fc.observe(1, 2.0, 3500.0, peak=3000.0) > 3500.0
+    fc.forget(1)
+    assert fc.observe(1, 3.0, 3500.0) == 3500.0
+    with pytest.raises(ValueError):
+        MemForecaster(horizon=-1)
+
+
+def test_projected_excess_is_accounted_per_bucket():
+    rm = ResourceManager(cpu_limit=8, mem_limit=10000, n_backfill_max=2)
+    for i in range(3):
+        rm.add_task(f"t_{i + 1}", "t", 1, 1, 2000)
+    rm.resources[0].nice_value = rm.nice_default
+    rm.book(0, rm.nice_default)
+    rm.resources[1].nice_value = rm.nice_backfill
+    rm.book(1, rm.nice_backfill)
+    cand = rm.resources[2]
+
+    assert rm.project_mem(0, 1500.0) == 0.0  # below its booking
+    assert rm.project_mem(0, 7000.0) == 5000.0
+    assert rm.project_mem(1, 2500.0) == 500.0
+    assert (rm.mem_excess, rm.mem_excess_backfill) == (5000.0, 500.0)
+    assert rm.mem_free_default() == 3000.0
+    assert rm.fits_default(cand)
+    rm.project_mem(0, 9000.0)
+    assert not rm.fits_default(cand)
+    rm.unbook(0)
+    assert rm.mem_excess == 0.0 and rm.fits_default(cand)
+    # unbooked tasks carry no projection
+    assert rm.project_mem(0, 9000.0) == 0.0
+
+
+def test_learned_peak_from_workflow_and_siblings():
+    rm = ResourceManager(cpu_limit=8, mem_limit=16000, dynamic_resources=True)
+    rm.add_task("t_1", "t", 1, 1, 2000, mem_peak=2500.0)
+    rm.add_task("t_2", "t", 1, 1, 2000)
+    assert rm.resources[1].learned_peak() is None
+    assert rm.resources[0].learned_peak() == 2500.0
+    rm.restore_sampled(1, 1.0, 3000.0)
+    assert rm.resources[0].learned_peak() == 3000.0
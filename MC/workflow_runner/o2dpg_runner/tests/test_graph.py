@@ -1,8 +1,10 @@
+import time
+
 import pytest
 
 from o2dpg_runner.graph import (
     build_adjacency, kahn_topological_order, descendants, ancestors,
-    longest_path_length, invert_adj, root_nodes,
+    longest_path_length, invert_adj, root_nodes, ReadyTracker,
 )
 
 
@@ -88,3 +90,95 @@ def test_descendants_deep_chain_no_recursion_limit():
     fwd, _, _ = build_adjacency(N, edges)
     result = descendants(fwd, 0)
     assert len(result) == N - 1
+
+
+def test_ready_tracker_releases_after_last_need():
+    # diamond: 0 -> {1, 2} -> 3
+    fwd, _, indeg = build_adjacency(4, [(0, 1), (0, 2), (1, 3), (2, 3)])
+    rt = ReadyTracker(fwd, indeg)
+    assert rt.roots() == [0]
+    assert sorted(rt.complete(0)) == [1, 2]
+    assert rt.complete(1) == []
+    assert rt.complete(2) == [3]
+
+
+def test_ready_tracker_completes_once():
+    """A task reported twice (e.g. skipped, then seen again after a retry
+    elsewhere) must not release its successors early."""
+    fwd, _, indeg = build_adjacency(3, [(0, 2), (1, 2)])
+    rt = ReadyTracker(fwd, indeg)
+    assert rt.complete(0) == []
+    assert rt.complete(0) == []
+    assert rt.is_complete(0) and not rt.is_complete(1)
+    assert rt.complete(1) == [2]
+
+
+def test_ready_tracker_wide_merge():
+    """A global task needing every per-timeframe task, as aodmerge does."""
+    n = 5000
+    fwd, _, indeg = build_adjacency(n + 1, [(i, n) for i in range(n)])
+    rt = ReadyTracker(fwd, indeg)
+    released = []
+    for i in range(n):
+        released += rt.complete(i)
+    assert released == [n]
+
+
+def _timeframe_dag(n_tf, per_tf=50, n_merges=3):
+    """n_tf chains of per_tf tasks, plus merges needing the end of every chain."""
+    edges = []
+    for tf in range(n_tf):
+        base = tf * per_tf
+        edges += [(base + i, base + i + 1) for i in range(per_tf - 1)]
+    n = n_tf * per_tf
+    edges += [(tf * per_tf + per_tf - 1, n + m)
+              for tf in range(n_tf) for m in range(n_merges)]
+    return build_adjacency(n + n_merges, edges)
+
+
+def _scan_loop(fwd, rev, indeg, batch):
+    """The loop before ReadyTracker: rescan candidates and needs per completion."""
+    candidates = [i for i, d in enumerate(indeg) if d == 0]
+    finished, order = set(), []
+    while candidates:
+        done, candidates = candidates[:batch], candidates[batch:]
+        finished.update(done)
+        order += done
+        for tid in done:
+            for succ in fwd[tid]:
+                if succ in candidates:
+                    continue
+                if all(p in finished for p in rev[succ]):
+                    candidates.append(succ)
+    return order
+
+
+def _tracker_loop(fwd, indeg, batch):
+    rt = ReadyTracker(fwd, indeg)
+    candidates = dict.fromkeys(rt.roots())
+    order = []
+    while candidates:
+        done = list(candidates)[:batch]
+        for tid in done:
+            del candidates[tid]
+        order += done
+        for tid in done:
+            for succ in rt.complete(tid):
+                candidates[succ] = None
+    return order
+
+
+def test_ready_tracker_beats_the_candidate_scan():
+    """Scaled-down benchmark: 400 timeframes x 50 tasks + 3 merges, 64
+    completions per pass (at 2000 timeframes: 4-8 s scanning, 0.15 s here)."""
+    fwd, rev, indeg = _timeframe_dag(400)
+    t0 = time.perf_counter()
+    scanned = _scan_loop(fwd, rev, indeg, 64)
+    t_scan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    tracked = _tracker_loop(fwd, indeg, 64)
+    t_tracked = time.perf_counter() - t0
+    assert tracked == scanned  # same release order, so the same policy ties
+    assert len(tracked) == len(fwd)
+    # ~10x at this size and growing with it; the scan is quadratic
+    assert t_tracked * 3 < t_scan
@@ -0,0 +1,80 @@
+import json
+
+from o2dpg_runner.journal import Journal, replay
+from o2dpg_runner.resources import ResourceManager
+
+NAMES = ["a", "b_1", "b_2"]
+
+
+def _write(path, *events):
+    with open(path, "a") as f:
+        for ev in events:
+            f.write(ev if isinstance(ev, str) else json.dumps(ev) + "\n")
+
+
+def test_roundtrip_keeps_last_word_per_task(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    j = Journal(path)
+    j.record("submit", tid=0, nice=0)  # before header(): not written
+    j.header("wf.json", NAMES)
+    j.record("env", vars={"ROOT_LDSYSPATH": "/lib"})
+    j.record("init", cmd="abc")
+    j.record("submit", tid=0, nice=0)
+    j.record("finish", tid=0, rc=0)
+    j.record("submit", tid=1, nice=0)
+    j.record("finish", tid=1, rc=1)
+    j.record("retry", tid=1, count=1)
+    j.record("submit", tid=1, nice=0)       # running when we "crashed"
+    j.record("sample", tid=0, cpu=1.5, mem=300.0)
+    j.record("mem", tid=1, mem=900.0)
+    j.record("mem", tid=0, mem=700.0, siblings=False)  # a retry-more-mem rule
+    j.close()
+    st = replay(path, "wf.json", NAMES)
+    assert st.finished == {0}
+    assert st.retry_counter == {1: 1}
+    assert st.sampled == {0: (1.5, 300.0)}
+    assert st.mem_raised == {1: 900.0}
+    assert st.mem_raised_own == {0: 700.0}
+    assert st.env == {"ROOT_LDSYSPATH": "/lib"}
+    assert st.init_cmd == "abc"
+
+
+def test_other_workflow_discards_earlier_segments(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    j = Journal(path)
+    j.header("wf.json", NAMES)
+    j.record("finish", tid=0, rc=0)
+    j.close()
+    assert replay(path, "wf.json", NAMES[:2]).empty
+    j = Journal(path)
+    j.header("wf.json", NAMES[:2])
+    j.record("finish", tid=1, rc=0)
+    j.close()
+    assert replay(path, "wf.json", NAMES[:2]).finished == {1}
+    assert replay(path, "wf.json", NAMES).empty
+
+
+def test_torn_line_is_ignored_and_not_glued_to(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    j = Journal(path)
+    j.header("wf.json", NAMES)
+    j.record("finish", tid=0, rc=0)
+    j.close()
+    _write(path, '{"ev":"finish","tid":2,"r')
+    assert replay(path, "wf.json", NAMES).finished == {0}
+    j = Journal(path)
+    j.header("wf.json", NAMES)
+    j.record("finish", tid=1, rc=0)
+    j.close()
+    assert replay(path, "wf.json", NAMES).finished == {0, 1}
+
+
+def test_restored_sample_reassigns_unstarted_siblings():
+    rm = ResourceManager(cpu_limit=8, mem_limit=8000, dynamic_resources=True)
+    rm.add_task("b_1", "b", cpu=4, cpu_relative=1.0, mem=2000)
+    rm.add_task("b_2", "b", cpu=4, cpu_relative=1.0, mem=2000)
+    rm.restore_sampled(0, 1.5, 700.0)
+    assert rm.resources[0].is_done
+    assert rm.can_be_submitted_at_all(rm.resources[1])
+    assert rm.resources[1].cpu_assigned == 1.5
+    assert rm.resources[1].mem_assigned == 700.0
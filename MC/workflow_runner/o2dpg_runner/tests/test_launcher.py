@@ -0,0 +1,110 @@
+import logging
+import os
+import subprocess
+import time
+
+import pytest
+
+from o2dpg_runner.launcher import ForkserverLauncher, LauncherError, PopenLauncher
+from o2dpg_runner.reaper import ChildReaper
+
+_LOG = logging.getLogger("test_launcher")
+
+
+@pytest.fixture
+def forkserver():
+    reaper = ChildReaper()
+    launcher = ForkserverLauncher(reaper, _LOG)
+    launcher.start()
+    yield launcher, reaper
+    launcher.stop()
+    reaper.close()
+
+
+def _wait_for(reaper, tid, timeout=5.0):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if tid in reaper.wait(timeout):
+            return time.perf_counter() - t0
+    raise AssertionError(f"tid {tid} never reported")
+
+
+def test_forkserver_runs_task_with_env_cwd_and_nice(forkserver, tmp_path):
+    launcher, reaper = forkserver
+    env = {"PATH": os.environ["PATH"], "GREETING": "hello"}
+    p = launcher.spawn(3, ["/bin/sh", "-c", "echo $GREETING > out.txt"],
+                       str(tmp_path), env, nice=5)
+    assert p.nice() == 5
+    _wait_for(reaper, 3)
+    assert p.poll() == 0
+    assert (tmp_path / "out.txt").read_text() == "hello\n"
+
+
+def test_forkserver_reports_exit_codes_and_signals(forkserver):
+    launcher, reaper = forkserver
+    env = dict(os.environ)
+    failing = launcher.spawn(1, ["/bin/sh", "-c", "exit 3"], ".", env, 0)
+    _wait_for(reaper, 1)
+    assert failing.poll() == 3
+    sleeper = launcher.spawn(2, ["/bin/sh", "-c", "sleep 30"], ".", env, 0)
+    assert sleeper.poll() is None
+    sleeper.kill()
+    assert _wait_for(reaper, 2) < 2.0
+    assert sleeper.poll() == -9
+
+
+def test_forkserver_sends_each_environment_once(forkserver, monkeypatch):
+    launcher, reaper = forkserver
+    sent = []
+    orig = launcher._send
+    monkeypatch.setattr(launcher, "_send", lambda m: (sent.append(m["op"]), orig(m)))
+    env = dict(os.environ)
+    for tid in range(3):
+        launcher.spawn(tid, ["/bin/true"], ".", env, 0)
+    assert sent.count("env") == 1
+    seen = set()
+    t0 = time.perf_counter()
+    while seen != {0, 1, 2} and time.perf_counter() - t0 < 5:
+        seen |= reaper.wait(1.0)
+    assert seen == {0, 1, 2}
+
+
+def test_forkserver_passes_stderr_back(forkserver):
+    launcher, reaper = forkserver
+    p = launcher.spawn(0, ["/bin/sh", "-c", "echo oops >&2"], ".",
+                       dict(os.environ), 0, capture_stderr=True)
+    assert p.stderr.read() == b"oops\n"
+    _wait_for(reaper, 0)
+
+
+def test_forkserver_refuses_unknown_command(forkserver):
+    launcher, _ = forkserver
+    with pytest.raises(LauncherError):
+        launcher.spawn(0, ["/does/not/exist"], ".", dict(os.environ), 0)
+
+
+def test_forkserver_helper_death_fails_running_tasks(forkserver):
+    launcher, reaper = forkserver
+    p = launcher.spawn(0, ["/bin/sh", "-c", "sleep 30"], ".", dict(os.environ), 0)
+    launcher._helper.kill()
+    _wait_for(reaper, 0)
+    assert p.poll() == -9
+    with pytest.raises(LauncherError):
+        launcher.spawn(1, ["/bin/true"], ".", dict(os.environ), 0)
+
+
+def test_forkserver_kills_a_launch_reported_after_spawn_gave_up(forkserver):
+    launcher, _ = forkserver
+    orphan = subprocess.Popen(["/bin/sh", "-c", "sleep 30"])
+    launcher._handle({"op": "spawned", "tid": 3, "pid": orphan.pid, "nice": 0}, [])
+    assert orphan.wait(timeout=5) == -9
+
+
+def test_popen_launcher_registers_with_reaper():
+    reaper = ChildReaper()
+    try:
+        p = PopenLauncher(reaper, _LOG).spawn(5, ["/bin/true"], ".", dict(os.environ), 0)
+        _wait_for(reaper, 5)
+        assert p.poll() == 0
+    finally:
+        reaper.close()
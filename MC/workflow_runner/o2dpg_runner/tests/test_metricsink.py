@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import sys
+import time
+
+import pytest
+
+from o2dpg_runner.metricsink import (
+    CGROUP_GLOBAL, FIELDS, FORMAT_NAME, LogMetricSink, NdjsonMetricSink, make_metric_sink,
+)
+
+UTILS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "utils"))
+
+
+def test_ndjson_sink_writes_header_meta_and_rows_in_order(tmp_path):
+    path = tmp_path / "metric.log"
+    sink = NdjsonMetricSink(str(path), flush_interval=0.05, flush_rows=3)
+    sink.meta({"cpu_limit": 8, "scheduler_policy": "timeframe"})
+    for i in range(10):
+        sink.row(i, f"task_{i % 2}", 150.0, 10.0, 12.5, 0, 0.0, ["RECO"], -1.0)
+    sink.row(10, CGROUP_GLOBAL, 300.0, None, 800.0, 0, None, [], -1)
+    sink.close()
+    sink.close()  # idempotent
+    sink.row(11, "late", 0, 0, 0, 0, 0, [], -1)  # after close: dropped
+
+    lines = path.read_text().splitlines()
+    header = json.loads(lines[0])
+    assert header["format"] == FORMAT_NAME and header["fields"] == list(FIELDS)
+    meta = json.loads(lines[1])
+    assert meta["meta"]["cpu_limit"] == 8 and meta["time"] > 0
+    rows = [dict(zip(header["fields"], json.loads(l))) for l in lines[2:]]
+    assert [r["iter"] for r in rows] == list(range(11))
+    assert rows[3]["name"] == "task_1" and rows[3]["label"] == ["RECO"]
+    assert rows[3]["cgroup_cpu"] is None
+    assert rows[-1]["name"] == CGROUP_GLOBAL and rows[-1]["pss"] == 800.0
+
+
+def test_ndjson_sink_flushes_on_interval_before_close(tmp_path):
+    path = tmp_path / "metric.log"
+    sink = NdjsonMetricSink(str(path), flush_interval=0.05)
+    sink.row(1, "a", 1.0, 1.0, 1.0, 0, 0.0, [], -1)
+    deadline = time.time() + 5
+    while len(path.read_text().splitlines()) < 2 and time.time() < deadline:
+        time.sleep(0.02)
+    assert len(path.read_text().splitlines()) == 2
+    sink.close()
+
+
+def test_log_sink_keeps_prototype_lines(tmp_path):
+    lg = logging.getLogger("test.metricsink")
+    lg.handlers.clear()
+    lg.addHandler(logging.FileHandler(str(tmp_path / "m.log")))
+    lg.setLevel(logging.INFO)
+    lg.propagate = False
+    sink = make_metric_sink("log", "unused", lg)
+    assert isinstance(sink, LogMetricSink)
+    sink.row(3, "sim_1", 100.0, 1.0, 2.0, 0, 0.0, [], -1.0, None, None)
+    sink.row(3, CGROUP_GLOBAL, 200.0, None, 5.0, 0, None, [], -1)
+    first, second = (tmp_path / "m.log").read_text().splitlines()
+    assert first == ("{'iter': 3, 'name': 'sim_1', 'cpu': 100.0, 'uss': 1.0, 'pss': 2.0, "
+                     "'nice': 0, 'swap': 0.0, 'label': [], 'disc': -1.0, "
+                     "'cgroup_cpu': None, 'cgroup_mem': None}")
+    assert "cgroup_cpu" not in second
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        make_metric_sink("arrow", "x")
+
+
+def _sim_metrics():
+    # o2dpg_sim_metrics.py plots; it imports these at the top
+    for mod in ("matplotlib", "numpy", "pandas"):
+        pytest.importorskip(mod)
+    if UTILS_DIR not in sys.path:
+        sys.path.insert(0, UTILS_DIR)
+    import o2dpg_sim_metrics
+    return o2dpg_sim_metrics
+
+
+def _write_both_formats(tmp_path):
+    """The same run through both sinks; returns (log path, ndjson path)."""
+    log_path, nd_path = tmp_path / "metric_log.log", tmp_path / "metric_nd.log"
+    lg = logging.getLogger("test.metricsink.roundtrip")
+    lg.handlers.clear()
+    handler = logging.FileHandler(str(log_path))
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))  # cli.py's
+    lg.addHandler(handler)
+    lg.setLevel(logging.INFO)
+    lg.propagate = False
+    sinks = [LogMetricSink(lg), NdjsonMetricSink(str(nd_path), flush_interval=0.05)]
+    for sink in sinks:
+        sink.meta({"cpu_limit": 8, "mem_limit": 16000, "scheduler_policy": "timeframe"})
+        for it in range(1, 4):
+            sink.row(it, "sgnsim_1", 350.0, 900.0, 1000.0 + it, 0, 0.0, ["SIM"], -1,
+                     None, None, 0.0)
+            sink.row(it, "tpcreco_2", 120.0, 400.0, 500.0, 19, 0.0, ["RECO"], 12.5,
+                     110.0, 480.0, 0.5 * it)
+            sink.row(it, CGROUP_GLOBAL, 470.0, None, 1600.0, 0, None, [], -1)
+        sink.close()
+    handler.close()
+    return str(log_path), str(nd_path)
+
+
+def test_o2dpg_sim_metrics_reads_ndjson_rows_like_log_rows(tmp_path):
+    sm = _sim_metrics()
+    log_path, nd_path = _write_both_formats(tmp_path)
+    with open(log_path) as f:
+        from_log = list(sm.metric_file_lines_to_dicts(f))
+    with open(nd_path) as f:
+        from_nd = list(sm.metric_file_lines_to_dicts(f))
+    assert len(from_log) == len(from_nd) == 1 + 3 * 3
+    for d_log, d_nd in zip(from_log, from_nd):
+        assert d_log.pop("time") == pytest.approx(d_nd.pop("time"), abs=60)
+        # the log format leaves out what is unset; NDJSON has every field
+        assert {k: v for k, v in d_nd.items() if k in d_log} == d_log
+        assert all(d_nd[k] is None for k in set(d_nd) - set(d_log))
+
+
+def test_o2dpg_sim_metrics_resources_from_ndjson_match_the_log_format(tmp_path):
+    sm = _sim_metrics()
+    log_path, nd_path = _write_both_formats(tmp_path)
+    from_log, from_nd = sm.Resources(log_path), sm.Resources(nd_path)
+    assert from_nd.meta == from_log.meta
+    assert from_nd.number_of_timeframes == from_log.number_of_timeframes == 2
+    assert from_nd.cgroup_global_rows == from_log.cgroup_global_rows
+    cols = ["name", "timeframe", "category", "iter", "cpu", "uss", "pss", "nice",
+            "disc", "cgroup_cpu", "cgroup_mem", "suspended"]
+    assert from_nd.df[cols].equals(from_log.df[cols])  # NaN where cgroup readings are unset
@@ -0,0 +1,70 @@
+import pytest
+
+from o2dpg_runner.monitoring import MonitorThread, hang_window, parse_hang_spec
+
+
+class _Backend:
+    """Returns whatever CPU the test sets for every pid."""
+
+    def __init__(self):
+        self.cpu = 0.0
+
+    def sample(self, pid, want_mem):
+        return self.cpu, 10.0, 5.0, 0.0, 0
+
+    def sweep_dead(self):
+        return 0
+
+    def forget(self, pid):
+        pass
+
+
+def test_hang_spec_and_window():
+    assert parse_hang_spec("2,600,0.25") == (2.0, 600.0, 0.25)
+    for bad, field in (("2,600", "CPU,WINDOW,FRACTION"), ("x,1,1", "CPU 'x'"),
+                       ("0,600,0.25", "CPU must"), ("2,-1,0.25", "WINDOW must"),
+                       ("2,600,-1", "FRACTION cannot")):
+        with pytest.raises(ValueError, match=field):
+            parse_hang_spec(bad)
+    assert parse_hang_spec("2,600,0") == (2.0, 600.0, 0.0)
+    assert hang_window(600, 0.25, None) == 600
+    assert hang_window(600, 0.25, 3600 * 4) == 3600
+    assert hang_window(600, 0.25, 60) == 600
+
+
+def test_idle_clock_flags_hung_tasks_and_restarts_on_activity():
+    be = _Backend()
+    mon = MonitorThread(backend=be, hang_cpu_pct=2.0)
+    mon.register(1, 111, "t", [], 0.0, hang_window=10.0)
+    mon.register(2, 222, "u", [], 0.0)  # no window: never flagged
+
+    mon._one_pass(0.0)      # first reading starts nothing
+    mon._one_pass(1.0)      # idle since 1.0
+    mon._one_pass(10.0)
+    assert mon.latest_for(1).idle_s == pytest.approx(9.0) and not mon.latest_for(1).hung
+    mon._one_pass(11.0)
+    assert mon.latest_for(1).hung
+    assert not mon.latest_for(2).hung and mon.latest_for(2).idle_s == 0.0
+
+    be.cpu = 50.0
+    mon._one_pass(12.0)
+    assert mon.latest_for(1).idle_s == 0.0 and not mon.latest_for(1).hung
+
+    be.cpu = 0.0
+    mon._one_pass(13.0)
+    mon.reset_idle(1)       # e.g. SIGSTOPped by --preempt-backfill
+    mon._one_pass(20.0)
+    assert mon.latest_for(1).idle_s == 0.0
+
+
+def test_latest_tick_pairs_the_tick_with_its_snapshots():
+    mon = MonitorThread(backend=_Backend())
+    assert mon.latest_tick() == (0, {})
+    mon.register(1, 111, "t", [], 0.0)
+    mon._one_pass(0.0)
+    tick, snaps = mon.latest_tick()
+    assert tick == 1 and list(snaps) == [1]
+    mon.deregister(1)
+    mon._one_pass(1.0)
+    assert mon.latest_tick() == (2, {})
+    assert list(snaps) == [1]  # a copy, not the live dict
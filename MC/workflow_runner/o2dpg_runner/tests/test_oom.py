@@ -0,0 +1,82 @@
+import argparse
+
+import pytest
+
+from o2dpg_runner.cli import _mem_factor
+from o2dpg_runner.oom import (
+    PENDING_WINDOW, KernelLog, OomDetector, killed_by_sigkill, read_oom_kills,
+)
+
+
+def _events(d, oom_kill):
+    (d / "memory.events").write_text(f"low 0\nhigh 3\nmax 1\noom 1\noom_kill {oom_kill}\n")
+
+
+def test_exit_codes_and_counters(tmp_path):
+    assert killed_by_sigkill(-9) and killed_by_sigkill(137)
+    assert not killed_by_sigkill(1) and not killed_by_sigkill(-15)
+    _events(tmp_path, 2)
+    assert read_oom_kills(str(tmp_path)) == 2
+    assert read_oom_kills(str(tmp_path / "gone")) is None
+
+
+def test_slice_kills_are_claimed_once_by_a_sigkill_exit(tmp_path):
+    _events(tmp_path, 0)
+    det = OomDetector(str(tmp_path))
+    assert det.source.endswith("memory.events")
+    # no kill counted: a SIGKILL is someone else's doing
+    assert det.finished(0, -9, now=0.0) is None
+    _events(tmp_path, 1)
+    assert det.finished(1, 1, now=1.0) is None      # not the one that was killed
+    assert det.finished(2, 137, now=2.0) is not None
+    assert det.finished(3, -9, now=3.0) is None     # already claimed
+    # an unclaimed kill goes stale
+    _events(tmp_path, 2)
+    assert det.finished(4, 0, now=10.0) is None
+    assert det.finished(5, -9, now=11.0 + PENDING_WINDOW) is None
+
+
+def test_scope_kills_win_and_are_not_counted_twice(tmp_path):
+    _events(tmp_path, 0)
+    det = OomDetector(str(tmp_path))
+    det.note_scope(7, {"throttled_usec": 0, "oom_kill": 1})
+    _events(tmp_path, 1)  # the slice sees the same kill
+    assert "scope" in det.finished(7, -9, now=0.0)
+    assert det.finished(8, -9, now=1.0) is None
+
+
+def test_kernel_log_and_no_source(tmp_path):
+    kmsg = tmp_path / "kmsg"
+    kmsg.write_bytes(b"6,99,4,-;Out of memory: Killed process 1 (before the run)\n")
+    kl = KernelLog(str(kmsg))
+    det = OomDetector(None, kmsg_path=str(kmsg))
+    assert det.source == "kernel log"
+    with open(kmsg, "ab") as f:
+        f.write(b"6,100,5,-;Out of memory: Killed process 4242 (o2-sim) total-vm:1kB\n"
+                b"6,101,6,-;something else\n")
+    assert kl.oom_kills() == 1
+    assert kl.oom_kills() == 0
+    assert det.finished(0, -9, now=0.0) is not None
+    kl.close()
+    det.close()
+
+    # no evidence readable: a SIGKILL may be the user's or the watchdog's
+    det = OomDetector(None, kmsg_path=str(tmp_path / "none"))
+    assert det.source is None and not det.available
+    assert det.finished(0, -9, now=0.0) is None
+    assert det.finished(1, 2, now=0.0) is None
+
+
+def test_a_task_the_runner_killed_claims_no_kill(tmp_path):
+    _events(tmp_path, 0)
+    det = OomDetector(str(tmp_path))
+    _events(tmp_path, 1)
+    assert det.finished(0, -9, now=0.0, ours=True) is None
+    assert det.finished(1, -9, now=1.0) is not None  # still pending for the real victim
+
+
+def test_factor_must_raise_the_booking():
+    assert _mem_factor("1.5") == 1.5
+    for bad in ("1", "0.8", "-2", "x"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            _mem_factor(bad)
@@ -0,0 +1,79 @@
+import logging
+import os
+import shutil
+
+import pytest
+
+from o2dpg_runner.placement import (
+    CpuPlacer, Placement, format_cpulist, parse_cpulist, read_numa_nodes,
+)
+
+TWO_SOCKETS = {0: list(range(0, 8)), 1: list(range(8, 16))}
+
+
+def test_cpulists():
+    assert parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert format_cpulist([11, 0, 1, 2, 3, 8, 10]) == "0-3,8,10-11"
+    assert format_cpulist([]) == ""
+
+
+def test_best_fit_node_and_contiguous_runs():
+    pl = CpuPlacer(TWO_SOCKETS, "numactl")
+    a = pl.allocate(1, 4)
+    assert a == Placement([0, 1, 2, 3], 0)
+    # node 0 has 4 left: the tighter fit for 3 more
+    assert pl.allocate(2, 2.5) == Placement([4, 5, 6], 0)
+    # 8 does not fit in node 0 any more
+    assert pl.allocate(3, 8) == Placement(list(range(8, 16)), 1)
+    assert pl.n_free() == 1
+    pl.release(1)
+    pl.release(1)  # harmless
+    assert pl.free[0] == [0, 1, 2, 3, 7]
+    assert pl.allocate(4, 4).cpus == [0, 1, 2, 3]
+
+
+def test_spread_when_no_node_fits_and_unpinned_when_full():
+    pl = CpuPlacer(TWO_SOCKETS, "taskset")
+    pl.allocate(1, 6)
+    pl.allocate(2, 6)
+    big = pl.allocate(3, 4)
+    assert big.node is None and big.cpus == [6, 7, 14, 15]
+    assert pl.allocate(4, 1) is None
+    assert pl.allocate(5, 0) is None
+    assert 4 not in pl.placed and 5 not in pl.placed
+
+
+def test_launch_prefixes():
+    pl = Placement([2, 3, 4, 5], 1)
+    assert CpuPlacer(TWO_SOCKETS, "numactl").wrap(pl) == \
+        ["numactl", "--physcpubind=2-5", "--preferred=1", "--"]
+    assert CpuPlacer(TWO_SOCKETS, "taskset").wrap(pl) == ["taskset", "-c", "2-5"]
+    scope = CpuPlacer(TWO_SOCKETS, "scope")
+    assert scope.wrap(pl) == []
+    assert scope.scope_properties(pl) == ["-p", "AllowedCPUs=2-5"]
+    with pytest.raises(ValueError):
+        CpuPlacer(TWO_SOCKETS, "auto")
+
+
+def test_from_system_uses_the_runner_affinity(tmp_path):
+    allowed = sorted(os.sched_getaffinity(0))
+    node = tmp_path / "node0"
+    node.mkdir()
+    (node / "cpulist").write_text(format_cpulist(allowed + [max(allowed) + 100]) + "\n")
+    (tmp_path / "possible").write_text("0\n")
+    assert read_numa_nodes(str(tmp_path)) == {0: allowed + [max(allowed) + 100]}
+    pl = CpuPlacer.from_system("scope", in_scope=False, sysfs=str(tmp_path))
+    assert pl.method in ("numactl", "taskset")
+    assert pl.free == {0: allowed}
+    # no sysfs at all: one node with what we may run on
+    assert CpuPlacer.from_system("taskset", in_scope=False,
+                                 sysfs=str(tmp_path / "none")).free == {0: allowed}
+
+
+def test_from_system_without_the_tool_runs_unpinned(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(shutil, "which", lambda cmd: None)
+    # cli.main() stops the package logger propagating; caplog listens at the root
+    monkeypatch.setattr(logging.getLogger("o2dpg_runner"), "propagate", True)
+    for method in ("numactl", "taskset", "auto"):
+        assert CpuPlacer.from_system(method, in_scope=False, sysfs=str(tmp_path)) is None
+    assert "taskset not found on PATH; tasks run unpinned" in caplog.text
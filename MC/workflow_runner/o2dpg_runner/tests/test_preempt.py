@@ -0,0 +1,89 @@
+import logging
+import time
+
+import psutil
+import pytest
+
+from o2dpg_runner.preempt import BackfillPreemptor
+from o2dpg_runner.resources import ResourceManager
+
+
+def _status(pid):
+    return psutil.Process(pid).status()
+
+
+def _wait_status(pid, want, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if _status(pid) == want:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def procs():
+    started = []
+    yield started
+    for p in started:
+        try:
+            for c in p.children(recursive=True):
+                c.kill()
+            p.kill()
+            p.wait(2)
+        except psutil.NoSuchProcess:
+            pass
+
+
+def _start(procs):
+    # a tree: bash with a sleeping child
+    p = psutil.Popen(["/bin/bash", "-c", "sleep 30 & wait"])
+    procs.append(p)
+    deadline = time.time() + 5
+    while not p.children() and time.time() < deadline:
+        time.sleep(0.01)
+    return p
+
+
+def test_make_room_stops_the_worst_ranked_backfill_trees_and_resumes_best_first(procs):
+    rm = ResourceManager(cpu_limit=8, mem_limit=16000, n_backfill_max=3)
+    running = {}
+    for i, cpu in enumerate([4, 2, 2]):
+        rm.add_task(f"bf_{i}", None, cpu, 1, 100)
+        rm.resources[i].nice_value = rm.nice_backfill
+        rm.book(i, rm.nice_backfill)
+        running[i] = _start(procs)
+    rm.add_task("reco", None, 3, 1, 100)
+    # rank: tid 1 is the worst, then tid 2
+    pre = BackfillPreemptor(rm, rank=lambda t: {0: 0, 1: 9, 2: 5}[t],
+                            logger=logging.getLogger("test"))
+
+    # 8 active + 3 needed -> 3 cores to free: stops tid 1 (2 cores), then tid 2
+    stopped = pre.make_room(3, running, now=0.0)
+    assert stopped == [1, 2]
+    for tid in stopped:
+        assert _wait_status(running[tid].pid, psutil.STATUS_STOPPED)
+        assert _wait_status(running[tid].children()[0].pid, psutil.STATUS_STOPPED)
+    assert _status(running[0].pid) != psutil.STATUS_STOPPED
+    assert rm.cpu_active() == 4
+
+    # the default task takes 3 of the 4 free cores: nothing fits yet
+    rm.resources[3].nice_value = rm.nice_default
+    rm.book(3, rm.nice_default)
+    assert pre.resume_fitting(running, now=1.0) == []
+    # it finishes: the better-ranked tid 2 goes first, then tid 1
+    rm.unbook(3)
+    assert pre.resume_fitting(running, now=2.0) == [2, 1]
+    assert _wait_status(running[1].children()[0].pid, psutil.STATUS_SLEEPING)
+    assert rm.resources[1].suspended_total == 2.0 and rm.n_suspended == 0
+
+
+def test_nothing_is_stopped_when_the_task_fits(procs):
+    rm = ResourceManager(cpu_limit=8, mem_limit=16000)
+    rm.add_task("bf", None, 2, 1, 100)
+    rm.resources[0].nice_value = rm.nice_backfill
+    rm.book(0, rm.nice_backfill)
+    rm.add_task("reco", None, 4, 1, 100)
+    running = {0: _start(procs)}
+    pre = BackfillPreemptor(rm, rank=None, logger=logging.getLogger("test"))
+    assert pre.make_room(1, running, now=0.0) == []
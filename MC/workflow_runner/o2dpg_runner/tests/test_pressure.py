@@ -0,0 +1,85 @@
+import pytest
+
+from o2dpg_runner.pressure import (
+    RELAX_HOLD, SHRINK_FACTOR, PressureController, PressureReading, parse_thresholds,
+    read_memory_events, read_psi,
+)
+from o2dpg_runner.resources import ResourceManager
+
+PSI = ("some avg10={some:.2f} avg60=0.00 avg300=0.00 total=1\n"
+       "full avg10={full:.2f} avg60=0.00 avg300=0.00 total=1\n")
+
+
+def _psi_dir(tmp_path, mem=(0.0, 0.0), cpu=(0.0, 0.0)):
+    (tmp_path / "memory").write_text(PSI.format(some=mem[0], full=mem[1]))
+    (tmp_path / "cpu").write_text(PSI.format(some=cpu[0], full=cpu[1]))
+    return str(tmp_path)
+
+
+def _rm():
+    rm = ResourceManager(cpu_limit=8, mem_limit=1000, n_backfill_max=2)
+    for i in range(3):
+        rm.add_task(f"t_{i}", None, cpu=1, cpu_relative=None, mem=400)
+    return rm
+
+
+def test_readers(tmp_path):
+    d = _psi_dir(tmp_path, mem=(12.5, 3.0))
+    assert read_psi(f"{d}/memory") == {"some": 12.5, "full": 3.0}
+    assert read_psi(f"{d}/missing") is None
+    ev = tmp_path / "memory.events"
+    ev.write_text("low 0\nhigh 4\nmax 1\noom 0\noom_kill 0\n")
+    assert read_memory_events(str(ev)) == 5
+    assert parse_thresholds("10,5,60") == (10.0, 5.0, 60.0)
+    for bad in ("10,5", "10,x,60", "10,-5,60"):
+        with pytest.raises(ValueError):
+            parse_thresholds(bad)
+
+
+def test_backfill_pauses_under_pressure_and_resumes_with_hysteresis(tmp_path):
+    rm = _rm()
+    pc = PressureController("10,5,60", proc_dir=_psi_dir(tmp_path))
+    assert pc.available
+    assert "backfill paused" in pc.update(rm, PressureReading(mem_some=12.0))
+    assert rm.backfill_paused and not rm.fits_backfill(rm.resources[0])
+    # between the relax level (5) and the threshold: stays paused
+    for _ in range(2 * RELAX_HOLD):
+        assert pc.update(rm, PressureReading(mem_some=7.0)) is None
+    assert rm.backfill_paused
+    for _ in range(RELAX_HOLD - 1):
+        pc.update(rm, PressureReading(mem_some=1.0))
+    assert rm.backfill_paused
+    assert "backfill resumed" in pc.update(rm, PressureReading(mem_some=1.0))
+    assert not rm.backfill_paused
+
+
+def test_full_stalls_or_memory_events_shrink_the_budget(tmp_path):
+    rm = _rm()
+    (tmp_path / "memory.pressure").write_text(PSI.format(some=0, full=0))
+    (tmp_path / "cpu.pressure").write_text(PSI.format(some=0, full=0))
+    events = tmp_path / "memory.events"
+    events.write_text("high 0\nmax 0\noom 0\n")
+    pc = PressureController("10,5,60", cgroup_dir=str(tmp_path))
+    assert pc.source == str(tmp_path)
+    assert pc.update(rm) is None and rm.mem_budget_factor == 1.0
+    events.write_text("high 3\nmax 0\noom 0\n")
+    assert "memory budget at" in pc.update(rm)
+    assert pc.last.new_events == 3 and rm.mem_budget_factor == SHRINK_FACTOR
+
+    # with nothing booked the full limit still applies: no stall
+    assert rm.mem_budget() == 1000 and rm.fits_default(rm.resources[0])
+    rm.resources[0].nice_value = rm.nice_default
+    rm.book(0, rm.nice_default)
+    assert rm.mem_budget() == 1000 * SHRINK_FACTOR
+    assert not rm.fits_default(rm.resources[1])  # 800 > 750
+
+    for _ in range(RELAX_HOLD):
+        pc.update(rm)
+    assert rm.mem_budget_factor == 1.0 and rm.fits_default(rm.resources[1])
+
+
+def test_zero_threshold_turns_a_check_off(tmp_path):
+    rm = _rm()
+    pc = PressureController("10,5,0", proc_dir=_psi_dir(tmp_path))
+    assert pc.update(rm, PressureReading(cpu_some=99.0)) is None
+    assert not rm.backfill_paused
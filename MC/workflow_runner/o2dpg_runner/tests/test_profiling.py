@@ -0,0 +1,38 @@
+import logging
+
+from o2dpg_runner.profiling import COUNTS, PHASES, Log2Histogram, PassProfiler
+
+
+def test_histogram_keeps_exact_totals_and_bucketed_quantiles():
+    h = Log2Histogram()
+    assert h.quantile(0.5) == 0
+    for v in [0, 1, 3, 1000, 1000, 1000, 1000, 1000, 1000, 70000]:
+        h.add(v)
+    assert (h.n, h.total, h.max) == (10, 76004, 70000)
+    # 1000 falls in [512, 1023]; quantiles report the bucket's upper edge
+    assert h.quantile(0.5) == 1023
+    # ... but never more than the largest value seen
+    assert h.quantile(1.0) == 70000
+    assert h.quantile(0.1) == 0
+
+
+def test_report_lists_only_phases_that_ran():
+    prof = PassProfiler()
+    t0 = prof.now()
+    prof.add("order", t0)
+    prof.add_ns("pick", 2_000_000)
+    prof.count("candidates", 12)
+    lines = prof.report()
+    names = [line.split()[0] for line in lines[1:]]
+    assert names == ["order", "pick", "candidates"]
+    assert set(prof.timings) == set(PHASES) and set(prof.counts) == set(COUNTS)
+    pick = lines[2].split()
+    assert pick[1] == "1" and float(pick[2]) == 0.002 and float(pick[-1]) == 2000.0
+
+
+def test_log_report_goes_to_the_given_logger(caplog):
+    prof = PassProfiler()
+    prof.add_ns("wait_for_any", 5000)
+    with caplog.at_level(logging.INFO, logger="test.actions"):
+        prof.log_report(logging.getLogger("test.actions"), "Scheduler self-profile:")
+    assert "Scheduler self-profile:" in caplog.text and "wait_for_any" in caplog.text
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from o2dpg_runner.reaper import ChildReaper
+
+needs_pidfd = pytest.mark.skipif(not hasattr(os, "pidfd_open"),
+                                 reason="no pidfd_open on this platform")
+
+
+def _spawn(seconds):
+    return subprocess.Popen(["/bin/sh", "-c", f"sleep {seconds}"])
+
+
+@pytest.mark.parametrize("use_pidfd", [
+    pytest.param(True, marks=needs_pidfd), False,
+])
+def test_wakes_on_exit_well_before_timeout(use_pidfd):
+    r = ChildReaper(use_pidfd=use_pidfd)
+    try:
+        p = _spawn(0.1)
+        r.register(7, p.pid)
+        t0 = time.perf_counter()
+        exited = set()
+        while 7 not in exited and time.perf_counter() - t0 < 5:
+            exited = r.wait(5.0)
+        assert 7 in exited
+        assert time.perf_counter() - t0 < 2.0
+        assert p.poll() == 0  # the reaper does not collect the exit status
+    finally:
+        r.close()
+
+
+@needs_pidfd
+def test_pidfd_names_only_the_task_that_exited():
+    r = ChildReaper(use_pidfd=True)
+    slow = _spawn(5)
+    try:
+        fast = _spawn(0)
+        r.register(1, slow.pid)
+        r.register(2, fast.pid)
+        fast.wait()
+        assert r.wait(1.0) == {2}
+        assert r.wait(0.05) == {2}  # level-triggered until unregistered
+        r.unregister(2)
+        assert r.wait(0.05) == set()
+    finally:
+        slow.kill()
+        slow.wait()
+        r.close()
+
+
+def test_watched_fd_callback_reports_tids():
+    r = ChildReaper()
+    rd, wr = os.pipe()
+    try:
+        r.watch(rd, lambda: [int(os.read(rd, 16))])
+        os.write(wr, b"42")
+        assert 42 in r.wait(1.0)
+        r.unwatch(rd)
+    finally:
+        os.close(rd)
+        os.close(wr)
+        r.close()
@@ -0,0 +1,107 @@
+import math
+import multiprocessing
+
+import pytest
+
+from o2dpg_runner.resourcedb import ResourceDB, RunStats, feature_key, quantile
+
+
+def _stat(cpu, pss):
+    return {"count": 1, "reco": {"cpu": {"min": cpu, "max": cpu, "mean": cpu},
+                                 "pss": {"min": pss, "max": pss, "mean": pss}}}
+
+
+def test_feature_key():
+    env = {"NWORKERS": "8", "ALIEN_JDL_LPMINTERACTIONTYPE": "PbPb"}
+    assert (feature_key("ALIEN_JDL_LPMINTERACTIONTYPE, NWORKERS,O2_ROOT", env)
+            == "ALIEN_JDL_LPMINTERACTIONTYPE=PbPb;NWORKERS=8;O2_ROOT=")
+
+
+def test_run_stats_are_one_json_stat_document():
+    rs = RunStats(quantiles=())
+    rs.add("reco", cpu=2.0, pss=1000.0, lifetime=10.0)
+    rs.add("reco", cpu=4.0, pss=1500.0)  # backfill: no walltime
+    rs.add("qc", cpu=0.5, pss=200.0, lifetime=1.0)
+    assert len(rs) == 2
+    assert rs.elementary() == {
+        "count": 1,
+        "reco": {"cpu": {"min": 2.0, "max": 4.0, "mean": 3.0},
+                 "pss": {"min": 1000.0, "max": 1500.0, "mean": 1250.0},
+                 "lifetime": {"min": 10.0, "max": 10.0, "mean": 10.0}},
+        "qc": {"cpu": {"min": 0.5, "max": 0.5, "mean": 0.5},
+               "pss": {"min": 200.0, "max": 200.0, "mean": 200.0},
+               "lifetime": {"min": 1.0, "max": 1.0, "mean": 1.0}},
+    }
+
+
+def test_quantiles_over_the_tasks_of_a_run():
+    values = [4.0, 1.0, 3.0, 2.0, 10.0]
+    # numpy.percentile's default (linear) interpolation
+    assert quantile(values, 50) == 3.0
+    assert quantile(values, 90) == pytest.approx(7.6)
+    assert quantile(values, 100) == 10.0
+    assert quantile([5.0], 99) == 5.0
+    rs = RunStats(quantiles=(90, 50, 90))
+    for v in values:
+        rs.add("tpc", cpu=v, pss=100 * v)
+    pss = rs.elementary()["tpc"]["pss"]
+    assert (pss["p50"], pss["p90"], pss["max"]) == (300.0, 760.0, 1000.0)
+
+
+def test_quantiles_merge_as_weighted_means(tmp_path):
+    db = ResourceDB(str(tmp_path / "db.sqlite"))
+    db.merge("k", {"count": 1, "tpc": {"pss": {"min": 1, "max": 9000, "mean": 2, "p90": 3000}}})
+    db.merge("k", {"count": 2, "tpc": {"pss": {"min": 1, "max": 5000, "mean": 2, "p90": 1500}}})
+    pss = db.stats("k")["tpc"]["pss"]
+    # one outlier run sets the max, but weighs 1/3 in the quantile
+    assert (pss["max"], pss["p90"]) == (9000, 2000)
+
+
+def test_merges_like_merge_stats(tmp_path):
+    db = ResourceDB(str(tmp_path / "db.sqlite"))
+    assert db.stats("k") == {}
+    cpus = [2.0, 4.0, 9.0]
+    for i, cpu in enumerate(cpus):
+        db.merge("k", _stat(cpu, 1000.0 + i))
+    db.merge("other", _stat(100.0, 1.0))
+    out = db.stats("k")
+    mean = sum(cpus) / 3
+    m2 = sum((c - mean) ** 2 for c in cpus)
+    assert out["count"] == 3
+    assert out["reco"]["count"] == 3
+    assert out["reco"]["cpu"] == {"min": 2.0, "max": 9.0, "mean": round(mean, 3),
+                                  "std": round(math.sqrt(m2 / 3), 3),
+                                  "M2": pytest.approx(m2), "count": 3}
+    assert out["reco"]["pss"]["max"] == 1002.0
+    # a name first seen later starts its own count
+    db.merge("k", {"count": 1, "qc": {"cpu": {"min": 1, "max": 1, "mean": 1}}})
+    out = db.stats("k")
+    assert (out["count"], out["reco"]["count"], out["qc"]["count"]) == (4, 3, 1)
+
+
+def _merge_many(path, n):
+    db = ResourceDB(path)
+    for _ in range(n):
+        db.merge("k", _stat(1.0, 100.0))
+
+
+def test_concurrent_runners_lose_no_update(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    ResourceDB(path)
+    procs = [multiprocessing.Process(target=_merge_many, args=(path, 20)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+    out = ResourceDB(path).stats("k")
+    assert out["count"] == 80
+    assert out["reco"]["cpu"]["count"] == 80
+
+
+def test_a_failed_merge_leaves_nothing_behind(tmp_path):
+    db = ResourceDB(str(tmp_path / "db.sqlite"))
+    db.merge("k", _stat(1.0, 100.0))
+    with pytest.raises(TypeError):
+        db.merge("k", {"count": 1, "reco": {"cpu": {"min": 1, "max": 1, "mean": "x"}}})
+    assert db.stats("k")["count"] == 1
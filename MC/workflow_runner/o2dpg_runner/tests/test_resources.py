@@ -1,7 +1,7 @@
 import pytest
 
 from o2dpg_runner.resources import (
-    ResourceManager, ResourceLimitExceeded, Semaphore, TaskResources,
+    ResourceManager, ResourceLimitExceeded, SampleAccumulator, Semaphore, TaskResources,
     ResourceBoundaries,
 )
 
@@ -106,12 +106,39 @@ def test_dynamic_sampling_propagates():
     rm.resources[0].nice_value = rm.nice_default
     rm.book(0, rm.nice_default)
     rm.unbook(0)  # this triggers sampling + propagation
+    # t_2 takes the estimate over when it is next considered
+    assert rm.can_be_submitted_at_all(rm.resources[1])
     # t_2 should now have an adjusted assignment based on observed sample
     assert rm.resources[1].cpu_assigned > 0
     # The sampled CPU was ~1.5; t_2's cpu_assigned should reflect that ballpark
     assert rm.resources[1].mem_assigned == pytest.approx(800.0, abs=1)
 
 
+def test_accumulator_matches_the_prototype_sample_lists():
+    """Same numbers as the prototype's lists: first CPU reading skipped, each
+    later one weighted by the interval before it, negative readings add no
+    CPU but their time still counts, memory max over all samples."""
+    times = [0.0, 1.0, 3.0, 3.5, 7.0]
+    cpus = [9.0, 1.0, -1.0, 2.0, 0.5]
+    mems = [900.0, 100.0, 300.0, 200.0, 250.0]
+    acc = SampleAccumulator()
+    for t, c, m in zip(times, cpus, mems):
+        acc.add(t, c, m)
+    deltas = [b - a for a, b in zip(times, times[1:])]
+    expected = sum(c * dt for c, dt in zip(cpus[1:], deltas) if c >= 0) / sum(deltas)
+    assert len(acc) == 5
+    assert acc.cpu_mean() == pytest.approx(expected)
+    assert acc.mem_max == 900.0
+
+
+def test_fewer_than_three_samples_fall_back_to_the_assignment():
+    res = TaskResources(0, "t", 2, None, 1000, ResourceBoundaries(8, 16000))
+    res.add_sample(0.0, 5.0, 3000.0)
+    res.add_sample(1.0, 5.0, 3000.0)
+    res.sample_resources()
+    assert (res.cpu_sampled, res.mem_sampled) == (2, 1000)
+
+
 def test_a_zero_cpu_sample_leaves_siblings_alone():
     """A task seen only through its psutil baseline reads 0.0 cores. Passing
     that on would make every sibling look free and admit them all at once."""
@@ -123,9 +150,35 @@ def test_a_zero_cpu_sample_leaves_siblings_alone():
     manager.resources[0].nice_value = manager.nice_default
     manager.book(0, manager.nice_default)
     manager.unbook(0)
+    manager.can_be_submitted_at_all(manager.resources[1])
     assert manager.resources[1].cpu_assigned == pytest.approx(2.0)
 
 
+def test_sibling_estimate_is_a_running_aggregate_picked_up_lazily():
+    rm = ResourceManager(cpu_limit=8, mem_limit=16000, dynamic_resources=True)
+    for i in range(4):
+        rm.add_task(f"t_{i + 1}", "t", 4, 1, 4000)
+    rm.restore_sampled(0, 1.0, 500.0)
+    rm.restore_sampled(1, 3.0, 900.0)
+    group = rm.resources[0].related_tasks
+    assert (group.cpu_sum, group.mem_max) == (4.0, 900.0)
+    # nothing is pushed to the siblings until they are looked at
+    assert rm.resources[2].cpu_assigned == 4.0
+    assert rm.can_be_submitted_at_all(rm.resources[2])
+    assert (rm.resources[2].cpu_assigned, rm.resources[2].mem_assigned) == (2.0, 900.0)
+    # a retried task leaves the aggregate; the max is found again among the rest
+    rm.resources[1].nice_value = rm.nice_default
+    rm.book(1, rm.nice_default)
+    assert (group.cpu_sum, group.mem_max) == (1.0, 500.0)
+    # a booked task keeps what it was booked with
+    rm.resources[2].nice_value = rm.nice_default
+    rm.book(2, rm.nice_default)
+    rm.restore_sampled(0, 2.0, 600.0)
+    assert rm.resources[2].cpu_assigned == 2.0
+    rm.book(3, rm.nice_default)
+    assert (rm.resources[3].cpu_assigned, rm.resources[3].mem_assigned) == (2.0, 600.0)
+
+
 def test_at_proc_cap():
     rm = _make_rm()
     rm.procs_parallel_max = 2
@@ -135,3 +188,41 @@ def test_at_proc_cap():
         rm.resources[i].nice_value = rm.nice_default
         rm.book(i, rm.nice_default)
     assert rm.at_proc_cap()
+
+
+def test_suspended_backfill_keeps_memory_but_not_cpu():
+    rm = _make_rm(cpu=8, mem=16000)
+    rm.add_task("a", None, 2, 1, 1000)
+    rm.add_task("b", None, 3, 1, 2000)
+    rm.resources[0].nice_value = rm.nice_default
+    rm.book(0, rm.nice_default)
+    with pytest.raises(ValueError):
+        rm.suspend(0, 0.0)  # default-tier tasks are never stopped
+    rm.resources[1].nice_value = rm.nice_backfill
+    rm.book(1, rm.nice_backfill)
+    assert rm.cpu_active() == 5
+    rm.suspend(1, 10.0)
+    assert rm.cpu_active() == 2 and rm.n_suspended == 1
+    assert rm.mem_booked_backfill == 2000
+    assert rm.resources[1].suspended_seconds(12.5) == 2.5
+    rm.resume(1, 14.0)
+    assert rm.cpu_active() == 5 and rm.resources[1].suspended_total == 4.0
+    # killed while stopped: unbook clears both and keeps the stopped time
+    rm.suspend(1, 20.0)
+    rm.unbook(1, 23.0)
+    assert rm.resources[1].suspended_total == 7.0
+    assert rm.n_suspended == 0 and rm.cpu_suspended == 0 and rm.n_procs_backfill == 0
+
+
+def test_raise_mem_reaches_unstarted_siblings_only():
+    rm = ResourceManager(cpu_limit=8, mem_limit=3000, dynamic_resources=True)
+    for i in range(3):
+        rm.add_task(f"r_{i}", "r", cpu=1, cpu_relative=1.0, mem=1000)
+    rm.book(2, rm.nice_default)              # r_2 is running
+    old, new = rm.raise_mem(0, 1.5, siblings=True)
+    assert (old, new) == (1000, 1500)
+    assert rm.resources[1].mem_assigned == 1500
+    assert rm.resources[2].mem_assigned == 1000
+    # capped at the limit, for the task and its siblings
+    rm.raise_mem(0, 4, siblings=True)
+    assert rm.resources[0].mem_assigned == rm.resources[1].mem_assigned == 3000
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from o2dpg_runner.resources import ResourceManager
+from o2dpg_runner.retry import (
+    NO_RETRY, RETRY, RETRY_MORE_MEM, RetryClassifier, read_tail,
+)
+
+
+def _rules(tmp_path, rules, **extra):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": rules, **extra}))
+    return str(path)
+
+
+def test_read_tail_returns_last_lines_only(tmp_path):
+    log = tmp_path / "t.log"
+    log.write_bytes(b"".join(b"line %d\n" % i for i in range(10000)))
+    assert read_tail(str(log), max_lines=3) == b"line 9997\nline 9998\nline 9999\n"
+    assert read_tail(str(log), max_bytes=12, max_lines=100) == b"line 9999\n"
+    log.write_bytes(b"no newline at all")
+    assert read_tail(str(log), max_lines=3) == b"no newline at all"
+    assert read_tail(str(tmp_path / "missing.log")) == b""
+
+
+def test_first_matching_rule_wins_and_is_counted(tmp_path):
+    c = RetryClassifier.from_file(_rules(tmp_path, [
+        {"name": "ccdb", "pattern": "Could not retrieve .* from CCDB", "action": "no-retry"},
+        {"name": "oom", "pattern": "bad_alloc|Could not", "action": "retry-more-mem",
+         "mem_factor": 2.0},
+    ]))
+    log = tmp_path / "t.log"
+    log.write_text("...\n[ERROR] Could not retrieve GRP/ECS from CCDB\n")
+    assert c.classify(str(log)) == (NO_RETRY, c.rules[0])
+    log.write_text("terminate called after throwing std::bad_alloc\n")
+    action, rule = c.classify(str(log))
+    assert action == RETRY_MORE_MEM and c.factor_for(rule) == 2.0
+    log.write_text("Segmentation violation\n")
+    assert c.classify(str(log)) == (RETRY, None)
+    assert c.counts == {"ccdb": 1, "oom": 1, "<no match>": 1}
+
+
+def test_signature_only_before_the_tail_is_not_seen(tmp_path):
+    c = RetryClassifier.from_file(_rules(
+        tmp_path, [{"name": "x", "pattern": "FATAL", "action": "no-retry"}],
+        tail_lines=10))
+    log = tmp_path / "t.log"
+    log.write_text("FATAL early but recovered\n" + "ok\n" * 50)
+    assert c.classify(str(log))[0] == RETRY
+
+
+def test_unknown_action_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        RetryClassifier.from_file(_rules(
+            tmp_path, [{"pattern": "x", "action": "maybe"}]))
+
+
+@pytest.mark.parametrize("factor", [1, 0.5, 0, -2, "2", True])
+def test_mem_factor_must_raise_the_booking(tmp_path, factor):
+    with pytest.raises(ValueError, match="mem_factor must be a number above 1"):
+        RetryClassifier.from_file(_rules(
+            tmp_path, [{"pattern": "x", "action": "retry-more-mem", "mem_factor": factor}]))
+
+
+def test_raise_mem_is_capped_at_the_limit():
+    rm = ResourceManager(cpu_limit=8, mem_limit=3000)
+    rm.add_task("t", None, cpu=1, cpu_relative=1.0, mem=2000)
+    assert rm.raise_mem(0, 1.2) == (2000, 2400)
+    assert rm.raise_mem(0, 2.0) == (2400, 3000)
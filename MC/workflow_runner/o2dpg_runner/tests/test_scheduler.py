@@ -4,7 +4,7 @@ from o2dpg_runner.resources import ResourceManager
 from o2dpg_runner.scheduler import (
     TimeframeFirstPolicy, CriticalPathPolicy, BestFitBackfillPolicy, get_policy,
 )
-from o2dpg_runner.scheduler.base import SchedulerState
+from o2dpg_runner.scheduler.base import CandidateQueue, SchedulerState
 
 
 def _setup(n=4, cpu_limit=8.0, mem_limit=16000.0):
@@ -177,3 +177,42 @@ def test_n_backfill_cap():
     rm.add_task("d", None, 1, 1, 100)
     picks2 = list(p.pick_submittable([3], rm))
     assert picks2 == []
+
+
+@pytest.mark.parametrize("policy", [TimeframeFirstPolicy(), CriticalPathPolicy()])
+def test_candidate_queue_matches_resorting(policy):
+    """The persistent queue must hand out exactly what a fresh stable sort
+    over the insertion-ordered candidates would, ties included."""
+    import random
+    rng = random.Random(7)
+    n = 200
+    s = _make_state(n, tf=[rng.randint(1, 4) for _ in range(n)],
+                    desc=[rng.randint(0, 3) for _ in range(n)],
+                    cp=[float(rng.randint(1, 5)) for _ in range(n)])
+    q = CandidateQueue(policy, s)
+    plain = []
+    for step in range(2000):
+        tid = rng.randrange(n)
+        if tid in q and rng.random() < 0.5:
+            q.discard(tid)
+            plain.remove(tid)
+        elif tid not in q:
+            q.add(tid)
+            plain.append(tid)
+        if step % 50 == 0:
+            assert q.ordered() == policy.order(plain, s)
+    assert q.ordered() == policy.order(plain, s)
+    assert list(q) == plain
+
+
+def test_candidate_queue_best_fit_reorders_every_pass():
+    p = BestFitBackfillPolicy()
+    assert p.sort_key(_make_state(3)) is None
+    s = _make_state(3, cp=[1.0, 3.0, 2.0])
+    q = CandidateQueue(p, s)
+    for t in (0, 1, 2):
+        q.add(t)
+    assert q.ordered() == [1, 2, 0]
+    q.discard(1)
+    assert q.ordered() == [2, 0]
+    assert len(q) == 2 and 1 not in q
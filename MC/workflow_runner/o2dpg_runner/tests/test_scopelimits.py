@@ -0,0 +1,50 @@
+import pytest
+
+from o2dpg_runner.scopelimits import ScopeLimit, ScopeLimits, read_scope_counters
+
+
+def test_limits_follow_the_booking_with_headroom():
+    sl = ScopeLimits("1.5,1.25,2")
+    lim = sl.limit_for(3, cpu=2, mem=1000, cpu_limit=8, mem_limit=16000)
+    assert lim == ScopeLimit(cpu=3.0, mem_high=1250.0, mem_max=2000.0)
+    assert lim.properties() == ["-p", "CPUQuota=300%", "-p", "MemoryHigh=1250M",
+                                "-p", "MemoryMax=2000M"]
+    assert sl.limits[3] is lim
+
+
+def test_limits_are_capped_and_can_be_switched_off():
+    sl = ScopeLimits("1.5,1.25,2")
+    # never above the runner's own limits; MemoryHigh must stay below MemoryMax
+    lim = sl.limit_for(0, cpu=8, mem=9000, cpu_limit=8, mem_limit=10000)
+    assert lim == ScopeLimit(cpu=8.0, mem_high=None, mem_max=10000.0)
+
+    sl = ScopeLimits("0,0,2")
+    lim = sl.limit_for(0, cpu=1, mem=500, cpu_limit=8, mem_limit=16000)
+    assert lim.properties() == ["-p", "MemoryMax=1000M"]
+    # nothing to scale for a zero booking
+    assert sl.limit_for(1, cpu=0, mem=0, cpu_limit=8, mem_limit=16000).properties() == []
+
+
+@pytest.mark.parametrize("spec", ["1.5,2", "a,b,c", "0.5,1,2", "-1,1.25,-2", "1.5,-0.5,2"])
+def test_bad_factors(spec):
+    with pytest.raises(ValueError):
+        ScopeLimits(spec)
+
+
+def test_counters_and_new_events(tmp_path):
+    (tmp_path / "cpu.stat").write_text(
+        "usage_usec 100\nnr_periods 50\nnr_throttled 4\nthrottled_usec 120000\n")
+    (tmp_path / "memory.events").write_text("low 0\nhigh 2\nmax 0\noom 0\noom_kill 0\n")
+    counters = read_scope_counters(str(tmp_path))
+    assert counters == {"nr_throttled": 4, "throttled_usec": 120000,
+                        "high": 2, "max": 0, "oom": 0, "oom_kill": 0}
+    assert read_scope_counters(str(tmp_path / "gone")) is None
+
+    sl = ScopeLimits()
+    assert sl.new_events(1, counters) == {"nr_throttled": 4, "throttled_usec": 120000,
+                                          "high": 2}
+    assert sl.new_events(1, counters) == {}
+    assert sl.new_events(1, dict(counters, oom_kill=1)) == {"oom_kill": 1}
+    # a resubmission starts a new scope, counting from zero again
+    sl.limit_for(1, cpu=1, mem=100, cpu_limit=8, mem_limit=1000)
+    assert sl.new_events(1, counters)["high"] == 2
@@ -0,0 +1,107 @@
+import http.client
+import json
+import socket
+
+import pytest
+
+from o2dpg_runner.statusserver import StatusServer, parse_address, prometheus_text
+
+
+def _status():
+    bucket = {"n": 1, "cpu_booked": 2.0, "cpu_free": 6.0, "mem_booked": 1000.0,
+              "mem_free": 15000.0}
+    return {
+        "tasks": {"total": 5, "done": 2, "failed": 0, "running": 1, "queued": 1,
+                  "waiting": 1},
+        "resources": {"cpu_limit": 8, "mem_limit": 16000, "default": bucket,
+                      "backfill": dict(bucket, n_max=1)},
+        "running": [{"tid": 3, "name": 'reco "1"', "bucket": "default",
+                     "elapsed_s": 4.5, "cpu_pct": 180.0, "pss_mb": 900.0}],
+        "critical_path": {"remaining": 120.0, "unit": "s", "eta_s": 120.0},
+        "uptime_s": 30.0,
+    }
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+def _get(conn, path):
+    conn.request("GET", path)
+    r = conn.getresponse()
+    return r.status, r.read().decode()
+
+
+def test_parse_address():
+    assert parse_address("9123") == ("tcp", ("127.0.0.1", 9123))
+    assert parse_address("0.0.0.0:80") == ("tcp", ("0.0.0.0", 80))
+    assert parse_address("[::1]:80") == ("tcp", ("::1", 80))
+    assert parse_address("unix:/tmp/x.sock") == ("unix", "/tmp/x.sock")
+    with pytest.raises(ValueError):
+        parse_address("localhost:http")
+
+
+def test_unix_path_is_only_replaced_if_it_is_a_socket(tmp_path):
+    rc = tmp_path / "notes.txt"
+    rc.write_text("keep me")
+    srv = StatusServer(f"unix:{rc}", lambda: None)
+    with pytest.raises(ValueError, match="not a socket"):
+        srv.start()
+    assert rc.read_text() == "keep me"
+    # a socket left behind by a killed runner is taken over
+    stale = tmp_path / "s.sock"
+    s = socket.socket(socket.AF_UNIX)
+    s.bind(str(stale))
+    s.close()
+    srv = StatusServer(f"unix:{stale}", lambda: None)
+    srv.start()
+    assert srv.bound_address() == f"unix:{stale}"
+    srv.stop()
+
+
+def test_prometheus_text_has_states_buckets_and_escaped_task_labels():
+    text = prometheus_text(_status())
+    assert 'o2dpg_runner_tasks{state="done"} 2' in text
+    assert 'o2dpg_runner_cpu_free{bucket="backfill"} 6' in text
+    assert 'o2dpg_runner_task_cpu_percent{task="reco \\"1\\"",bucket="default"} 180' in text
+    assert "o2dpg_runner_eta_seconds 120" in text
+    # missing readings are left out rather than reported as 0
+    assert "o2dpg_runner_task_uss_mb{" not in text
+
+
+def test_serves_json_and_metrics_over_tcp_and_unix(tmp_path):
+    published = {"status": None}
+    for addr in ("0", f"unix:{tmp_path / 's.sock'}"):
+        srv = StatusServer(addr, lambda: published["status"])
+        srv.start()
+        try:
+            bound = srv.bound_address()
+            if bound.startswith("unix:"):
+                conn = _UnixHTTPConnection(bound[len("unix:"):])
+            else:
+                conn = http.client.HTTPConnection(*bound.rsplit(":", 1), timeout=5)
+            published["status"] = None
+            assert _get(conn, "/status")[0] == 503
+            published["status"] = _status()
+            code, body = _get(conn, "/status")
+            assert code == 200 and json.loads(body)["tasks"]["done"] == 2
+            code, body = _get(conn, "/metrics")
+            assert code == 200 and "o2dpg_runner_uptime_seconds 30" in body
+            assert _get(conn, "/nope")[0] == 404
+            conn.close()
+        finally:
+            srv.stop()
+    assert not (tmp_path / "s.sock").exists()
+
+
+def test_without_address_nothing_is_started():
+    srv = StatusServer(None, lambda: {})
+    srv.start()
+    assert srv.bound_address() is None
+    srv.stop()
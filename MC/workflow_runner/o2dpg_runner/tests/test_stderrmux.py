@@ -0,0 +1,58 @@
+import logging
+import os
+import threading
+
+from o2dpg_runner.stderrmux import StderrMultiplexer
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+
+def _logger():
+    lg = logging.getLogger("test_stderrmux")
+    lg.handlers.clear()
+    h = _Collect()
+    lg.addHandler(h)
+    lg.setLevel(logging.INFO)
+    lg.propagate = False
+    return lg, h
+
+
+def test_forwards_lines_from_many_pipes_in_one_thread():
+    lg, h = _logger()
+    mux = StderrMultiplexer(lg)
+    before = threading.active_count()
+    writers = []
+    for i in range(40):
+        r, w = os.pipe()
+        mux.add(os.fdopen(r, "rb"), f"t{i}")
+        writers.append(w)
+    assert threading.active_count() == before + 1
+    for i, w in enumerate(writers):
+        os.write(w, b"Running as unit: ")
+        os.write(w, f"task-{i}.scope\nno newline".encode())
+        os.close(w)
+    mux.close()
+    assert len(h.lines) == 80
+    assert "[systemd] t7: Running as unit: task-7.scope" in h.lines
+    assert "[systemd] t7: no newline" in h.lines
+    assert mux.n_open() == 0
+
+
+def test_close_forwards_what_is_buffered_and_closes_open_pipes():
+    lg, h = _logger()
+    mux = StderrMultiplexer(lg)
+    r, w = os.pipe()
+    pipe = os.fdopen(r, "rb")
+    mux.add(pipe, "late")
+    os.write(w, b"still running\n")
+    mux.close()
+    os.close(w)
+    assert h.lines == ["[systemd] late: still running"]
+    assert pipe.closed
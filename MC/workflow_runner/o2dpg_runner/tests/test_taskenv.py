@@ -0,0 +1,45 @@
+import pytest
+
+from o2dpg_runner.taskenv import TaskEnvironments
+
+
+def _stages(*envs):
+    return [{"name": f"t{i}", "env": e} for i, e in enumerate(envs)]
+
+
+def test_plain_tasks_share_one_environment():
+    te = TaskEnvironments({"PATH": "/bin"}, {"G": "1"}, _stages(None, {}, None))
+    assert te.get(0) is te.get(1) is te.get(2)
+    assert dict(te.get(0)) == {"PATH": "/bin", "G": "1"}
+    assert te.n_distinct() == 1
+
+
+def test_identical_task_envs_are_interned():
+    te = TaskEnvironments({"PATH": "/bin"}, {}, _stages({"A": 1}, {"A": "1"}, {"A": 2}))
+    assert te.get(0) is te.get(1)
+    assert te.get(2) is not te.get(0)
+    assert te.get(2)["A"] == "2"
+
+
+def test_precedence_matches_the_old_merge():
+    base = {"PATH": "/bin", "X": "base", "G": "base"}
+    alt = {"X": "alt", "Y": "alt"}
+    te = TaskEnvironments(base, {"G": "glob", "H": "glob"},
+                          _stages({"Y": "task"}), {0: alt})
+    env = dict(te.get(0))
+    # task > alt > process env > global env (setdefault only)
+    assert env == {"PATH": "/bin", "X": "alt", "Y": "task", "G": "base", "H": "glob"}
+
+
+def test_full_alternative_environment_replaces_the_base():
+    alt = {"TERM": "xterm", "PATH": "/alt/bin"}
+    te = TaskEnvironments({"PATH": "/bin", "HOME": "/h"}, {"G": "1"},
+                          _stages(None), {0: alt})
+    assert dict(te.get(0)) == {"TERM": "xterm", "PATH": "/alt/bin", "G": "1"}
+
+
+def test_environments_are_read_only():
+    te = TaskEnvironments({"PATH": "/bin"}, {}, _stages(None, {"A": "1"}))
+    for tid in (0, 1):
+        with pytest.raises(TypeError):
+            te.get(tid)["PATH"] = "/x"
@@ -5,7 +5,7 @@ import pytest
 
 from o2dpg_runner.workflow import (
     load_json, extract_global_init, filter_workflow, build_workflow,
-    update_resource_estimates,
+    missing_statistics, parse_resource_quantiles, update_resource_estimates,
 )
 
 FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "tiny_workflow.json")
@@ -115,3 +115,40 @@ def test_update_resource_estimates(tmp_path):
         t = wf.stages[wf.tid(name)]
         assert t["resources"]["mem"] == 1200
         assert t["resources"]["cpu"] == 1.8
+
+
+def test_resource_quantiles_select_what_is_booked(tmp_path):
+    raw = _load()
+    wf = build_workflow(raw, ["*"], [])
+    est = {
+        "sgnsim": {"pss": {"max": 3000, "p95": 2500}, "cpu": {"mean": 3.5, "p75": 3.9},
+                   "lifetime": {"mean": 10, "p90": 14}},
+        # written without quantiles: the default statistic is booked
+        "digi": {"pss": {"max": 1200}, "cpu": {"mean": 1.8}},
+    }
+    p = tmp_path / "res.json"
+    p.write_text(json.dumps(est))
+    stats = parse_resource_quantiles("mem=p95, cpu=P75.0,walltime=p90")
+    assert stats == {"mem": "p95", "cpu": "p75", "walltime": "p90"}
+    update_resource_estimates(wf, str(p), stats=stats)
+    sgn = wf.stages[wf.tid("sgnsim_1")]["resources"]
+    assert (sgn["mem"], sgn["cpu"], sgn["walltime"]) == (2500, 3.9, 14)
+    # the peak stays known to --mem-forecast
+    assert sgn["mem_peak"] == 3000
+    digi = wf.stages[wf.tid("digi_2")]["resources"]
+    assert (digi["mem"], digi["cpu"]) == (1200, 1.8)
+
+
+def test_missing_statistics_are_the_ones_no_task_has():
+    est = {"count": 3,
+           "sgnsim": {"pss": {"max": 3000, "p90": 2500}, "cpu": {"mean": 3.5}},
+           "digi": {"pss": {"max": 1200}, "cpu": {"mean": 1.8}}}
+    stats = parse_resource_quantiles("mem=p90,cpu=p75,walltime=p97")
+    assert missing_statistics(est, stats) == ["cpu.p75", "lifetime.p97"]
+    assert missing_statistics(est, parse_resource_quantiles(None)) == []
+
+
+@pytest.mark.parametrize("spec", ["mem", "disk=p90", "mem=p0", "mem=p101", "cpu=median"])
+def test_bad_resource_quantiles(spec):
+    with pytest.raises(ValueError):
+        parse_resource_quantiles(spec)
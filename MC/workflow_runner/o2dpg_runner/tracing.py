@@ -0,0 +1,155 @@
+"""Task lifecycle as a Chrome/Perfetto trace (Trace Event Format).
+
+Where a run lost time (cores idle while tasks queued for memory, a chain
+of tasks waiting on one slow dependency) used to be dug out of the action
+log and pipeline_metric by hand. With ``--trace-file PATH`` the runner
+writes a trace that ui.perfetto.dev or chrome://tracing open directly:
+
+  slots       one track per concurrency slot; a task occupies the lowest
+              free slot from submit to finish (args: booked cpu/mem, nice,
+              rc, how long it queued). Retries and skips are instants.
+  light lane  the same for --light-lane-workers tasks.
+  queue       one async slice per task from the moment it became a
+              candidate (all needs done) to its submission: time spent
+              waiting for resources rather than for dependencies.
+  counters    booked vs measured CPU (cores) and memory (MB), per monitor
+              tick.
+
+The file uses the JSON array form and is written as events happen, so a
+runner that was killed still leaves a trace the viewers can load (the
+closing bracket is optional for them).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_PID_SLOTS = 1
+_PID_LIGHT = 2
+_PID_QUEUE = 3
+_PID_COUNTERS = 4
+
+
+class TraceWriter:
+    """Streams trace events to a file; does nothing without a path."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._f = None
+        self._t0 = 0.0
+        self._first = True
+        # slot bookkeeping per lane: pid -> occupied flags
+        self._slots: Dict[int, List[bool]] = {_PID_SLOTS: [], _PID_LIGHT: []}
+        self._running: Dict[int, Tuple[int, int]] = {}  # tid -> (pid, slot)
+        self._ready_at: Dict[int, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._f is not None
+
+    def open(self, t0: float) -> None:
+        if not self.path or self._f is not None:
+            return
+        self._t0 = t0
+        # line buffered: each event goes out as the next one starts
+        self._f = open(self.path, "w", buffering=1)
+        self._f.write("[")
+        for pid, name in ((_PID_SLOTS, "slots"), (_PID_LIGHT, "light lane"),
+                          (_PID_QUEUE, "queue"), (_PID_COUNTERS, "resources")):
+            self._emit({"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                        "args": {"name": name}})
+            self._emit({"ph": "M", "name": "process_sort_index", "pid": pid, "tid": 0,
+                        "args": {"sort_index": pid}})
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def _emit(self, ev: Dict) -> None:
+        self._f.write(("\n" if self._first else ",\n") + json.dumps(ev, separators=(",", ":")))
+        self._first = False
+
+    # ----- task lifecycle -----
+    def ready(self, tid: int, name: str) -> None:
+        if self._f is None or tid in self._ready_at:
+            return
+        ts = self._now()
+        self._ready_at[tid] = ts
+        self._emit({"ph": "b", "cat": "queue", "name": name, "id": tid,
+                    "pid": _PID_QUEUE, "tid": 0, "ts": ts})
+
+    def _leave_queue(self, tid: int, name: str, ts: float) -> float:
+        ready = self._ready_at.pop(tid, None)
+        if ready is None:
+            return 0.0
+        self._emit({"ph": "e", "cat": "queue", "name": name, "id": tid,
+                    "pid": _PID_QUEUE, "tid": 0, "ts": ts})
+        return ts - ready
+
+    def submit(self, tid: int, name: str, light: bool = False, **args) -> None:
+        if self._f is None:
+            return
+        ts = self._now()
+        args["queued_ms"] = round(self._leave_queue(tid, name, ts) / 1000.0, 3)
+        pid = _PID_LIGHT if light else _PID_SLOTS
+        slots = self._slots[pid]
+        try:
+            slot = slots.index(False)
+            slots[slot] = True
+        except ValueError:
+            slot = len(slots)
+            slots.append(True)
+            self._emit({"ph": "M", "name": "thread_name", "pid": pid, "tid": slot,
+                        "args": {"name": f"slot {slot}"}})
+            self._emit({"ph": "M", "name": "thread_sort_index", "pid": pid,
+                        "tid": slot, "args": {"sort_index": slot}})
+        self._running[tid] = (pid, slot)
+        # B/E rather than X: a task still running when the runner dies
+        # still shows, open-ended
+        self._emit({"ph": "B", "name": name, "cat": "task", "pid": pid, "tid": slot,
+                    "ts": ts, "args": args})
+
+    def finish(self, tid: int, name: str, rc: int) -> None:
+        if self._f is None:
+            return
+        entry = self._running.pop(tid, None)
+        if entry is None:
+            return
+        pid, slot = entry
+        self._slots[pid][slot] = False
+        self._emit({"ph": "E", "pid": pid, "tid": slot, "ts": self._now(),
+                    "args": {"rc": rc}})
+
+    def instant(self, tid: int, name: str, what: str) -> None:
+        """Mark a retry or skip of *tid* across the slots track."""
+        if self._f is None:
+            return
+        ts = self._now()
+        if what == "skip":
+            self._leave_queue(tid, name, ts)
+        self._emit({"ph": "i", "s": "p", "name": f"{what} {name}", "cat": what,
+                    "pid": _PID_SLOTS, "tid": 0, "ts": ts})
+
+    # ----- counters -----
+    def counters(self, cpu_booked: float, cpu_measured: float,
+                 mem_booked: float, mem_measured: float) -> None:
+        if self._f is None:
+            return
+        ts = self._now()
+        self._emit({"ph": "C", "name": "cpu (cores)", "pid": _PID_COUNTERS, "ts": ts,
+                    "args": {"booked": round(cpu_booked, 3),
+                             "measured": round(cpu_measured, 3)}})
+        self._emit({"ph": "C", "name": "mem (MB)", "pid": _PID_COUNTERS, "ts": ts,
+                    "args": {"booked": round(mem_booked, 1),
+                             "measured": round(mem_measured, 1)}})
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        self._f.write("\n]\n")
+        self._f.close()
+        self._f = None
@@ -228,10 +228,83 @@ def build_workflow(
     return wf
 
 
+# --resource-quantile: which json-stat value is booked per dimension
+RESOURCE_METRICS = {"mem": "pss", "cpu": "cpu", "walltime": "lifetime"}
+DEFAULT_RESOURCE_STATS = {"mem": "max", "cpu": "mean", "walltime": "mean"}
+
+
+def parse_resource_quantiles(spec: Optional[str]) -> Dict[str, str]:
+    """``mem=p95,cpu=p75`` -> {"mem": "p95", "cpu": "p75", "walltime": "mean"}.
+
+    Each value is a json-stat key of the metric: ``min``, ``max``, ``mean``
+    or a quantile ``pQ`` (0 < Q <= 100). Unnamed dimensions keep the defaults.
+    """
+    stats = dict(DEFAULT_RESOURCE_STATS)
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        dim, sep, stat = (x.strip().lower() for x in part.partition("="))
+        if not sep or dim not in RESOURCE_METRICS:
+            raise ValueError(f"--resource-quantile {spec!r}: expected DIM=STAT with DIM "
+                             f"one of {', '.join(RESOURCE_METRICS)}")
+        if stat.startswith("p"):
+            try:
+                q = float(stat[1:])
+            except ValueError:
+                q = -1.0
+            if not 0 < q <= 100:
+                raise ValueError(f"--resource-quantile {spec!r}: bad quantile {stat!r}")
+            stat = f"p{q:g}"
+        elif stat not in ("min", "max", "mean"):
+            raise ValueError(f"--resource-quantile {spec!r}: {stat!r} is not min, max, "
+                             "mean or pQ")
+        stats[dim] = stat
+    return stats
+
+
+def missing_statistics(resource_dict: Dict, stats: Dict[str, str]) -> List[str]:
+    """The requested ``metric.stat`` keys that no entry of a json-stat dict has.
+
+    Such a key was never written (json-stat ran without that quantile), so
+    every task would silently book the default statistic instead.
+    """
+    entries = [e for k, e in resource_dict.items() if k != "count" and isinstance(e, dict)]
+    missing = []
+    for dim, stat in stats.items():
+        metric = RESOURCE_METRICS[dim]
+        if stat != DEFAULT_RESOURCE_STATS[dim] and entries and not any(
+                stat in e.get(metric, {}) for e in entries):
+            missing.append(f"{metric}.{stat}")
+    return missing
+
+
+def learned_value(entry: Dict[str, Any], dim: str,
+                  stats: Optional[Dict[str, str]] = None) -> Tuple[Optional[float], str]:
+    """The value of *dim* to book from a json-stat entry, and the key it came from.
+
+    A quantile the entry does not have (a json-stat without it) falls back
+    to the default statistic.
+    """
+    metric = entry.get(RESOURCE_METRICS[dim], {})
+    stat = (stats or DEFAULT_RESOURCE_STATS)[dim]
+    value = metric.get(stat)
+    if value is None and stat != DEFAULT_RESOURCE_STATS[dim]:
+        stat = DEFAULT_RESOURCE_STATS[dim]
+        value = metric.get(stat)
+    return value, stat
+
+
+def global_task_name(task: Dict[str, Any]) -> str:
+    """The name json-stat keys a task on: _<timeframe> stripped."""
+    name = task["name"]
+    return "_".join(name.split("_")[:-1]) if task.get("timeframe", -1) >= 1 else name
+
+
 def update_resource_estimates(
     workflow: Workflow,
     resource_json_path: str,
     logger=None,
+    stats: Optional[Dict[str, str]] = None,
 ) -> None:
     """Apply learned resource estimates from a JSON file.
 
@@ -240,6 +313,8 @@ def update_resource_estimates(
 
     MEM is taken from pss.max (peak proportional set size).
     CPU is taken from cpu.mean (average cores used during the task).
+    *stats* (parse_resource_quantiles) books other keys instead, e.g. the
+    pss.p95 and cpu.p75 quantiles over task instances.
 
     Note on relative_cpu: the workflow JSON carries a relative_cpu field
     that historically scaled a "max" CPU estimate down to an "expected"
@@ -250,23 +325,44 @@ def update_resource_estimates(
     correct behaviour: the sampler scales a freshly-observed aggregate back
     to an expected per-task assignment.
     """
-    _log = logger if logger is not None else log
-    _log.info("Applying learned resource estimates from: %s", resource_json_path)
-
     with open(resource_json_path) as fp:
         resource_dict = json.load(fp)
+    apply_resource_estimates(workflow, resource_dict, resource_json_path, logger=logger,
+                             stats=stats)
+
+
+def apply_resource_estimates(
+    workflow: Workflow,
+    resource_dict: Dict,
+    source: str,
+    logger=None,
+    stats: Optional[Dict[str, str]] = None,
+) -> None:
+    """update_resource_estimates() for an already loaded json-stat dict."""
+    _log = logger if logger is not None else log
+    _log.info("Applying learned resource estimates from: %s", source)
+    stats = stats or DEFAULT_RESOURCE_STATS
+    if stats != DEFAULT_RESOURCE_STATS:
+        _log.info("  booking %s", ", ".join(
+            f"{dim}={RESOURCE_METRICS[dim]}.{stat}" for dim, stat in stats.items()))
+
+    missing = missing_statistics(resource_dict, stats)
+    if missing:
+        _log.warning("  %s has no %s; the default statistic is booked instead",
+                     source, ", ".join(missing))
 
     # Remove the metadata key so task lookup doesn't match it.
+    resource_dict = dict(resource_dict)
     resource_dict.pop("count", None)
 
     n_stages = len(workflow.stages)
     n_updated = 0
     missing_base_names: set = set()
+    fallbacks: set = set()  # (name, dim) booked from the default statistic
 
     for task in workflow.stages:
-        tf = task.get("timeframe", -1)
         name = task["name"]
-        global_name = "_".join(name.split("_")[:-1]) if tf >= 1 else name
+        global_name = global_task_name(task)
 
         if global_name not in resource_dict:
             missing_base_names.add(global_name)
@@ -275,7 +371,12 @@ def update_resource_estimates(
         new_res = resource_dict[global_name]
         task_updated = False
 
-        walltime = new_res.get("lifetime", {}).get("mean")
+        picked = {dim: learned_value(new_res, dim, stats) for dim in RESOURCE_METRICS}
+        for dim, (value, stat) in picked.items():
+            if value is not None and stat != stats[dim]:
+                fallbacks.add((global_name, dim))
+
+        walltime = picked["walltime"][0]
         if walltime is not None:
             # Store even when walltime=0 (sub-10ms tasks that GNU time rounds
             # to zero).  The simulator clamps to a 1ms minimum so zero is
@@ -284,14 +385,19 @@ def update_resource_estimates(
             _log.info("  WALLTIME %-40s  %.3f s", name, float(walltime))
             task_updated = True
 
-        new_mem = new_res.get("pss", {}).get("max")
+        peak = new_res.get("pss", {}).get("max")
+        if peak is not None:
+            # what --mem-forecast lets a running task's projection grow to
+            task["resources"]["mem_peak"] = float(peak)
+
+        new_mem = picked["mem"][0]
         if new_mem is not None:
             old_mem = task["resources"]["mem"]
             task["resources"]["mem"] = new_mem
             _log.info("  MEM  %-40s  %.1f MB -> %.1f MB", name, float(old_mem), new_mem)
             task_updated = True
 
-        new_cpu = new_res.get("cpu", {}).get("mean")
+        new_cpu = picked["cpu"][0]
         if new_cpu is not None:
             old_cpu = task["resources"]["cpu"]
             uses_dynamic_workers = "O2DPG_DYNAMIC_NWORKER_OVERWRITE" in task.get("cmd", "")
@@ -325,6 +431,9 @@ def update_resource_estimates(
 
     if missing_base_names:
         _log.info("  No learned data for: %s", ", ".join(sorted(missing_base_names)))
+    if fallbacks:
+        _log.info("  Requested statistic missing, default booked for: %s",
+                  ", ".join(f"{n}:{d}" for n, d in sorted(fallbacks)))
     _log.info(
         "Resource update done: %d/%d task stages updated (%d base name(s) not in learned data).",
         n_updated, n_stages, len(missing_base_names),
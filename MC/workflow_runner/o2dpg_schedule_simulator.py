@@ -56,7 +56,9 @@ if _here not in sys.path:
 
 from o2dpg_runner.workflow import (
     build_workflow,
+    learned_value,
     load_json,
+    parse_resource_quantiles,
     replicate_workflow_for_timeframes,
     update_resource_estimates,
 )
@@ -163,11 +165,13 @@ def _task_walltime(task: dict, cpu_fallback_factor: float) -> float:
 _LEARN_ALL: Set[str] = frozenset({"cpu", "mem", "lifetime"})
 
 
-def _apply_learned_fields(workflow, learned: Dict, fields: Set[str]) -> int:
+def _apply_learned_fields(workflow, learned: Dict, fields: Set[str],
+                          stats: Optional[Dict[str, str]] = None) -> int:
     """Patch workflow stages in-place with a subset of learned resource fields.
 
     *fields* is a subset of ``{"cpu", "mem", "lifetime"}``.  Only the named
     dimensions are written; the rest keep the values from workflow.json.
+    *stats* selects the learned statistic as --resource-quantile does.
     Returns the count of stages that received at least one update.
     """
     n_updated = 0
@@ -180,17 +184,17 @@ def _apply_learned_fields(workflow, learned: Dict, fields: Set[str]) -> int:
             continue
         updated = False
         if "lifetime" in fields:
-            wt = data.get("lifetime", {}).get("mean")
+            wt = learned_value(data, "walltime", stats)[0]
             if wt is not None:
                 task["resources"]["walltime"] = float(wt)
                 updated = True
         if "mem" in fields:
-            mem = data.get("pss", {}).get("max")
+            mem = learned_value(data, "mem", stats)[0]
             if mem is not None:
                 task["resources"]["mem"] = float(mem)
                 updated = True
         if "cpu" in fields:
-            cpu = data.get("cpu", {}).get("mean")
+            cpu = learned_value(data, "cpu", stats)[0]
             if cpu is not None:
                 task["resources"]["cpu"] = float(cpu)
                 updated = True
@@ -881,6 +885,9 @@ def build_parser() -> argparse.ArgumentParser:
                         "patched with a colon-separated field list chosen from "
                         "{cpu,mem,lifetime}. Example: learned.json:lifetime applies "
                         "only walltimes, keeping cpu/mem from workflow.json.")
+    p.add_argument("--resource-quantile", default=None, metavar="DIM=STAT,...",
+                   help="Learned statistic to apply per dimension (mem, cpu, walltime), "
+                        "as in the runner, e.g. mem=p95,cpu=p75.")
     p.add_argument("--cpu-limit", type=float, default=8.0)
     p.add_argument("--mem-limit", type=float, default=60000.0, help="in MB")
     p.add_argument("--policies", nargs="+",
@@ -978,6 +985,12 @@ def main(argv=None) -> int:
                 return 1
             ur_fields = _raw_fields
 
+    try:
+        booked_stats = parse_resource_quantiles(ns.resource_quantile)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
     # ── Load learned JSON once (independent of timeframe count) ──────────────
     walltime_stds: Dict[str, float] = {}
     learned_full: Dict = {}
@@ -1093,9 +1106,9 @@ def main(argv=None) -> int:
 
         if ur_path:
             if ur_fields is None:
-                update_resource_estimates(wf, ur_path)
+                update_resource_estimates(wf, ur_path, stats=booked_stats)
             else:
-                _apply_learned_fields(wf, learned_full, ur_fields)
+                _apply_learned_fields(wf, learned_full, ur_fields, booked_stats)
             has_wt = sum(1 for t in wf.stages if t.get("resources", {}).get("walltime"))
             if not sweep_mode:
                 print(f"  {has_wt}/{len(wf.stages)} tasks have learned walltime.")